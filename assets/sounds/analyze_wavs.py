@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Analyze and validate the generated WAV library
+Maps the data chunk of every WAV file with np.memmap (no copy of the file is
+read into memory) and streams over it in fixed-size blocks to measure peak,
+RMS, gated loudness, DC offset, clipped samples, the loop-boundary jump and
+an averaged FFT spectrum (centroid, rolloff, dominant frequency, band
+energy). Files are analyzed in parallel. The JSON report lists every metric
+plus the threshold violations, and the exit status is 1 if there are any.
+A file that cannot be read counts as a violation; only encodings this
+script knows it cannot map (IMA ADPCM) are skipped.
+"""
+
+import argparse
+import glob
+import json
+import os
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import pack_sprites
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Frames per streamed block; windows and FFT segments may straddle blocks
+BLOCK_FRAMES = 1 << 16
+
+FFT_SIZE = 4096
+ROLLOFF = 0.85
+BANDS = {'low': (0, 250), 'mid': (250, 4000), 'high': (4000, None)}
+
+# Gated loudness: mean power of 400ms windows above an absolute gate, as in
+# ITU-R BS.1770 but without the K-weighting filter
+LOUDNESS_WINDOW = 0.4
+LOUDNESS_GATE_DB = -70.0
+
+# Files that must loop without a click at the boundary
+LOOPS = ('background_music', 'ambient_music')
+
+# Default limits; every one can be overridden on the command line
+THRESHOLDS = {
+    'max_peak_dbfs': -0.1,     # Headroom below full scale
+    'max_clipped': 0,          # Samples at the int16 rails
+    'max_dc': 0.01,            # |mean| as a fraction of full scale
+    'max_seam': 0.05,          # |first - last| sample of a loop, fraction of full scale
+    'max_seam_ratio': 1.0,     # Loop boundary step over the largest step inside the loop
+    'max_sfx_spread_db': 15.0, # Gated loudness range across the sprite's sound effects
+}
+
+# WAVE format tags (and WAVE_FORMAT_EXTENSIBLE sub-formats) that can be mapped directly
+PCM, IEEE_FLOAT, EXTENSIBLE = 0x0001, 0x0003, 0xFFFE
+SAMPLE_TYPES = {(PCM, 16): ('<i2', 32768.0), (IEEE_FLOAT, 32): ('<f4', 1.0)}
+
+# Valid encodings the build can produce that have no sample array to map (encoders.py writes ADPCM)
+SKIPPED_TAGS = {0x0011: 'IMA ADPCM'}
+
+class UnsupportedEncoding(ValueError):
+    """A well-formed WAV in an encoding listed in SKIPPED_TAGS"""
+
+def wav_layout(path):
+    """Parse the RIFF chunks; returns (format tag, channels, rate, bits, data offset, data bytes)"""
+    with open(path, 'rb') as f:
+        riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            raise ValueError(f"{path}: not a RIFF/WAVE file")
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{path}: no data chunk")
+            chunk_id, size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                body = f.read(size)
+                tag, channels, rate, _, _, bits = struct.unpack('<HHIIHH', body[:16])
+                if tag == EXTENSIBLE and len(body) >= 26:
+                    tag = struct.unpack('<H', body[24:26])[0]  # First two bytes of the sub-format GUID
+                fmt = (tag, channels, rate, bits)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    raise ValueError(f"{path}: data chunk before fmt chunk")
+                available = os.path.getsize(path) - f.tell()
+                if size > available:
+                    raise ValueError(f"{path}: data chunk truncated ({available} of {size} bytes)")
+                return fmt + (f.tell(), size)
+            else:
+                f.seek(size, os.SEEK_CUR)
+            if size % 2:
+                f.seek(1, os.SEEK_CUR)  # Chunks are word-aligned
+
+def open_samples(path):
+    """Zero-copy (frames, channels) view of a PCM WAV's samples, plus (rate, full scale)"""
+    tag, channels, rate, bits, offset, size = wav_layout(path)
+    if tag in SKIPPED_TAGS:
+        raise UnsupportedEncoding(f"{SKIPPED_TAGS[tag]} is not analyzed")
+    if (tag, bits) not in SAMPLE_TYPES:
+        raise ValueError(f"unsupported encoding (format 0x{tag:04x}, {bits}-bit)")
+    dtype, full_scale = SAMPLE_TYPES[tag, bits]
+    frames = size // (np.dtype(dtype).itemsize * channels)
+    if frames == 0:
+        return np.zeros((0, channels), dtype), rate, full_scale
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(frames, channels)), rate, full_scale
+
+def analyze(path, block_frames=BLOCK_FRAMES):
+    """Stream one file block by block; returns its metrics (values are fractions of full scale)"""
+    samples, rate, full_scale = open_samples(path)
+    frames, channels = samples.shape
+    clip_high, clip_low = (32767, -32768) if samples.dtype == np.int16 else (1.0, -1.0)
+    window = max(1, int(LOUDNESS_WINDOW * rate))
+    fft_window = np.hanning(FFT_SIZE)
+
+    peak = 0.0
+    clipped = 0
+    total = 0.0
+    squares = 0.0
+    max_step = 0.0
+    spectrum = np.zeros(FFT_SIZE // 2 + 1)
+    segments = 0
+    window_powers = []
+    # Mono tails not yet forming a whole loudness window / FFT segment
+    window_carry = segment_carry = np.zeros(0)
+    previous = None
+
+    for start in range(0, frames, block_frames):
+        raw = samples[start:start + block_frames]
+        clipped += int(np.count_nonzero((raw >= clip_high) | (raw <= clip_low)))
+        block = raw.astype(np.float64) / full_scale
+        peak = max(peak, float(np.abs(block).max()))
+        total += float(block.sum())
+        squares += float(np.square(block).sum())
+        mono = block.mean(axis=1)
+        steps = np.abs(np.diff(mono, prepend=mono[:1] if previous is None else previous))
+        max_step = max(max_step, float(steps.max()))
+        previous = mono[-1:]
+
+        # Whole loudness windows and FFT segments so far; partial ones carry into the next block
+        stream = np.concatenate([window_carry, mono])
+        whole = len(stream) // window * window
+        window_powers.extend(np.square(stream[:whole]).reshape(-1, window).mean(axis=1))
+        window_carry = stream[whole:]
+        stream = np.concatenate([segment_carry, mono])
+        whole = len(stream) // FFT_SIZE * FFT_SIZE
+        if whole:
+            power = np.abs(np.fft.rfft(stream[:whole].reshape(-1, FFT_SIZE) * fft_window, axis=1)) ** 2
+            spectrum += power.sum(axis=0)
+            segments += len(power)
+        segment_carry = stream[whole:]
+
+    # Files shorter than one window / segment still get a loudness and a spectrum
+    if not window_powers and len(window_carry):
+        window_powers.append(float(np.square(window_carry).mean()))
+    if not segments and len(segment_carry):
+        padded = np.zeros(FFT_SIZE)
+        padded[:len(segment_carry)] = segment_carry
+        spectrum += np.abs(np.fft.rfft(padded * fft_window)) ** 2
+
+    count = frames * channels
+    metrics = {
+        'file': os.path.basename(path),
+        'sample_rate': rate,
+        'channels': channels,
+        'frames': frames,
+        'seconds': round(frames / rate, 4) if rate else 0,
+        'peak': round(peak, 6),
+        'peak_dbfs': _dbfs(peak),
+        'rms_dbfs': _dbfs(np.sqrt(squares / count) if count else 0.0),
+        'loudness_db': _gated_loudness(window_powers),
+        'dc_offset': round(total / count, 6) if count else 0.0,
+        'clipped_samples': clipped,
+        'max_step': round(max_step, 6),
+    }
+    if frames > 1:
+        first = float(samples[0].astype(np.float64).mean()) / full_scale
+        last = float(samples[-1].astype(np.float64).mean()) / full_scale
+        metrics['seam_jump'] = round(abs(first - last), 6)
+        # Above 1, the loop boundary is a bigger step than any inside the file
+        metrics['seam_ratio'] = round(abs(first - last) / max_step, 3) if max_step else 0.0
+    metrics['spectrum'] = _spectral_summary(spectrum, rate)
+    return metrics
+
+def _dbfs(value):
+    return round(20 * np.log10(value), 2) if value > 0 else None
+
+def _gated_loudness(window_powers):
+    powers = np.asarray(window_powers)
+    gated = powers[powers > 10 ** (LOUDNESS_GATE_DB / 10)]
+    return round(10 * np.log10(gated.mean()), 2) if len(gated) else None
+
+def _spectral_summary(spectrum, rate):
+    """Centroid, rolloff, dominant frequency and band energy fractions of a power spectrum"""
+    freqs = np.fft.rfftfreq(FFT_SIZE, 1 / rate)
+    energy = spectrum.sum()
+    if energy <= 0:
+        return None
+    cumulative = np.cumsum(spectrum) / energy
+    bands = {}
+    for name, (low, high) in BANDS.items():
+        inside = (freqs >= low) & (freqs < (high if high is not None else np.inf))
+        bands[name] = round(float(spectrum[inside].sum() / energy), 4)
+    return {
+        'centroid_hz': round(float((freqs * spectrum).sum() / energy), 1),
+        'rolloff_hz': round(float(freqs[np.searchsorted(cumulative, ROLLOFF)]), 1),
+        'dominant_hz': round(float(freqs[np.argmax(spectrum)]), 1),
+        'bands': bands,
+    }
+
+def _analyze_or_error(path, block_frames):
+    try:
+        return analyze(path, block_frames)
+    except UnsupportedEncoding as error:
+        return {'file': os.path.basename(path), 'skipped': str(error)}
+    except (OSError, ValueError, struct.error) as error:
+        return {'file': os.path.basename(path), 'error': str(error)}
+
+def violations(results, thresholds=THRESHOLDS, loops=LOOPS, sfx=pack_sprites.SPRITE_SOUNDS):
+    """Threshold violations as {'file', 'check', 'value', 'limit'} dicts
+
+    An unreadable file is a violation of check 'readable' with the error as
+    its value and no limit.
+    """
+    found = []
+
+    def check(name, metric, value, limit):
+        if value is not None and value > limit:
+            found.append({'file': name, 'check': metric, 'value': value, 'limit': limit})
+
+    for result in results:
+        name = result['file']
+        if 'error' in result:
+            found.append({'file': name, 'check': 'readable', 'value': result['error'], 'limit': None})
+            continue
+        if 'skipped' in result:
+            continue
+        check(name, 'peak_dbfs', result['peak_dbfs'], thresholds['max_peak_dbfs'])
+        check(name, 'clipped_samples', result['clipped_samples'], thresholds['max_clipped'])
+        check(name, 'dc_offset', abs(result['dc_offset']), thresholds['max_dc'])
+        if os.path.splitext(name)[0] in loops and 'seam_jump' in result:
+            check(name, 'seam_jump', result['seam_jump'], thresholds['max_seam'])
+            check(name, 'seam_ratio', result['seam_ratio'], thresholds['max_seam_ratio'])
+
+    levels = {result['file']: result['loudness_db'] for result in results
+              if os.path.splitext(result['file'])[0] in sfx and result.get('loudness_db') is not None}
+    if len(levels) > 1:
+        spread = round(max(levels.values()) - min(levels.values()), 2)
+        quietest, loudest = min(levels, key=levels.get), max(levels, key=levels.get)
+        check(f'{quietest} .. {loudest}', 'sfx_loudness_spread_db', spread, thresholds['max_sfx_spread_db'])
+    return found
+
+def analyze_all(paths, jobs=None, block_frames=BLOCK_FRAMES):
+    """Analyze files in parallel, in the order given"""
+    if jobs == 1 or len(paths) <= 1:
+        return [_analyze_or_error(path, block_frames) for path in paths]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(_analyze_or_error, paths, [block_frames] * len(paths)))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('paths', nargs='*',
+                        help='WAV files or directories (default: the WAVs next to this script)')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='worker processes (default: CPU count)')
+    parser.add_argument('--block-frames', type=int, default=BLOCK_FRAMES,
+                        help='frames per streamed block (default: %(default)s)')
+    parser.add_argument('--loop', action='append', metavar='NAME',
+                        help=f"file stem that must loop cleanly (repeatable, default: {', '.join(LOOPS)})")
+    for key, value in THRESHOLDS.items():
+        parser.add_argument('--' + key.replace('_', '-'), type=type(value), default=value,
+                            help='(default: %(default)s)')
+    parser.add_argument('--output', '-o', help='write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    paths = []
+    for path in args.paths or [SOURCE_DIR]:
+        paths += sorted(glob.glob(os.path.join(path, '*.wav'))) if os.path.isdir(path) else [path]
+    thresholds = {key: getattr(args, key) for key in THRESHOLDS}
+
+    results = analyze_all(paths, args.jobs, args.block_frames)
+    found = violations(results, thresholds, tuple(args.loop or LOOPS))
+    report = {'thresholds': thresholds, 'files': results, 'violations': found}
+
+    for result in results:
+        if 'skipped' in result:
+            print(f"· {result['file']}: skipped ({result['skipped']})")
+            continue
+        if 'error' in result:
+            continue  # Reported with the violations
+        seam = f", seam {result['seam_jump']:.4f}" if 'seam_jump' in result else ''
+        loudness = f"{result['loudness_db']:.1f}" if result['loudness_db'] is not None else '-inf'
+        print(f"{result['file']:<28} peak {result['peak_dbfs'] or float('-inf'):6.2f} dBFS  "
+              f"loudness {loudness:>6} dB  DC {result['dc_offset']:+.4f}  "
+              f"clipped {result['clipped_samples']}{seam}")
+    for violation in found:
+        if violation['limit'] is None:
+            print(f"✗ {violation['file']}: unreadable ({violation['value']})")
+        else:
+            print(f"✗ {violation['file']}: {violation['check']} {violation['value']} exceeds {violation['limit']}")
+    if not found:
+        analyzed = sum('error' not in result and 'skipped' not in result for result in results)
+        print(f"✓ {analyzed} files within limits")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if found else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
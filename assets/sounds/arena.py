@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Scratch buffer arena and chunked PCM conversion for the generators
+Generators borrow reusable buffers of the selected precision (float64 or
+float32) and compute into them with out= ufuncs instead of allocating a
+temporary per expression; the final int16 conversion runs in fixed-size
+chunks through reused buffers, with optional TPDF dither
+"""
+
+from contextlib import contextmanager
+
+import numpy as np
+
+import tracing
+
+PRECISIONS = ('float64', 'float32')
+
+# Smallest backing buffer, so short renders share allocations
+MIN_BUFFER = 4096
+
+DEFAULT_CHUNK_SIZE = 8192
+
+class BufferArena:
+    """Pool of reusable 1-D scratch buffers of one dtype"""
+
+    def __init__(self, dtype='float64'):
+        self.dtype = np.dtype(dtype)
+        self._free = []
+        self._ramp = np.arange(MIN_BUFFER, dtype=self.dtype)
+        self.allocations = 0
+        self.borrows = 0
+
+    def take(self, n, zero=False):
+        """Lend a length-n buffer (uninitialized unless zero); hand it back with give()"""
+        self.borrows += 1
+        fits = [i for i, buffer in enumerate(self._free) if len(buffer) >= n]
+        if fits:
+            buffer = self._free.pop(min(fits, key=lambda i: len(self._free[i])))
+        else:
+            buffer = np.empty(max(n, MIN_BUFFER), dtype=self.dtype)
+            self.allocations += 1
+            tracing.count(bytes_allocated=buffer.nbytes)
+        view = buffer[:n]
+        if zero:
+            view.fill(0)
+        return view
+
+    def give(self, view):
+        """Return a buffer lent by take()"""
+        self._free.append(view if view.base is None else view.base)
+
+    @contextmanager
+    def borrow(self, *sizes, zero=False):
+        """Lend one buffer per size for the duration of a with block"""
+        views = [self.take(n, zero) for n in sizes]
+        try:
+            yield views[0] if len(views) == 1 else views
+        finally:
+            for view in views:
+                self.give(view)
+
+    def ramp(self, n):
+        """Read-only view of 0, 1, ..., n-1 in the arena dtype"""
+        if len(self._ramp) < n:
+            self._ramp = np.arange(max(n, 2 * len(self._ramp)), dtype=self.dtype)
+        view = self._ramp[:n]
+        view.flags.writeable = False
+        return view
+
+    def standard_normal(self, rng, out):
+        """Fill out with rng's standard normal draws, identical in either precision
+
+        Generator.standard_normal uses a different algorithm for float32, so
+        float32 buffers take the float64 draws instead of changing the noise.
+        """
+        if out.dtype == np.float64:
+            return rng.standard_normal(out=out)
+        out[:] = rng.standard_normal(len(out))
+        return out
+
+    def linspace(self, out, start, stop):
+        """Fill out like np.linspace(start, stop, len(out)), without a temporary"""
+        n = len(out)
+        with tracing.span('linspace', 'arena', samples=n):
+            if n == 1:
+                out[0] = start
+            elif n > 1:
+                np.multiply(self.ramp(n), (stop - start) / (n - 1), out=out)
+                out += start
+                out[-1] = stop
+        return out
+
+class Pcm16Converter:
+    """Float samples in [-1, 1] to 16-bit PCM bytes, one fixed-size chunk at a time
+
+    Without dither the conversion truncates like np.array(x * 32767, int16).
+    With dither, triangular (TPDF) noise of +-1 LSB from a fixed seed is
+    added before rounding, so quantization error is signal-independent and
+    builds stay reproducible.
+    """
+
+    def __init__(self, dtype='float64', chunk_size=DEFAULT_CHUNK_SIZE, dither=False, seed=0):
+        self.chunk_size = chunk_size
+        self.dither = dither
+        self._scaled = np.empty(chunk_size, dtype=dtype)
+        self._noise = np.empty(chunk_size, dtype=dtype)
+        self._pcm = np.empty(chunk_size, dtype=np.int16)
+        self._rng = np.random.default_rng(seed)
+
+    def frames(self, samples):
+        """Yield the int16 frames of samples as bytes-like chunks
+
+        Each chunk is only valid until the next one is produced.
+        """
+        for start in range(0, len(samples), self.chunk_size):
+            chunk = samples[start:start + self.chunk_size]
+            n = len(chunk)
+            scaled, pcm = self._scaled[:n], self._pcm[:n]
+            with tracing.span('pcm16', 'convert', samples=n):
+                np.multiply(chunk, 32767, out=scaled)
+                if self.dither:
+                    noise = self._noise[:n]
+                    self._rng.random(dtype=noise.dtype, out=noise)
+                    scaled += noise
+                    self._rng.random(dtype=noise.dtype, out=noise)
+                    scaled -= noise
+                    np.rint(scaled, out=scaled)
+                    np.clip(scaled, -32768, 32767, out=scaled)
+                np.copyto(pcm, scaled, casting='unsafe')
+            yield memoryview(pcm).cast('B')
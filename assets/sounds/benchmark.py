@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Benchmark and memory-profile the audio generators
+Times every generate_* target over repeated runs in a scratch directory,
+records throughput (output samples per second) and peak traced memory,
+writes JSON results and fails when a target regresses past a stored baseline
+"""
+
+import argparse
+import functools
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+
+import numpy as np
+
+import arena
+import encoders
+import generate_audio_files as generators
+
+BASELINE_FILE = os.path.join(generators.SOURCE_DIR, 'benchmark_baseline.json')
+
+# Exit status of a first run: there was no baseline, so these results became it and nothing was compared
+EXIT_BASELINE_CREATED = 3
+
+DEFAULT_REPEAT = 5
+DEFAULT_MAX_SLOWDOWN = 0.25
+DEFAULT_MAX_MEMORY_GROWTH = 0.10
+
+# Every engine must reproduce the first engine's output to this quality
+DEFAULT_MIN_SNR_DB = 60.0
+
+def default_engine(name):
+    """The generator as the build runs it"""
+    return generators.GENERATORS[name][0]
+
+def uncached_engine(name):
+    """The generator with the voice cache disabled"""
+    func = default_engine(name)
+
+    def run():
+        max_bytes = generators.VOICE_CACHE.max_bytes
+        generators.VOICE_CACHE.max_bytes = 0
+        try:
+            func()
+        finally:
+            generators.VOICE_CACHE.max_bytes = max_bytes
+    return run
+
+def peak_bound_engine(name):
+    """Single-pass ambient render normalized by the analytic peak bound"""
+    if name != 'ambient_music':
+        return None
+    return functools.partial(generators.generate_ambient_sound, normalize='bound')
+
+def sharded_engine(name):
+    """Ambient render split into time shards across every core"""
+    if name != 'ambient_music':
+        return None
+    return functools.partial(generators.generate_ambient_sound, workers=os.cpu_count() or 1)
+
+def float32_engine(name):
+    """The generator rendering into a float32 buffer arena"""
+    func = default_engine(name)
+    float32_arena = arena.BufferArena('float32')
+
+    def run():
+        previous = generators.ARENA
+        generators.ARENA = float32_arena
+        try:
+            func()
+        finally:
+            generators.ARENA = previous
+    return run
+
+# Alternative implementations to compare: name -> factory returning a
+# zero-argument callable for a target, or None if it does not apply
+ENGINES = {
+    'default': default_engine,
+    'no-voice-cache': uncached_engine,
+    'peak-bound': peak_bound_engine,
+    'sharded': sharded_engine,
+    'float32': float32_engine,
+}
+
+def output_samples(filename):
+    """Number of frames written to a WAV file"""
+    with wave.open(filename, 'r') as wav_file:
+        return wav_file.getnframes()
+
+def matched_snr_db(reference, output):
+    """SNR of output against reference after least-squares gain matching
+
+    Engines may legitimately normalize differently (e.g. peak-bound), so
+    only the error left after the best overall gain counts as noise.
+    """
+    if len(reference) != len(output):
+        return -math.inf
+    energy = np.dot(output, output)
+    gain = np.dot(reference, output) / energy if energy > 0 else 0.0
+    return encoders.snr_db(reference, gain * output)
+
+def run_cold(func):
+    """Run a generator from an empty voice cache, like a fresh build worker"""
+    generators.VOICE_CACHE.clear()
+    func()
+
+def measure(name, func, repeat=DEFAULT_REPEAT):
+    """Time one target repeat times (after a warm-up run) and trace its peak memory"""
+    filename = generators.GENERATORS[name][1]
+    run_cold(func)  # Warm-up: imports, wavetables, page faults
+    samples = output_samples(filename)
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run_cold(func)
+        times.append(time.perf_counter() - start)
+
+    # Separate traced run: tracemalloc slows allocation-heavy code down
+    tracemalloc.start()
+    try:
+        run_cold(func)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    median = statistics.median(times)
+    return {
+        'runs': repeat,
+        'median_s': round(median, 6),
+        'min_s': round(min(times), 6),
+        'stdev_s': round(statistics.stdev(times), 6) if repeat > 1 else 0.0,
+        'samples': samples,
+        'samples_per_s': round(samples / median) if median > 0 else None,
+        'peak_bytes': peak,
+    }
+
+def run_benchmarks(names=None, engines=('default',), repeat=DEFAULT_REPEAT):
+    """Benchmark targets for each engine in a scratch directory; returns the results document
+
+    The output of every engine after the first is compared with the first
+    engine's output for the same target (snr_db).
+    """
+    names = list(names or generators.GENERATORS)
+    results = {}
+    references = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='audio-bench-') as scratch:
+        os.chdir(scratch)
+        try:
+            for engine in engines:
+                results[engine] = {}
+                for name in names:
+                    func = ENGINES[engine](name)
+                    if func is None:
+                        continue
+                    result = measure(name, func, repeat)
+                    output, _ = encoders.read_pcm16(generators.GENERATORS[name][1])
+                    quality = ''
+                    if name in references:
+                        result['snr_db'] = round(matched_snr_db(references[name], output), 2)
+                        quality = f"  {result['snr_db']:6.1f} dB SNR"
+                    elif engine == engines[0]:
+                        references[name] = output
+                    results[engine][name] = result
+                    print(f"✓ {engine:<16} {name:<18} {result['median_s'] * 1000:9.2f} ms  "
+                          f"{result['samples_per_s'] / 1e6:7.2f} Msamples/s  "
+                          f"{result['peak_bytes'] / 2**20:7.2f} MiB peak{quality}")
+        finally:
+            os.chdir(cwd)
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+def compare_engines(document, reference='default'):
+    """Print each engine's median time relative to the reference engine"""
+    results = document['results']
+    if reference not in results or len(results) < 2:
+        return
+    print(f"\nSpeedup over {reference}:")
+    for engine, targets in results.items():
+        if engine == reference:
+            continue
+        for name, result in targets.items():
+            base = results[reference].get(name)
+            if base:
+                print(f"  {engine:<16} {name:<18} {base['median_s'] / result['median_s']:6.2f}x  "
+                      f"memory {result['peak_bytes'] / max(base['peak_bytes'], 1):6.2f}x")
+
+def find_quality_failures(document, min_snr_db=DEFAULT_MIN_SNR_DB):
+    """Describe every engine output further from the first engine's than min_snr_db allows"""
+    return [f"{engine}/{name}: {result['snr_db']:.1f} dB SNR against the reference output"
+            for engine, targets in document['results'].items()
+            for name, result in targets.items()
+            if result.get('snr_db', math.inf) < min_snr_db]
+
+def find_regressions(document, baseline, max_slowdown=DEFAULT_MAX_SLOWDOWN,
+                     max_memory_growth=DEFAULT_MAX_MEMORY_GROWTH):
+    """Describe every target missing from the baseline, or slower or hungrier than it by more than the thresholds"""
+    regressions = []
+    for engine, targets in document['results'].items():
+        for name, result in targets.items():
+            base = baseline.get('results', {}).get(engine, {}).get(name)
+            if base is None:
+                # An unchecked target would pass silently; record a baseline that covers it
+                regressions.append(f"{engine}/{name}: not in the baseline")
+                continue
+            # Best-of-N is the least noisy estimate on a shared build box
+            slowdown = result['min_s'] / base['min_s'] - 1
+            if slowdown > max_slowdown:
+                regressions.append(f"{engine}/{name}: {slowdown:+.0%} time "
+                                   f"({base['min_s']:.4f}s -> {result['min_s']:.4f}s)")
+            growth = result['peak_bytes'] / max(base['peak_bytes'], 1) - 1
+            if growth > max_memory_growth:
+                regressions.append(f"{engine}/{name}: {growth:+.0%} peak memory "
+                                   f"({base['peak_bytes']} -> {result['peak_bytes']} bytes)")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--only', action='append', choices=sorted(generators.GENERATORS), metavar='NAME',
+                        help='benchmark only this target (repeatable)')
+    parser.add_argument('--engine', action='append', choices=sorted(ENGINES),
+                        help='implementation to benchmark (repeatable, default: default)')
+    parser.add_argument('--repeat', '-n', type=int, default=DEFAULT_REPEAT,
+                        help='timed runs per target (default: %(default)s)')
+    parser.add_argument('--min-snr', type=float, default=DEFAULT_MIN_SNR_DB,
+                        help='required output SNR of each engine against the first one (default: %(default)s)')
+    parser.add_argument('--output', '-o', help='write JSON results to this file')
+    parser.add_argument('--baseline', default=BASELINE_FILE,
+                        help='baseline results to check against; created from this run if missing (default: %(default)s)')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store these results as the new baseline instead of checking')
+    parser.add_argument('--max-slowdown', type=float, default=DEFAULT_MAX_SLOWDOWN,
+                        help='allowed best-of-N time increase as a fraction (default: %(default)s)')
+    parser.add_argument('--max-memory-growth', type=float, default=DEFAULT_MAX_MEMORY_GROWTH,
+                        help='allowed peak memory increase as a fraction (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    engines = args.engine or ['default']
+    document = run_benchmarks(args.only, engines, args.repeat)
+    compare_engines(document, engines[0])
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    failures = find_quality_failures(document, args.min_snr)
+    if failures:
+        print("\nOutput quality below threshold:")
+        for line in failures:
+            print(f"  ✗ {line}")
+        return 1
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    # Timings only compare on the machine that recorded them, so the first run there records the baseline
+    if not os.path.exists(args.baseline):
+        with open(args.baseline, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f"\n· No baseline at {args.baseline}; saved these results as the baseline, "
+              f"later runs are checked against it (exit status {EXIT_BASELINE_CREATED})")
+        return EXIT_BASELINE_CREATED
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = find_regressions(document, baseline, args.max_slowdown, args.max_memory_growth)
+    if regressions:
+        print("\nRegressions against baseline:")
+        for line in regressions:
+            print(f"  ✗ {line}")
+        return 1
+    print("\n✓ No regressions against baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
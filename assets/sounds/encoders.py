@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Compact audio encoders for the generated assets
+A vectorized anti-alias resampler plus pluggable WAV encoders (16-bit PCM
+and IMA-ADPCM), used to emit several variants of a sound and keep the
+smallest one whose round-trip SNR passes a threshold. Everything streams
+in blocks, so re-encoding a long track takes bounded memory
+"""
+
+import math
+import os
+import struct
+import wave
+
+import numpy as np
+
+import tracing
+
+# IMA-ADPCM tables (Intel/DVI reference)
+ADPCM_STEPS = np.array([
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230,
+    253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963,
+    1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327,
+    3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442,
+    11487, 12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794,
+    32767,
+], dtype=np.int32)
+ADPCM_INDEX_SHIFT = np.array([-1, -1, -1, -1, 2, 4, 6, 8] * 2, dtype=np.int32)
+
+# Mono block layout: 4-byte header (first sample + step index) then 4-bit codes
+ADPCM_BLOCK_ALIGN = 1024
+ADPCM_SAMPLES_PER_BLOCK = (ADPCM_BLOCK_ALIGN - 4) * 2 + 1
+WAVE_FORMAT_IMA_ADPCM = 0x0011
+
+# Frames read per block when re-encoding a file
+STREAM_BLOCK = 1 << 16
+
+# Codec blocks encoded together: the encoder steps through a block sample by
+# sample, vectorized across blocks, so small batches cost Python overhead
+ADPCM_BATCH_BLOCKS = 128
+
+def _resampling_filter(up, down, half_taps, beta):
+    """Kaiser-windowed sinc polyphase bank: one row of taps per output phase"""
+    cutoff = 0.5 * min(1.0, up / down) * 0.95  # in cycles per input sample
+    reach = math.ceil(half_taps / min(1.0, up / down))
+    offsets = np.arange(-reach + 1, reach + 1)
+    t = offsets[None, :] - np.arange(up)[:, None] / up
+    window = np.i0(beta * np.sqrt(np.clip(1 - (t / reach) ** 2, 0, 1))) / np.i0(beta)
+    return offsets, 2 * cutoff * np.sinc(2 * cutoff * t) * window
+
+def _polyphase(x, x_start, n0, n1, up, down, offsets, bank):
+    """Outputs n0..n1-1 of the resampler from x, where x[0] is input sample x_start
+
+    Outputs that share a filter phase are evenly spaced in both output and
+    input, so each phase is one matrix-vector product of its taps with a
+    strided sliding-window view of the input (no per-sample gather).
+    """
+    out = np.zeros(n1 - n0)
+    windows = np.lib.stride_tricks.sliding_window_view(x, len(offsets))
+    # Output n = first + k * up sits at input position n * down / up
+    for first in range(n0, min(n0 + up, n1)):
+        count = len(range(first, n1, up))
+        start = first * down // up + offsets[0] - x_start
+        out[first - n0::up] = windows[start:start + (count - 1) * down + 1:down] @ bank[first * down % up]
+    return out
+
+class Resampler:
+    """Streaming resample(): push input blocks, get back the output they complete
+
+    Only the input still under a pending output's filter window is kept, so
+    memory is bounded by the block and filter sizes, not the signal length.
+    The concatenated outputs equal resample() of the concatenated input.
+    """
+
+    def __init__(self, src_rate, dst_rate, half_taps=16, beta=8.6):
+        divisor = math.gcd(src_rate, dst_rate)
+        self.up, self.down = dst_rate // divisor, src_rate // divisor
+        self.offsets, self.bank = _resampling_filter(self.up, self.down, half_taps, beta)
+        self.buffer = np.zeros(-self.offsets[0])  # Zeros before the signal
+        self.buffer_start = self.offsets[0]  # Input index of buffer[0]
+        self.position = 0  # Next output index
+        self.total = 0  # Input samples pushed so far
+
+    def output_length(self, input_length):
+        """Output samples for an input of input_length samples"""
+        return -(-input_length * self.up // self.down)
+
+    def _emit(self, end):
+        if end <= self.position:
+            return np.zeros(0)
+        out = _polyphase(self.buffer, self.buffer_start, self.position, end,
+                         self.up, self.down, self.offsets, self.bank)
+        self.position = end
+        drop = end * self.down // self.up + self.offsets[0] - self.buffer_start
+        self.buffer = self.buffer[drop:]
+        self.buffer_start += drop
+        return out
+
+    def process(self, block):
+        """Push input samples; returns the outputs whose filter windows are now complete"""
+        if self.up == self.down:
+            return np.asarray(block, dtype=np.float64)
+        self.buffer = np.concatenate([self.buffer, block])
+        self.total += len(block)
+        # Output n needs input up to n * down // up + offsets[-1]
+        reach = (self.total - self.offsets[-1]) * self.up - 1
+        return self._emit(max(self.position, reach // self.down + 1 if reach >= 0 else 0))
+
+    def flush(self):
+        """Remaining outputs, treating the input after the last block as silence"""
+        if self.up == self.down:
+            return np.zeros(0)
+        self.buffer = np.concatenate([self.buffer, np.zeros(len(self.offsets) + self.down)])
+        return self._emit(self.output_length(self.total))
+
+def resample(samples, src_rate, dst_rate, half_taps=16, beta=8.6):
+    """Band-limited rational resampling of a 1-D signal (polyphase windowed sinc)"""
+    resampler = Resampler(src_rate, dst_rate, half_taps, beta)
+    return np.concatenate([resampler.process(samples), resampler.flush()])
+
+def to_int16(samples):
+    """Float [-1, 1] to int16, truncating like write_wav and clipping overshoot"""
+    return np.array(np.clip(samples, -1, 1) * 32767, dtype=np.int16)
+
+class Pcm16Writer:
+    """Stream float blocks into a 16-bit PCM WAV file"""
+
+    def __init__(self, path, sample_rate, frames):
+        self.wav_file = wave.open(path, 'w')
+        self.wav_file.setnchannels(1)  # Mono
+        self.wav_file.setsampwidth(2)  # 16-bit
+        self.wav_file.setframerate(sample_rate)
+        self.wav_file.setnframes(frames)
+
+    @staticmethod
+    def file_bytes(frames):
+        return 44 + 2 * frames
+
+    def write(self, block):
+        """Encode a block; returns it decoded"""
+        pcm = to_int16(block)
+        self.wav_file.writeframesraw(pcm.tobytes())
+        return pcm / 32767
+
+    def close(self):
+        """Finish the file; returns any samples decoded only now (none for PCM)"""
+        self.wav_file.close()
+        return np.zeros(0)
+
+def adpcm_encode(pcm):
+    """IMA-ADPCM encode int16 samples into mono WAV blocks
+
+    The codec is a sequential recurrence within a block, but blocks restart
+    from their header, so all blocks are encoded at once in lockstep.
+    Returns (block bytes, decoded int16 samples).
+    """
+    n_blocks = max(1, -(-len(pcm) // ADPCM_SAMPLES_PER_BLOCK))
+    padded = np.zeros(n_blocks * ADPCM_SAMPLES_PER_BLOCK, dtype=np.int32)
+    padded[:len(pcm)] = pcm
+    blocks = padded.reshape(n_blocks, ADPCM_SAMPLES_PER_BLOCK)
+
+    predictor = blocks[:, 0].copy()
+    index = np.zeros(n_blocks, dtype=np.int32)
+    codes = np.empty((n_blocks, ADPCM_SAMPLES_PER_BLOCK - 1), dtype=np.uint8)
+    decoded = np.empty_like(blocks)
+    decoded[:, 0] = predictor
+
+    for i in range(1, ADPCM_SAMPLES_PER_BLOCK):
+        step = ADPCM_STEPS[index]
+        diff = blocks[:, i] - predictor
+        code = np.where(diff < 0, 8, 0)
+        diff = np.abs(diff)
+        delta = step >> 3
+        for bit, scale in ((4, 0), (2, 1), (1, 2)):
+            hit = diff >= (step >> scale)
+            code |= np.where(hit, bit, 0)
+            diff -= np.where(hit, step >> scale, 0)
+            delta += np.where(hit, step >> scale, 0)
+        predictor = np.clip(predictor + np.where(code & 8, -delta, delta), -32768, 32767)
+        index = np.clip(index + ADPCM_INDEX_SHIFT[code], 0, 88)
+        codes[:, i - 1] = code
+        decoded[:, i] = predictor
+
+    # Header (predictor, index, reserved) of each block, using the first sample
+    header = np.zeros((n_blocks, 4), dtype=np.uint8)
+    header[:, :2] = blocks[:, :1].astype('<i2').view(np.uint8)
+    nibbles = codes[:, 0::2] | (codes[:, 1::2] << 4)  # Low nibble first
+    data = np.concatenate([header, nibbles], axis=1)
+    return data.tobytes(), decoded.ravel()[:len(pcm)].astype(np.int16)
+
+def _adpcm_data_bytes(frames):
+    return max(1, -(-frames // ADPCM_SAMPLES_PER_BLOCK)) * ADPCM_BLOCK_ALIGN
+
+def _adpcm_header(sample_rate, frames):
+    """RIFF, fmt, fact and data chunk headers of a mono IMA-ADPCM WAV of frames samples"""
+    data_bytes = _adpcm_data_bytes(frames)
+    fmt = struct.pack('<HHIIHHHH', WAVE_FORMAT_IMA_ADPCM, 1, sample_rate,
+                      sample_rate * ADPCM_BLOCK_ALIGN // ADPCM_SAMPLES_PER_BLOCK,
+                      ADPCM_BLOCK_ALIGN, 4, 2, ADPCM_SAMPLES_PER_BLOCK)
+    chunks = [
+        b'fmt ' + struct.pack('<I', len(fmt)) + fmt,
+        b'fact' + struct.pack('<II', 4, frames),
+        b'data' + struct.pack('<I', data_bytes),
+    ]
+    body_bytes = 4 + sum(len(chunk) for chunk in chunks) + data_bytes
+    return b'RIFF' + struct.pack('<I', body_bytes) + b'WAVE' + b''.join(chunks)
+
+class AdpcmWriter:
+    """Stream float blocks into an IMA-ADPCM WAV file, one whole codec block at a time"""
+
+    def __init__(self, path, sample_rate, frames):
+        self.file = open(path, 'wb')
+        self.file.write(_adpcm_header(sample_rate, frames))
+        self.pending = np.zeros(0, dtype=np.int16)
+        self.blocks = 0
+
+    @staticmethod
+    def file_bytes(frames):
+        return len(_adpcm_header(0, frames)) + _adpcm_data_bytes(frames)
+
+    def _encode(self, pcm):
+        data, decoded = adpcm_encode(pcm)
+        self.file.write(data)
+        self.blocks += len(data) // ADPCM_BLOCK_ALIGN
+        return decoded / 32767
+
+    def write(self, block):
+        """Buffer a block; once ADPCM_BATCH_BLOCKS codec blocks are ready, encode and return them decoded"""
+        self.pending = np.concatenate([self.pending, to_int16(block)])
+        if len(self.pending) < ADPCM_BATCH_BLOCKS * ADPCM_SAMPLES_PER_BLOCK:
+            return np.zeros(0)
+        whole = len(self.pending) // ADPCM_SAMPLES_PER_BLOCK * ADPCM_SAMPLES_PER_BLOCK
+        pcm, self.pending = self.pending[:whole], self.pending[whole:]
+        return self._encode(pcm)
+
+    def close(self):
+        """Encode the final, zero-padded block; returns its decoded samples"""
+        decoded = self._encode(self.pending) if len(self.pending) or not self.blocks else np.zeros(0)
+        self.file.close()
+        return decoded
+
+# Streaming encoders by format name
+ENCODERS = {
+    'pcm16': Pcm16Writer,
+    'adpcm': AdpcmWriter,
+}
+
+def snr_db(reference, decoded):
+    """Signal-to-noise ratio of decoded against reference in dB"""
+    noise = np.sum((reference - decoded) ** 2)
+    if noise == 0:
+        return math.inf
+    return 10 * math.log10(np.sum(reference ** 2) / noise)
+
+class SnrMeter:
+    """Streaming snr_db(): feed the reference and the decoded signal in blocks of any size
+
+    Decoded samples past the end of the reference are ignored.
+    """
+
+    def __init__(self):
+        self.pending = ([], [])  # Unmatched reference and decoded blocks
+        self.signal = 0.0
+        self.noise = 0.0
+
+    def add(self, reference=(), decoded=()):
+        for queue, block in zip(self.pending, (reference, decoded)):
+            if len(block):
+                queue.append(block)
+        references, decodeds = self.pending
+        while references and decodeds:
+            n = min(len(references[0]), len(decodeds[0]))
+            ref, dec = references[0][:n], decodeds[0][:n]
+            self.signal += float(np.dot(ref, ref))
+            self.noise += float(np.dot(ref - dec, ref - dec))
+            for queue in self.pending:
+                queue[0] = queue[0][n:]
+                if not len(queue[0]):
+                    queue.pop(0)
+
+    def snr_db(self):
+        if self.noise == 0:
+            return math.inf
+        return 10 * math.log10(self.signal / self.noise)
+
+def read_pcm16(filename):
+    """Read a 16-bit mono PCM WAV file as floats in [-1, 1]"""
+    with wave.open(filename, 'r') as wav_file:
+        if wav_file.getnchannels() != 1 or wav_file.getsampwidth() != 2:
+            raise ValueError(f"{filename}: expected 16-bit mono PCM")
+        frames = wav_file.readframes(wav_file.getnframes())
+        return np.frombuffer(frames, dtype=np.int16) / 32767, wav_file.getframerate()
+
+def encode_variant(filename, path, name, rate, block_frames=STREAM_BLOCK):
+    """Stream a 16-bit mono PCM WAV into one (format, rate) variant at path
+
+    The decoded variant is resampled back to the source rate as it goes, so
+    the returned round-trip SNR accounts for both lost bandwidth and codec
+    noise.
+    """
+    with wave.open(filename, 'r') as source:
+        if source.getnchannels() != 1 or source.getsampwidth() != 2:
+            raise ValueError(f"{filename}: expected 16-bit mono PCM")
+        source_rate = source.getframerate()
+        down, up = Resampler(source_rate, rate), Resampler(rate, source_rate)
+        encoder = ENCODERS[name](path, rate, down.output_length(source.getnframes()))
+        meter = SnrMeter()
+        while frames := source.readframes(block_frames):
+            block = np.frombuffer(frames, dtype=np.int16) / 32767
+            meter.add(reference=block, decoded=up.process(encoder.write(down.process(block))))
+        meter.add(decoded=up.process(encoder.write(down.flush())))
+        meter.add(decoded=up.process(encoder.close()))
+        meter.add(decoded=up.flush())
+    return meter.snr_db()
+
+def compact_wav(filename, rates=None, formats=('pcm16',), min_snr_db=40.0):
+    """Replace a PCM WAV with its smallest variant passing min_snr_db
+
+    Variants are tried from the smallest file up and the first one that
+    passes wins, so most candidates are never encoded; the file itself is
+    the lossless fallback. Each is streamed in blocks, so memory does not
+    grow with the track. Returns the chosen variant's metadata.
+    """
+    with wave.open(filename, 'r') as wav_file:
+        sample_rate, frames = wav_file.getframerate(), wav_file.getnframes()
+    original = {'format': 'pcm16', 'sample_rate': sample_rate, 'bytes': os.path.getsize(filename),
+                'snr_db': math.inf}
+    candidates = []
+    for rate in set(rates or []) | {sample_rate}:
+        length = Resampler(sample_rate, rate).output_length(frames)
+        candidates += [(ENCODERS[name].file_bytes(length), rate, name) for name in formats
+                       if (rate, name) != (sample_rate, 'pcm16')]
+
+    tmp_path = filename + '.tmp'
+    for size, rate, name in sorted(candidates):
+        if size >= original['bytes']:
+            break
+        with tracing.span('encode_variant', 'encode', format=name, rate=rate, samples=frames):
+            quality = encode_variant(filename, tmp_path, name, rate)
+        if quality >= min_snr_db:
+            os.replace(tmp_path, filename)
+            return {'format': name, 'sample_rate': rate, 'bytes': os.path.getsize(filename), 'snr_db': quality}
+        os.remove(tmp_path)
+    return original
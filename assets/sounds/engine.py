@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Vectorized event-table synthesis engine
+Renders every note of one instrument in a single batched pass: notes are laid
+out as rows of a padded (notes x samples) time matrix, the instrument is
+evaluated on the whole matrix at once, and the rows are scatter-added into
+the output buffer with np.bincount
+"""
+
+import inspect
+
+import numpy as np
+
+import tracing
+
+# One row per note event
+EVENT_DTYPE = np.dtype([
+    ('start', 'f8'),        # seconds
+    ('duration', 'f8'),     # seconds
+    ('freq', 'f8'),         # Hz (0 for unpitched instruments)
+    ('instrument', 'U16'),  # key into the instrument registry
+    ('gain', 'f8'),         # linear gain applied on top of the instrument level
+    ('seed', 'i8'),         # noise seed for noisy instruments
+])
+
+EVENT_DEFAULTS = {'freq': 0.0, 'gain': 1.0, 'seed': 0}
+
+# Upper bound on padded matrix cells per batch (~8 MB per float64 temporary)
+MAX_BATCH_SAMPLES = 1 << 20
+
+def event_table(notes):
+    """Build a structured event table from note dicts"""
+    events = np.zeros(len(notes), dtype=EVENT_DTYPE)
+    for field in EVENT_DTYPE.names:
+        events[field] = [note.get(field, EVENT_DEFAULTS.get(field)) for note in notes]
+    return events
+
+def event_spans(events, sample_rate=44100):
+    """Return the start and end sample (exclusive) of every event"""
+    start_samples = (events['start'] * sample_rate).astype(np.int64)
+    end_samples = ((events['start'] + events['duration']) * sample_rate).astype(np.int64)
+    return start_samples, end_samples
+
+# Per-note sample axes an instrument may take besides t_note: the sample index
+# within the note and the note's length in samples (for sample-count envelopes)
+NOTE_AXES = ('j_note', 'n_note')
+
+def instrument_fields(instrument):
+    """Event fields an instrument takes as keyword arguments besides t_note"""
+    return [name for name in inspect.signature(instrument).parameters
+            if name != 't_note' and name in EVENT_DTYPE.names]
+
+def instrument_axes(instrument):
+    """NOTE_AXES an instrument takes as keyword arguments"""
+    return [name for name in inspect.signature(instrument).parameters if name in NOTE_AXES]
+
+def _batches(lengths, max_batch_samples):
+    """Split rows (sorted by ascending length) into runs that fit the batch budget"""
+    first = 0
+    for i, length in enumerate(lengths):
+        if i > first and (i + 1 - first) * length > max_batch_samples:
+            yield first, i
+            first = i
+    if first < len(lengths):
+        yield first, len(lengths)
+
+def event_offsets(events, start_samples, sample_rate=44100):
+    """Sub-sample start offset of each event in [0, 1) samples
+
+    Quantized so that notes landing on the same fraction of a sample render
+    identically and can share a cached voice.
+    """
+    return np.round(events['start'] * sample_rate - start_samples, 6)
+
+def _render_rows(instrument, fields, events, rows, lengths, offsets, sample_rate, start_samples, sample_period):
+    """Evaluate an instrument on a padded (rows x longest) note-time matrix"""
+    j = np.arange(lengths[rows].max())
+    if sample_period is None:
+        t_note = (j - offsets[rows, None]) / sample_rate
+    else:
+        # Track time k * sample_period, as when slicing np.linspace(0, duration, n), minus the note start
+        t_note = (start_samples[rows, None] + j) * sample_period - events['start'][rows, None]
+    params = {field: events[field][rows, None] for field in fields}
+    axes = instrument_axes(instrument)
+    if 'j_note' in axes:
+        params['j_note'] = j
+    if 'n_note' in axes:
+        params['n_note'] = lengths[rows, None]
+    return instrument(t_note=t_note, **params)
+
+def _scatter(out, index, weights):
+    """Scatter-add weights into out at index, dropping samples outside out"""
+    keep = (index >= 0) & (index < len(out))
+    index = index[keep]
+    if len(index):
+        # Accumulate into just the span the notes touch
+        lo = index.min()
+        mixed = np.bincount(index - lo, weights=weights[keep])
+        out[lo:lo + len(mixed)] += mixed
+
+def _voice_key(name, fields, events, row, length, offset):
+    return (name, length, float(offset)) + tuple(events[field][row].item() for field in fields)
+
+def render_events(events, instruments, out, offset=0, sample_rate=44100,
+                  max_batch_samples=MAX_BATCH_SAMPLES, cache=None, sample_period=None):
+    """Mix events into out, where out[0] is sample number `offset` of the track
+
+    Samples falling outside out are dropped. With a voices.VoiceCache, each
+    distinct voice is rendered once (in batches) and reused from the cache.
+    sample_period sets the track time of sample k to k * sample_period
+    instead of k / sample_rate; a note's voice then depends on where it
+    starts, so it cannot be combined with a cache. Returns out.
+    """
+    if sample_period is not None and cache is not None:
+        raise ValueError("voices rendered with a sample_period cannot be cached")
+    start_samples, end_samples = event_spans(events, sample_rate)
+    lengths = end_samples - start_samples
+    offsets = event_offsets(events, start_samples, sample_rate)
+
+    for name in np.unique(events['instrument']):
+        instrument = instruments[str(name)]
+        fields = instrument_fields(instrument)
+
+        # Group similar lengths together to keep padding small
+        rows = np.flatnonzero((events['instrument'] == name) & (lengths > 0))
+        rows = rows[np.argsort(lengths[rows], kind='stable')]
+
+        with tracing.span(str(name), 'instrument', notes=len(rows)):
+            if cache is None:
+                for lo, hi in _batches(lengths[rows], max_batch_samples):
+                    batch = rows[lo:hi]
+                    values = _render_rows(instrument, fields, events, batch, lengths, offsets, sample_rate,
+                                          start_samples, sample_period)
+                    j = np.arange(values.shape[1])
+                    inside = j < lengths[batch, None]
+                    _scatter(out, (start_samples[batch, None] - offset + j)[inside],
+                             (values * events['gain'][batch, None])[inside])
+                continue
+
+            # Look every voice up, then batch-render the distinct misses
+            keys = {row: _voice_key(str(name), fields, events, row, lengths[row], offsets[row])
+                    for row in rows.tolist()}
+            voices = {}
+            missing = []
+            for row, key in keys.items():
+                if key in voices:
+                    cache.hits += 1  # Served by a render already scheduled in this call
+                    continue
+                voices[key] = cache.lookup(key)
+                if voices[key] is None:
+                    missing.append(row)
+
+            missing = np.array(missing, dtype=np.int64)
+            for lo, hi in _batches(lengths[missing], max_batch_samples):
+                batch = missing[lo:hi]
+                values = _render_rows(instrument, fields, events, batch, lengths, offsets, sample_rate,
+                                      start_samples, None)
+                for row, voice in zip(batch.tolist(), values):
+                    voices[keys[row]] = cache.put(keys[row], voice[:lengths[row]].copy())
+
+            row_lengths = lengths[rows]
+            starts = np.repeat(start_samples[rows] - offset, row_lengths)
+            within = np.arange(row_lengths.sum()) - np.repeat(np.cumsum(row_lengths) - row_lengths, row_lengths)
+            weights = np.concatenate([voices[key] for key in keys.values()]) * np.repeat(events['gain'][rows], row_lengths)
+            _scatter(out, starts + within, weights)
+
+    return out
+
+def render(events, instruments, total_samples, sample_rate=44100, cache=None, dtype=np.float64):
+    """Render an event table into a new buffer of total_samples"""
+    return render_events(events, instruments, np.zeros(total_samples, dtype), 0, sample_rate, cache=cache)
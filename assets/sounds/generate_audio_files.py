@@ -1,125 +1,151 @@
 #!/usr/bin/env python3
 """
 Generate audio files for the Whack-a-Mole game
-This script creates WAV files that replicate the Web Audio API sounds
+This script creates WAV files that replicate the Web Audio API sounds. The
+short effects and their variation banks are rendered from sound_specs.toml
+(see soundspec.py); the music is rendered by the note engine.
 """
 
+import argparse
+import contextlib
+import hashlib
+import inspect
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+
 import numpy as np
 import wave
 import struct
 import math
 
+import arena
+import convolution
+import encoders
+import engine
+import oscillators
+import pack_sprites
+import sharding
+import soundspec
+import streaming
+import tracing
+import variations
+import voices
+
+# Build cache manifest, stored next to the generated WAV files
+CACHE_MANIFEST = '.audio_cache.json'
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Rendered notes shared by every note-based generator in this process
+VOICE_CACHE = voices.VoiceCache()
+
+# Scratch buffers the generators render into; its dtype is the build precision
+ARENA = arena.BufferArena('float64')
+
+# The short effects and their variation banks are rendered from these specs
+SPECS = soundspec.load_specs()
+
+# Worker processes for time-sharded rendering of long tracks (1 = stream serially)
+SHARD_WORKERS = 1
+
+# Candidate sample rates for assets that are re-encoded after rendering. The
+# smallest variant that passes the SNR threshold replaces the 44.1kHz PCM
+# file. Sprite sources (SFX) must stay 44.1kHz PCM, so only music and the
+# variation banks are listed. ambient_music is left out: it measures under
+# 34 dB at every lower rate, so trying them would only cost a second of
+# encoding per build. So is hammer_hit_variants, whose strike noise measures
+# about 20 dB even at 32kHz.
+BANK_RATES = [22050, 16000, 11025, 8000]
+OUTPUT_RATES = {
+    'background_music': [32000, 22050, 16000],
+    'hit_variants': BANK_RATES,
+    'mole_pop_variants': BANK_RATES,
+    'ting_variants': BANK_RATES,
+}
+DEFAULT_MIN_SNR_DB = 40.0
+
+# float32 renders must stay at least this close to the float64 render of the same target
+MIN_PRECISION_SNR_DB = 60.0
+
+# Extra renders for check_precision, covering the convolution reverb that no
+# default target uses: label -> (target, generator keyword arguments)
+PRECISION_EXTRAS = {
+    'hammer_hit+plate': ('hammer_hit', {'reverb_ir': 'plate'}),
+    'ting+room': ('ting', {'reverb_ir': 'room'}),
+    'ambient_music+hall': ('ambient_music', {'reverb_ir': 'hall'}),
+}
+
 def write_wav(filename, samples, sample_rate=44100):
     """Write samples to a WAV file"""
-    with wave.open(filename, 'w') as wav_file:
+    converter = arena.Pcm16Converter(samples.dtype, dither=samples.dtype == np.float32)
+    tracing.count(samples=len(samples))
+    with tracing.span('write_wav', 'io', file=filename), wave.open(filename, 'w') as wav_file:
         wav_file.setnchannels(1)  # Mono
         wav_file.setsampwidth(2)  # 16-bit
         wav_file.setframerate(sample_rate)
         
-        # Convert to 16-bit integers
-        samples_int = np.array(samples * 32767, dtype=np.int16)
-        wav_file.writeframes(samples_int.tobytes())
+        # Convert to 16-bit integers chunk by chunk (float32 renders are dithered)
+        for frames in converter.frames(samples):
+            with tracing.span('writeframes', 'io', bytes=len(frames)):
+                wav_file.writeframesraw(frames)
+
+@lru_cache(maxsize=None)
+def spec_program(name, sample_rate=44100):
+    """Compiled soundspec Program of one sound in SPECS, built on first use"""
+    return soundspec.compile_specs({name: SPECS[name]}, sample_rate)
+
+@contextlib.contextmanager
+def rendered(name, params=None, sample_rate=44100):
+    """Render a sound in SPECS for a variations grid (default: its original sound)
+
+    Yields an ARENA buffer of shape params.shape + (samples,) that is only
+    valid inside the with block. Each term is rendered once per pitch or
+    once per decay, so only the final mix is computed per variant.
+    """
+    renders = soundspec.render(spec_program(name, sample_rate), ARENA, params)
+    try:
+        yield next(renders)[1]
+    finally:
+        renders.close()
+
+def write_effect(name, reverb_ir=None, reverb_mix=0.25):
+    """Render a sound in SPECS and write it as name.wav
+
+    reverb_ir names a convolution.IMPULSE_RESPONSES space to add on top of the
+    sound (its decay extends the sound).
+    """
+    with rendered(name) as sound:
+        samples = sound[0, 0]
+        if reverb_ir:
+            # The convolution changes the level; bring the peak back to the dry one
+            peak = max(samples.max(), -samples.min())
+            samples = convolution.apply_reverb(samples, reverb_ir, reverb_mix)
+            samples *= peak / max(samples.max(), -samples.min())
+        
+        tracing.stage('write')
+        write_wav(name + '.wav', samples)
 
 def generate_hit_sound():
     """Generate hit sound effect - descending frequency sweep"""
-    sample_rate = 44100
-    duration = 0.1
-    t = np.linspace(0, duration, int(sample_rate * duration))
-    
-    # Frequency sweep from 800Hz to 400Hz
-    freq_start = 800
-    freq_end = 400
-    frequency = freq_start + (freq_end - freq_start) * t / duration
-    
-    # Generate sound with exponential decay
-    sound = np.sin(2 * np.pi * frequency * t)
-    envelope = np.exp(-t / 0.03)  # Exponential decay
-    sound = sound * envelope * 0.3
-    
-    write_wav('hit.wav', sound)
+    write_effect('hit')
 
 def generate_mole_pop_sound():
     """Generate mole pop sound - cute upward frequency sweep"""
-    sample_rate = 44100
-    duration = 0.15
-    t = np.linspace(0, duration, int(sample_rate * duration))
-    
-    # Frequency sweep from 400Hz to 800Hz to 300Hz
-    freq1 = 400 + 400 * np.sin(2 * np.pi * t / 0.03)
-    freq2 = 300 * np.ones_like(t)
-    frequency = np.where(t < 0.03, freq1, freq2)
-    
-    # Triangle wave for cute sound
-    sound = np.sin(2 * np.pi * frequency * t)
-    
-    # Bandpass filter effect (simplified)
-    envelope = np.exp(-t / 0.05)
-    sound = sound * envelope * 0.15
-    
-    write_wav('mole_pop.wav', sound)
+    write_effect('mole_pop')
 
 def generate_game_over_sound():
     """Generate game over sound - classic wah-wah-wah descending pattern"""
-    sample_rate = 44100
-    
-    # Three notes with gaps
-    notes = [
-        {'freq': 440, 'duration': 0.4},  # A4
-        {'freq': 370, 'duration': 0.4},  # F#4
-        {'freq': 294, 'duration': 0.8},  # D4
-    ]
-    
-    total_duration = sum(note['duration'] for note in notes) + 0.3 * (len(notes) - 1)
-    total_samples = int(sample_rate * total_duration)
-    sound = np.zeros(total_samples)
-    
-    sample_pos = 0
-    for i, note in enumerate(notes):
-        note_duration = note['duration']
-        note_samples = int(sample_rate * note_duration)
-        t = np.linspace(0, note_duration, note_samples)
-        
-        # Triangle wave with lowpass filter effect
-        note_sound = np.sin(2 * np.pi * note['freq'] * t)
-        
-        # Add harmonic
-        harmonic = np.sin(2 * np.pi * note['freq'] * 1.5 * t) * 0.3
-        note_sound += harmonic
-        
-        # Envelope
-        envelope = np.ones_like(t) * 0.1
-        envelope[:int(len(t) * 0.1)] = np.linspace(0, 0.15, int(len(t) * 0.1))
-        envelope[-int(len(t) * 0.3):] = np.linspace(0.15, 0.001, int(len(t) * 0.3))
-        
-        note_sound = note_sound * envelope
-        
-        # Add to main sound
-        end_pos = min(sample_pos + note_samples, len(sound))
-        sound[sample_pos:end_pos] = note_sound[:end_pos - sample_pos]
-        
-        # Gap between notes
-        sample_pos += note_samples + int(sample_rate * 0.1)
-    
-    # Add final thud at the end
-    thud_start = len(sound) - int(sample_rate * 0.3)
-    thud_duration = 0.3
-    thud_samples = int(sample_rate * thud_duration)
-    t_thud = np.linspace(0, thud_duration, thud_samples)
-    
-    thud = np.sin(2 * np.pi * 80 * t_thud)  # 80Hz square-ish wave
-    thud_envelope = np.exp(-t_thud / 0.1)
-    thud = thud * thud_envelope * 0.2
-    
-    # Add thud to end
-    sound = np.concatenate([sound, thud])
-    
-    write_wav('game_over.wav', sound)
+    write_effect('game_over')
 
 def generate_background_music():
     """Generate energetic gameplay background music"""
     sample_rate = 44100
     loop_duration = 3.0  # 3 second loop
-    t = np.linspace(0, loop_duration, int(sample_rate * loop_duration))
+    total_samples = int(sample_rate * loop_duration)
     
     # Melody notes with timing
     melody = [
@@ -134,114 +160,148 @@ def generate_background_music():
         {'freq': 659, 'start': 2.4, 'duration': 0.2},    # E5
         {'freq': 784, 'start': 2.65, 'duration': 0.2},   # G5
     ]
+    notes = [dict(note, instrument='melody', gain=0.08) for note in melody]
     
-    sound = np.zeros_like(t)
-    
-    # Add melody
-    for note in melody:
-        start_sample = int(note['start'] * sample_rate)
-        end_sample = int((note['start'] + note['duration']) * sample_rate)
-        note_t = t[start_sample:end_sample] - note['start']
-        
-        if len(note_t) > 0:
-            note_sound = np.sin(2 * np.pi * note['freq'] * note_t)
-            
-            # Envelope
-            envelope = np.ones_like(note_t) * 0.08
-            if len(envelope) > 10:
-                envelope[:5] = np.linspace(0, 0.08, 5)
-                envelope[-5:] = np.linspace(0.08, 0, 5)
-            
-            note_sound = note_sound * envelope
-            sound[start_sample:end_sample] += note_sound
-    
-    # Add bass line
+    # Add bass line (one bass note per timing slot, while notes last)
     bass_notes = [262, 330, 392, 330]  # C4, E4, G4, E4
     bass_timing = [0, 0.5, 1.0, 1.5, 2.0, 2.5]
-    
-    for i, start_time in enumerate(bass_timing):
-        if i < len(bass_notes):
-            freq = bass_notes[i % len(bass_notes)]
-            start_sample = int(start_time * sample_rate)
-            duration = 0.4
-            end_sample = int((start_time + duration) * sample_rate)
-            
-            if end_sample <= len(sound):
-                bass_t = t[start_sample:end_sample] - start_time
-                bass_sound = np.sin(2 * np.pi * freq * bass_t) * 0.05
-                sound[start_sample:end_sample] += bass_sound
+    for start_time, freq in zip(bass_timing, bass_notes):
+        notes.append({'instrument': 'sine', 'freq': freq, 'start': start_time, 'duration': 0.4, 'gain': 0.05})
     
     # Add percussion on beats
     beat_times = [0, 0.5, 1.0, 1.5, 2.0, 2.5]
     for beat_time in beat_times:
-        start_sample = int(beat_time * sample_rate)
-        perc_duration = 0.1
-        end_sample = int((beat_time + perc_duration) * sample_rate)
-        
-        if end_sample <= len(sound):
-            perc_t = np.linspace(0, perc_duration, end_sample - start_sample)
-            perc_sound = np.sin(2 * np.pi * 80 * perc_t)
-            perc_envelope = np.exp(-perc_t / 0.03)
-            perc_sound = perc_sound * perc_envelope * 0.15
-            sound[start_sample:end_sample] += perc_sound
-    
-    write_wav('background_music.wav', sound)
+        notes.append({'instrument': 'perc', 'start': beat_time, 'duration': 0.1, 'gain': 0.15})
+    
+    with ARENA.borrow(total_samples, zero=True) as sound:
+        tracing.stage('render')
+        # The loop's clock is np.linspace(0, loop_duration, total_samples), a hair slower than
+        # 44.1kHz; its voices are never repeated at the same position, so none are cached
+        engine.render_events(engine.event_table(notes), INSTRUMENTS, sound, 0, sample_rate,
+                             sample_period=loop_duration / (total_samples - 1))
+        tracing.stage('write')
+        write_wav('background_music.wav', sound)
 
-def generate_ambient_sound():
-    """Generate cheerful, upbeat cartoon-style background music for Whack-a-Mole"""
-    sample_rate = 44100
-    loop_duration = 60.0  # 1 minute loop at ~120 BPM
-    t = np.linspace(0, loop_duration, int(sample_rate * loop_duration))
+# Instruments for note-based tracks. Each renders notes on a note-local time
+# axis t_note (one row per note when batched by the engine) and takes the
+# event fields it needs (freq, duration, seed) as broadcastable keywords, plus
+# j_note / n_note (sample index in the note, note length in samples) for
+# envelopes counted in samples.
+
+def xylophone_sound(freq, t_note, duration):
+    """Xylophone-style melody note (bright, metallic timbre)"""
+    # Bright attack with harmonics (2nd at 0.4, 3rd at 0.2)
+    sound = oscillators.wavetable([(1, 1.0), (2, 0.4), (3, 0.2)])(freq, t_note)
+    
+    # Quick attack, long sustain with decay
+    envelope = np.exp(-t_note / (duration * 0.8))
+    return sound * envelope * 0.06
+
+def pizzicato_sound(freq, t_note, duration):
+    """Pizzicato strings effect"""
+    # Plucked string simulation
+    fundamental = np.sin(2 * np.pi * freq * t_note)
+    # Add slight tremolo
+    tremolo = 1 + 0.15 * np.sin(2 * np.pi * 6 * t_note)
+    sound = fundamental * tremolo
+    
+    # Sharp attack, quick decay
+    envelope = np.exp(-t_note / (duration * 0.3))
+    return sound * envelope * 0.04
+
+def brass_sound(freq, t_note, j_note, n_note):
+    """Quirky brass sound"""
+    # Square-ish wave for brass character: odd harmonics (3rd at 0.3, 5th at 0.15)
+    sound = oscillators.wavetable([(1, 1.0), (3, 0.3), (5, 0.15)])(freq, t_note)
+    
+    # Moderate attack and sustain (linear fades over the first/last 10% of the samples)
+    fade_samples = n_note // 10
+    steps = np.maximum(fade_samples - 1, 1)
+    envelope = np.where(j_note < fade_samples, j_note / steps,
+                        np.where(j_note >= n_note - fade_samples, (n_note - 1 - j_note) / steps, 1.0))
+    
+    return sound * envelope * 0.035
+
+def sine_sound(freq, t_note, duration):
+    """Plain sine tone (bass line)"""
+    return np.sin(2 * np.pi * freq * t_note)
+
+def melody_sound(freq, t_note, j_note, n_note):
+    """Sine lead with 5-sample linear ramps at both ends (notes over 10 samples) to avoid clicks"""
+    ramp = np.where(n_note > 10, np.clip(np.minimum(j_note, n_note - 1 - j_note) / 4, 0, 1), 1.0)
+    return np.sin(2 * np.pi * freq * t_note) * ramp
+
+def perc_sound(t_note, duration, j_note, n_note):
+    """Short 80Hz thump for the gameplay beat, on its own np.linspace(0, duration, n_note) axis"""
+    t_perc = j_note * (duration / np.maximum(n_note - 1, 1))
+    return np.sin(2 * np.pi * 80 * t_perc) * np.exp(-t_perc / 0.03)
+
+def hashed_noise(seed, t_note):
+    """White noise in [-1, 1) that is a pure function of (seed, sample time)
+
+    Hashing the sample time (splitmix64) instead of drawing from a stream
+    makes a note come out bit-identical whether it is rendered alone, in a
+    batch or block by block.
+    """
+    with np.errstate(over='ignore'):
+        z = np.ascontiguousarray(t_note, dtype=np.float64).view(np.uint64)
+        z = z ^ (np.asarray(seed).astype(np.uint64) * np.uint64(0xD1B54A32D192ED03))
+        z = z + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)) * (2.0 / 2 ** 53) - 1
+
+def kick_sound(t_note, duration):
+    """Light kick drum"""
+    return np.sin(2 * np.pi * 60 * t_note) * np.exp(-t_note / 0.05) * 0.03
+
+def snare_sound(t_note, duration, seed):
+    """Light snare drum - white noise burst, seeded per hit"""
+    noise = hashed_noise(seed, t_note)
+    snare_envelope = np.exp(-t_note / 0.02)
+    return noise * snare_envelope * 0.02
+
+def slide_whistle_sound(t_note, duration, start_freq=1000, end_freq=2000):
+    """Cartoon slide whistle flourish"""
+    frequency = start_freq + (end_freq - start_freq) * t_note / duration
+    flourish_sound = np.sin(2 * np.pi * frequency * t_note)
+    flourish_envelope = np.exp(-t_note / 0.2)
+    return flourish_sound * flourish_envelope * 0.02
+
+INSTRUMENTS = {
+    'xylophone': xylophone_sound,
+    'pizzicato': pizzicato_sound,
+    'brass': brass_sound,
+    'kick': kick_sound,
+    'snare': snare_sound,
+    'slide_whistle': slide_whistle_sound,
+    'sine': sine_sound,
+    'melody': melody_sound,
+    'perc': perc_sound,
+}
+
+# Peak amplitude of one note of each instrument (harmonic weights x gain),
+# used for the analytic normalization bound
+INSTRUMENT_PEAKS = {
+    'xylophone': (1 + 0.4 + 0.2) * 0.06,
+    'pizzicato': 1.15 * 0.04,
+    'brass': (1 + 0.3 + 0.15) * 0.035,
+    'kick': 0.03,
+    'snare': 0.02,
+    'slide_whistle': 0.02,
+    'sine': 1.0,
+    'melody': 1.0,
+    'perc': 1.0,
+}
+
+def ambient_notes(loop_duration=60.0, seed=2024, sample_rate=44100):
+    """Build the note events of the cheerful Whack-a-Mole menu music"""
+    total_samples = int(sample_rate * loop_duration)
     
     # Bouncy 120 BPM timing (0.5s per beat)
     beat_duration = 0.5
     
-    # Xylophone-style melody (bright, metallic timbre)
-    def xylophone_sound(freq, t_note, duration):
-        # Bright attack with harmonics
-        fundamental = np.sin(2 * np.pi * freq * t_note)
-        harmonic2 = np.sin(2 * np.pi * freq * 2 * t_note) * 0.4
-        harmonic3 = np.sin(2 * np.pi * freq * 3 * t_note) * 0.2
-        
-        sound = fundamental + harmonic2 + harmonic3
-        
-        # Quick attack, long sustain with decay
-        envelope = np.exp(-t_note / (duration * 0.8))
-        return sound * envelope * 0.06
-    
-    # Pizzicato strings effect
-    def pizzicato_sound(freq, t_note, duration):
-        # Plucked string simulation
-        fundamental = np.sin(2 * np.pi * freq * t_note)
-        # Add slight tremolo
-        tremolo = 1 + 0.15 * np.sin(2 * np.pi * 6 * t_note)
-        sound = fundamental * tremolo
-        
-        # Sharp attack, quick decay
-        envelope = np.exp(-t_note / (duration * 0.3))
-        return sound * envelope * 0.04
-    
-    # Quirky brass sound
-    def brass_sound(freq, t_note, duration):
-        # Square-ish wave for brass character
-        fundamental = np.sin(2 * np.pi * freq * t_note)
-        # Add odd harmonics for brass timbre
-        harmonic3 = np.sin(2 * np.pi * freq * 3 * t_note) * 0.3
-        harmonic5 = np.sin(2 * np.pi * freq * 5 * t_note) * 0.15
-        
-        sound = fundamental + harmonic3 + harmonic5
-        
-        # Moderate attack and sustain
-        envelope = np.ones_like(t_note)
-        fade_samples = len(envelope) // 10
-        if len(envelope) > fade_samples * 2:
-            envelope[:fade_samples] = np.linspace(0, 1, fade_samples)
-            envelope[-fade_samples:] = np.linspace(1, 0, fade_samples)
-        
-        return sound * envelope * 0.035
-    
-    sound = np.zeros_like(t)
-    
     # Main melody pattern (4 measures, repeats throughout)
     melody_pattern = [
         # Measure 1
@@ -263,18 +323,27 @@ def generate_ambient_sound():
     
     # Pizzicato accompaniment pattern
     pizzicato_pattern = [
-        {'freq': 262, 'start': 0.0, 'duration': 0.25},   # C4
-        {'freq': 330, 'start': 1.0, 'duration': 0.25},   # E4
-        {'freq': 262, 'start': 2.0, 'duration': 0.25},   # C4
-        {'freq': 294, 'start': 3.0, 'duration': 0.25},   # D4
+        {'freq': 262, 'start': 0.0, 'duration': 0.25, 'instrument': 'pizzicato'},   # C4
+        {'freq': 330, 'start': 1.0, 'duration': 0.25, 'instrument': 'pizzicato'},   # E4
+        {'freq': 262, 'start': 2.0, 'duration': 0.25, 'instrument': 'pizzicato'},   # C4
+        {'freq': 294, 'start': 3.0, 'duration': 0.25, 'instrument': 'pizzicato'},   # D4
     ]
     
     # Brass accents
     brass_pattern = [
-        {'freq': 523, 'start': 1.75, 'duration': 0.25},  # C5 accent
-        {'freq': 659, 'start': 3.75, 'duration': 0.25},  # E5 accent
+        {'freq': 523, 'start': 1.75, 'duration': 0.25, 'instrument': 'brass'},  # C5 accent
+        {'freq': 659, 'start': 3.75, 'duration': 0.25, 'instrument': 'brass'},  # E5 accent
     ]
     
+    notes = []
+    
+    def add(note, offset):
+        note = dict(note, start=note['start'] + offset)
+        # Drop notes that would run past the end of the loop
+        if note['start'] < loop_duration and \
+                int((note['start'] + note['duration']) * sample_rate) <= total_samples:
+            notes.append(note)
+    
     # Generate the full track by repeating patterns
     pattern_length = 4.0  # 4 seconds per pattern
     num_patterns = int(loop_duration / pattern_length)
@@ -282,357 +351,460 @@ def generate_ambient_sound():
     for pattern_num in range(num_patterns):
         pattern_offset = pattern_num * pattern_length
         
-        # Add melody
         for note in melody_pattern:
-            start_time = note['start'] + pattern_offset
-            if start_time < loop_duration:
-                start_sample = int(start_time * sample_rate)
-                duration = note['duration']
-                end_sample = int((start_time + duration) * sample_rate)
-                
-                if end_sample <= len(sound):
-                    note_t = t[start_sample:end_sample] - start_time
-                    if len(note_t) > 0:
-                        note_sound = xylophone_sound(note['freq'], note_t, duration)
-                        sound[start_sample:end_sample] += note_sound
+            add(note, pattern_offset)
         
         # Add pizzicato every other pattern for variety
         if pattern_num % 2 == 0:
             for note in pizzicato_pattern:
-                start_time = note['start'] + pattern_offset
-                if start_time < loop_duration:
-                    start_sample = int(start_time * sample_rate)
-                    duration = note['duration']
-                    end_sample = int((start_time + duration) * sample_rate)
-                    
-                    if end_sample <= len(sound):
-                        note_t = t[start_sample:end_sample] - start_time
-                        if len(note_t) > 0:
-                            note_sound = pizzicato_sound(note['freq'], note_t, duration)
-                            sound[start_sample:end_sample] += note_sound
+                add(note, pattern_offset)
         
         # Add brass accents occasionally
         if pattern_num % 4 == 2:  # Every 4th pattern
             for note in brass_pattern:
-                start_time = note['start'] + pattern_offset
-                if start_time < loop_duration:
-                    start_sample = int(start_time * sample_rate)
-                    duration = note['duration']
-                    end_sample = int((start_time + duration) * sample_rate)
-                    
-                    if end_sample <= len(sound):
-                        note_t = t[start_sample:end_sample] - start_time
-                        if len(note_t) > 0:
-                            note_sound = brass_sound(note['freq'], note_t, duration)
-                            sound[start_sample:end_sample] += note_sound
+                add(note, pattern_offset)
     
     # Add light percussion (kick on beats 1 and 3, snare on beats 2 and 4)
     for beat in range(int(loop_duration / beat_duration)):
         beat_time = beat * beat_duration
-        start_sample = int(beat_time * sample_rate)
-        
-        if beat % 4 in [0, 2]:  # Kick drum
-            kick_duration = 0.1
-            end_sample = int((beat_time + kick_duration) * sample_rate)
-            if end_sample <= len(sound):
-                kick_t = t[start_sample:end_sample] - beat_time
-                kick_sound = np.sin(2 * np.pi * 60 * kick_t) * np.exp(-kick_t / 0.05) * 0.03
-                sound[start_sample:end_sample] += kick_sound
-        
-        elif beat % 4 in [1, 3]:  # Snare drum
-            snare_duration = 0.05
-            end_sample = int((beat_time + snare_duration) * sample_rate)
-            if end_sample <= len(sound):
-                snare_t = t[start_sample:end_sample] - beat_time
-                # White noise for snare
-                noise = np.random.random(len(snare_t)) * 2 - 1
-                snare_envelope = np.exp(-snare_t / 0.02)
-                snare_sound = noise * snare_envelope * 0.02
-                sound[start_sample:end_sample] += snare_sound
+        if beat % 4 in [0, 2]:
+            add({'instrument': 'kick', 'start': 0.0, 'duration': 0.1}, beat_time)
+        else:
+            add({'instrument': 'snare', 'start': 0.0, 'duration': 0.05, 'seed': (seed << 32) | beat},
+                beat_time)
     
     # Add occasional cartoon flourishes (slide whistle every 16 seconds)
-    for flourish_time in [16, 32, 48]:
-        if flourish_time < loop_duration:
-            start_sample = int(flourish_time * sample_rate)
-            flourish_duration = 0.5
-            end_sample = int((flourish_time + flourish_duration) * sample_rate)
-            
-            if end_sample <= len(sound):
-                flourish_t = t[start_sample:end_sample] - flourish_time
-                # Slide whistle effect
-                start_freq = 1000
-                end_freq = 2000
-                frequency = start_freq + (end_freq - start_freq) * flourish_t / flourish_duration
-                flourish_sound = np.sin(2 * np.pi * frequency * flourish_t)
-                flourish_envelope = np.exp(-flourish_t / 0.2)
-                flourish_sound = flourish_sound * flourish_envelope * 0.02
-                sound[start_sample:end_sample] += flourish_sound
-    
-    # Normalize and ensure seamless looping
-    max_val = np.max(np.abs(sound))
-    if max_val > 0:
-        sound = sound / max_val * 0.85  # Leave headroom
-    
-    # Fade in/out the first/last 100ms for seamless looping
-    fade_samples = int(0.1 * sample_rate)
-    sound[:fade_samples] *= np.linspace(0, 1, fade_samples)
-    sound[-fade_samples:] *= np.linspace(1, 0, fade_samples)
+    for flourish_time in range(16, int(loop_duration), 16):
+        add({'instrument': 'slide_whistle', 'start': 0.0, 'duration': 0.5}, flourish_time)
     
-    write_wav('ambient_music.wav', sound)
+    return notes
 
-def generate_explosion_sound():
-    """Generate explosion sound effect - dramatic boom with rumble"""
+def generate_ambient_sound(seed=2024, loop_duration=60.0, normalize='exact',
+                           block_size=streaming.DEFAULT_BLOCK_SIZE, workers=None,
+                           reverb_ir=None, reverb_mix=0.2):
+    """Generate cheerful, upbeat cartoon-style background music for Whack-a-Mole
+
+    Rendered block by block so memory does not grow with loop_duration.
+    normalize='exact' measures the true peak in a first streaming pass;
+    normalize='bound' uses an analytic bound and renders only once.
+    With workers > 1 (default: SHARD_WORKERS) the track is rendered once in
+    time shards across processes instead; the output is identical.
+    reverb_ir names a convolution.IMPULSE_RESPONSES space to stream the mix through.
+    """
     sample_rate = 44100
-    duration = 0.8
-    t = np.linspace(0, duration, int(sample_rate * duration))
-    
-    # Multiple layers for rich explosion sound
-    sound = np.zeros_like(t)
-    
-    # Layer 1: Initial sharp crack (high frequency noise burst)
-    crack_duration = 0.05
-    crack_samples = int(crack_duration * sample_rate)
-    crack_noise = np.random.normal(0, 0.3, crack_samples)
-    crack_envelope = np.exp(-np.linspace(0, 20, crack_samples))
-    crack_sound = crack_noise * crack_envelope
-    sound[:crack_samples] += crack_sound
-    
-    # Layer 2: Mid-frequency boom (sine wave sweep)
-    boom_start = 0.02
-    boom_duration = 0.3
-    boom_start_sample = int(boom_start * sample_rate)
-    boom_end_sample = int((boom_start + boom_duration) * sample_rate)
-    boom_t = t[boom_start_sample:boom_end_sample] - boom_start
-    
-    # Frequency sweep from 200Hz to 50Hz
-    freq_start = 200
-    freq_end = 50
-    frequency = freq_start + (freq_end - freq_start) * boom_t / boom_duration
-    boom_wave = np.sin(2 * np.pi * frequency * boom_t)
-    boom_envelope = np.exp(-boom_t / 0.15)
-    boom_sound = boom_wave * boom_envelope * 0.4
-    sound[boom_start_sample:boom_end_sample] += boom_sound
-    
-    # Layer 3: Low-frequency rumble (bass component)
-    rumble_start = 0.1
-    rumble_duration = 0.6
-    rumble_start_sample = int(rumble_start * sample_rate)
-    rumble_end_sample = int((rumble_start + rumble_duration) * sample_rate)
-    rumble_t = t[rumble_start_sample:rumble_end_sample] - rumble_start
-    
-    # Low frequency rumble with modulation
-    rumble_freq = 40 + 20 * np.sin(2 * np.pi * 5 * rumble_t)
-    rumble_wave = np.sin(2 * np.pi * rumble_freq * rumble_t)
-    rumble_envelope = np.exp(-rumble_t / 0.3)
-    rumble_sound = rumble_wave * rumble_envelope * 0.3
-    sound[rumble_start_sample:rumble_end_sample] += rumble_sound
-    
-    # Layer 4: Debris/crackling (filtered noise)
-    debris_start = 0.15
-    debris_duration = 0.4
-    debris_start_sample = int(debris_start * sample_rate)
-    debris_end_sample = int((debris_start + debris_duration) * sample_rate)
-    debris_noise = np.random.normal(0, 0.15, debris_end_sample - debris_start_sample)
-    debris_envelope = np.exp(-np.linspace(0, 8, debris_end_sample - debris_start_sample))
-    debris_sound = debris_noise * debris_envelope
-    sound[debris_start_sample:debris_end_sample] += debris_sound
-    
-    # Apply overall envelope to smooth the sound
-    overall_envelope = np.ones_like(t)
-    fade_samples = int(0.1 * sample_rate)
-    if len(overall_envelope) > fade_samples:
-        overall_envelope[-fade_samples:] = np.linspace(1, 0, fade_samples)
-    
-    sound = sound * overall_envelope
-    
-    # Normalize to prevent clipping
-    max_val = np.max(np.abs(sound))
+    total_samples = int(sample_rate * loop_duration)  # 1 minute loop at ~120 BPM
+    events = engine.event_table(ambient_notes(loop_duration, seed, sample_rate))
+    workers = workers or SHARD_WORKERS
+    
+    if workers > 1:
+        tracing.stage('sharded render')
+        track = sharding.render_sharded(events, INSTRUMENTS, total_samples, sample_rate, block_size,
+                                        workers, cache_bytes=VOICE_CACHE.max_bytes, dtype=ARENA.dtype)
+        
+        def blocks():
+            return sharding.track_blocks(track, block_size)
+    else:
+        def blocks():
+            return streaming.render_blocks(events, INSTRUMENTS, total_samples, sample_rate, block_size,
+                                           cache=VOICE_CACHE, dtype=ARENA.dtype)
+    
+    if reverb_ir:
+        dry_blocks = blocks
+        
+        def blocks():
+            return convolution.reverb_blocks(dry_blocks(), reverb_ir, reverb_mix, sample_rate)
+    
+    tracing.stage('peak')
+    if normalize == 'exact':
+        max_val = streaming.measure_peak(blocks())
+    else:
+        max_val = streaming.peak_bound(events, INSTRUMENT_PEAKS, sample_rate)
+        if reverb_ir:
+            max_val *= convolution.reverb_peak_gain(reverb_ir, reverb_mix, sample_rate)
+    
+    # Normalize (leave headroom) and fade in/out the first/last 100ms for seamless looping
+    sound = blocks()
     if max_val > 0:
-        sound = sound / max_val * 0.8
+        sound = streaming.scale_blocks(sound, 0.85 / max_val)
+    sound = streaming.fade_edges(sound, total_samples, int(0.1 * sample_rate))
     
-    write_wav('explosion.wav', sound)
+    tracing.stage('render and write')
+    streaming.write_wav_stream('ambient_music.wav', sound, sample_rate)
 
-def generate_hammer_hit_sound():
-    """Generate hammer hitting sound - sharp metallic strike"""
-    sample_rate = 44100
-    duration = 0.3
-    samples = np.zeros(int(sample_rate * duration))
-    
-    # Generate initial strike - sharp attack
-    strike_duration = 0.05
-    strike_samples = int(sample_rate * strike_duration)
-    
-    # Create metallic ping with harmonics
-    t = np.linspace(0, strike_duration, strike_samples)
-    
-    # Primary frequency (metallic ping)
-    freq1 = 800
-    freq2 = 1200
-    freq3 = 1600
-    
-    # Generate strike with harmonics
-    strike = (np.sin(2 * np.pi * freq1 * t) * 0.6 +
-             np.sin(2 * np.pi * freq2 * t) * 0.3 +
-             np.sin(2 * np.pi * freq3 * t) * 0.1)
-    
-    # Add some noise for realism
-    noise = np.random.normal(0, 0.1, strike_samples)
-    strike = strike + noise
-    
-    # Sharp attack envelope
-    attack_envelope = np.exp(-t * 40)
-    strike = strike * attack_envelope
-    
-    # Add reverb tail
-    reverb_duration = 0.25
-    reverb_samples = int(sample_rate * reverb_duration)
-    reverb_t = np.linspace(0, reverb_duration, reverb_samples)
-    
-    # Generate reverb with decaying harmonics
-    reverb = (np.sin(2 * np.pi * freq1 * 0.8 * reverb_t) * 0.2 +
-             np.sin(2 * np.pi * freq2 * 0.7 * reverb_t) * 0.1)
-    
-    # Decay envelope for reverb
-    reverb_envelope = np.exp(-reverb_t * 8)
-    reverb = reverb * reverb_envelope
-    
-    # Combine strike and reverb
-    samples[:strike_samples] += strike
-    samples[strike_samples:strike_samples+reverb_samples] += reverb
-    
-    # Normalize
-    samples = samples / np.max(np.abs(samples)) * 0.9
-    
-    write_wav('hammer_hit.wav', samples)
+def generate_explosion_sound():
+    """Generate explosion sound effect - dramatic boom with rumble"""
+    write_effect('explosion')
+
+def generate_hammer_hit_sound(reverb_ir=None, reverb_mix=0.25):
+    """Generate hammer hitting sound - sharp metallic strike
+
+    reverb_ir names a convolution.IMPULSE_RESPONSES space to add on top of the
+    built-in reverb tail (its decay extends the sound).
+    """
+    write_effect('hammer_hit', reverb_ir, reverb_mix)
 
 def generate_button_click_sound():
     """Generate button click sound - soft digital click"""
-    sample_rate = 44100
-    duration = 0.15
-    samples = np.zeros(int(sample_rate * duration))
-    
-    # Generate click - two-tone beep
-    click_duration = 0.05
-    click_samples = int(sample_rate * click_duration)
-    
-    t = np.linspace(0, click_duration, click_samples)
-    
-    # First tone (higher)
-    freq1 = 1000
-    tone1 = np.sin(2 * np.pi * freq1 * t)
-    
-    # Second tone (lower)
-    freq2 = 800
-    tone2 = np.sin(2 * np.pi * freq2 * t)
-    
-    # Combine tones with slight delay
-    click = tone1 * 0.6
-    
-    # Add second tone with delay
-    delay_samples = int(sample_rate * 0.02)
-    if delay_samples < click_samples:
-        click[delay_samples:] += tone2[:click_samples-delay_samples] * 0.4
-    
-    # Apply envelope
-    envelope = np.exp(-t * 20)
-    click = click * envelope
-    
-    # Add to samples
-    samples[:click_samples] += click
-    
-    # Normalize
-    samples = samples / np.max(np.abs(samples)) * 0.7
-    
-    write_wav('button_click.wav', samples)
+    write_effect('button_click')
 
-def generate_ting_sound():
-    """Generate ting sound - bright metallic chime for successful mole hits"""
-    sample_rate = 44100
-    duration = 0.5
-    samples = np.zeros(int(sample_rate * duration))
-    
-    # Generate bright metallic ting - bell-like sound
-    ting_duration = 0.1
-    ting_samples = int(sample_rate * ting_duration)
-    
-    t = np.linspace(0, ting_duration, ting_samples)
-    
-    # Primary frequencies for bright metallic ting
-    freq1 = 1800  # Bright fundamental
-    freq2 = 2400  # First harmonic
-    freq3 = 3200  # Second harmonic
-    freq4 = 4000  # Third harmonic
-    
-    # Generate ting with harmonics
-    ting = (np.sin(2 * np.pi * freq1 * t) * 0.5 +
-            np.sin(2 * np.pi * freq2 * t) * 0.3 +
-            np.sin(2 * np.pi * freq3 * t) * 0.15 +
-            np.sin(2 * np.pi * freq4 * t) * 0.05)
-    
-    # Bell-like attack and decay envelope
-    attack_samples = int(sample_rate * 0.01)  # Very quick attack
-    decay_samples = ting_samples - attack_samples
-    
-    envelope = np.ones(ting_samples)
-    if attack_samples > 0:
-        envelope[:attack_samples] = np.linspace(0, 1, attack_samples)
-    if decay_samples > 0:
-        envelope[attack_samples:] = np.exp(-np.linspace(0, 6, decay_samples))
-    
-    ting = ting * envelope
-    
-    # Add reverb tail for sparkle effect
-    reverb_start = ting_samples
-    reverb_duration = 0.4
-    reverb_samples = int(sample_rate * reverb_duration)
-    reverb_t = np.linspace(0, reverb_duration, reverb_samples)
-    
-    # Generate sparkling reverb with higher frequencies
-    reverb = (np.sin(2 * np.pi * freq1 * 0.9 * reverb_t) * 0.15 +
-              np.sin(2 * np.pi * freq2 * 0.8 * reverb_t) * 0.1 +
-              np.sin(2 * np.pi * freq3 * 0.7 * reverb_t) * 0.05)
-    
-    # Exponential decay for reverb
-    reverb_envelope = np.exp(-reverb_t * 4)
-    reverb = reverb * reverb_envelope
-    
-    # Combine ting and reverb
-    samples[:ting_samples] += ting
-    samples[reverb_start:reverb_start+reverb_samples] += reverb
-    
-    # Normalize
-    samples = samples / np.max(np.abs(samples)) * 0.8
+def generate_ting_sound(reverb_ir=None, reverb_mix=0.25):
+    """Generate ting sound - bright metallic chime for successful mole hits
+
+    reverb_ir names a convolution.IMPULSE_RESPONSES space to add on top of the
+    sparkle tail (its decay extends the sound).
+    """
+    write_effect('ting', reverb_ir, reverb_mix)
+
+def write_bank(name, sound, params, sample_rate=44100):
+    """Render a variation grid of a sound in SPECS and write it as name.wav plus its name.json index
+
+    Variants are laid end to end row by row, each followed by
+    variations.GAP_SECONDS of silence.
+    """
+    tracing.stage('render', variants=params.size)
+    with rendered(sound, params, sample_rate) as bank:
+        variants = bank.reshape(params.size, -1)
+        n = variants.shape[1]
+        tracing.stage('write')
+        with ARENA.borrow(params.size * (n + int(variations.GAP_SECONDS * sample_rate)), zero=True) as samples:
+            samples.reshape(params.size, -1)[:, :n] = variants
+            write_wav(name + '.wav', samples, sample_rate)
+    variations.write_index(name + '.json', variations.bank_index(name + '.wav', params, n, sample_rate))
+
+def generate_hit_variants(pitches=8, decays=2, seed=1, pitch_cents=60.0, decay_spread=0.25):
+    """Generate a bank of detuned hit variants (variant 0 is the original hit)"""
+    write_bank('hit_variants', 'hit',
+               variations.variation_params(pitches, decays, seed, pitch_cents, decay_spread))
+
+def generate_mole_pop_variants(pitches=8, decays=2, seed=2, pitch_cents=80.0, decay_spread=0.25):
+    """Generate a bank of mole pop variants (variant 0 is the original pop)"""
+    write_bank('mole_pop_variants', 'mole_pop',
+               variations.variation_params(pitches, decays, seed, pitch_cents, decay_spread))
+
+def generate_hammer_hit_variants(pitches=4, decays=2, seed=3, pitch_cents=50.0, decay_spread=0.2):
+    """Generate a bank of hammer hit variants, each pitch with its own strike noise
+
+    Half the size of the other banks: its strike noise keeps it at 44.1kHz
+    (see OUTPUT_RATES), so every variant costs five times the bytes.
+    """
+    write_bank('hammer_hit_variants', 'hammer_hit',
+               variations.variation_params(pitches, decays, seed, pitch_cents, decay_spread,
+                                           base_seed=SPECS['hammer_hit']['seed']))
+
+def generate_ting_variants(pitches=8, decays=2, seed=4, pitch_cents=40.0, decay_spread=0.2):
+    """Generate a bank of ting variants (variant 0 is the original ting)"""
+    write_bank('ting_variants', 'ting',
+               variations.variation_params(pitches, decays, seed, pitch_cents, decay_spread))
+
+# Build targets: name -> (generator, output file)
+GENERATORS = {
+    'hit': (generate_hit_sound, 'hit.wav'),
+    'mole_pop': (generate_mole_pop_sound, 'mole_pop.wav'),
+    'game_over': (generate_game_over_sound, 'game_over.wav'),
+    'background_music': (generate_background_music, 'background_music.wav'),
+    'ambient_music': (generate_ambient_sound, 'ambient_music.wav'),
+    'explosion': (generate_explosion_sound, 'explosion.wav'),
+    'hammer_hit': (generate_hammer_hit_sound, 'hammer_hit.wav'),
+    'button_click': (generate_button_click_sound, 'button_click.wav'),
+    'ting': (generate_ting_sound, 'ting.wav'),
+    'hit_variants': (generate_hit_variants, 'hit_variants.wav'),
+    'mole_pop_variants': (generate_mole_pop_variants, 'mole_pop_variants.wav'),
+    'hammer_hit_variants': (generate_hammer_hit_variants, 'hammer_hit_variants.wav'),
+    'ting_variants': (generate_ting_variants, 'ting_variants.wav'),
+}
+
+def generator_params(func):
+    """Return the default parameters (seeds etc.) a generator renders with"""
+    return {name: param.default
+            for name, param in inspect.signature(func).parameters.items()
+            if param.default is not inspect.Parameter.empty}
+
+def _code_names(code):
+    """Global names referenced by a code object and its nested functions"""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _code_names(const)
+    return names
+
+def _is_local(obj):
+    """True for functions and modules defined in this directory"""
+    try:
+        path = inspect.getsourcefile(obj)
+    except TypeError:
+        return False
+    return path is not None and os.path.dirname(os.path.abspath(path)) == SOURCE_DIR
+
+def _module_name(func):
+    """Name of a function's module, the same whether it was run as a script or imported"""
+    return os.path.splitext(os.path.basename(inspect.getsourcefile(func)))[0]
+
+def dependencies(func):
+    """Return the local functions and modules a generator (transitively) uses"""
+    found = {}
+    stack = [func]
+    while stack:
+        current = stack.pop()
+        if inspect.ismodule(current):
+            # A module's source covers its own functions, but not the modules it imports
+            namespace = {name: obj for name, obj in vars(current).items() if inspect.ismodule(obj)}
+        else:
+            namespace = {name: current.__globals__.get(name) for name in _code_names(current.__code__)}
+        for name in sorted(namespace):
+            obj = namespace[name]
+            candidates = list(obj.values()) if isinstance(obj, dict) else [obj]
+            for candidate in candidates:
+                # Decorated functions (lru_cache, contextmanager) count as the function they wrap
+                candidate = inspect.unwrap(candidate)
+                if not (inspect.isfunction(candidate) or inspect.ismodule(candidate)):
+                    continue
+                if candidate in found.values() or not _is_local(candidate):
+                    continue
+                key = f"{_module_name(candidate)}.{candidate.__qualname__}" \
+                    if inspect.isfunction(candidate) else candidate.__name__
+                found[key] = candidate
+                stack.append(candidate)
+    return found
+
+def output_policy(name, formats=('pcm16',), min_snr_db=DEFAULT_MIN_SNR_DB):
+    """Re-encoding settings for a target, or None to keep 44.1kHz PCM"""
+    if name not in OUTPUT_RATES:
+        return None
+    return {'rates': OUTPUT_RATES[name], 'formats': list(formats), 'min_snr_db': min_snr_db}
+
+def fingerprint(name, policy=None):
+    """Hash everything that determines a target's output"""
+    func, filename = GENERATORS[name]
+    digest = hashlib.sha256()
+    digest.update(filename.encode())
+    digest.update(inspect.getsource(func).encode())
+    found = dependencies(func)
+    for key, dependency in sorted(found.items()):
+        digest.update(key.encode())
+        digest.update(inspect.getsource(dependency).encode())
+    if 'soundspec' in found:
+        # The sound specs are data, so they are hashed next to the code that renders them
+        digest.update(json.dumps(SPECS, sort_keys=True).encode())
+    digest.update(json.dumps(generator_params(func), sort_keys=True).encode())
+    digest.update(json.dumps(policy, sort_keys=True).encode())
+    digest.update(ARENA.dtype.name.encode())
+    return digest.hexdigest()
+
+def file_digest(path):
+    """Return the sha256 of a file, or None if it does not exist"""
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+    except FileNotFoundError:
+        return None
+
+def load_manifest(path=CACHE_MANIFEST):
+    """Load the build cache manifest, treating a missing or corrupt file as empty"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_manifest(manifest, path=CACHE_MANIFEST):
+    """Atomically write the build cache manifest"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def is_fresh(name, entry, policy=None):
+    """Check a manifest entry against the current fingerprint and output file"""
+    if not entry or entry.get('fingerprint') != fingerprint(name, policy):
+        return False
+    return file_digest(GENERATORS[name][1]) == entry.get('output_sha256')
+
+def manifest_entry(name, output_sha256, seconds, policy=None):
+    """Build cache manifest entry for a target that was just rendered"""
+    return {
+        'fingerprint': fingerprint(name, policy),
+        'output_sha256': output_sha256,
+        'seconds': round(seconds, 4),
+    }
+
+def configure_worker(voice_cache_bytes, shard_workers=1, precision='float64', trace=False):
+    """Set the voice cache budget, shard workers, precision and tracing (also the worker initializer)"""
+    global SHARD_WORKERS, ARENA
+    VOICE_CACHE.max_bytes = voice_cache_bytes
+    SHARD_WORKERS = shard_workers
+    if ARENA.dtype != precision:
+        ARENA = arena.BufferArena(precision)
+    tracing.enable(trace)
+
+def render_target(name, policy=None):
+    """Render one target in the current directory (runs in a worker process)
+
+    Returns the spans it recorded as the last element (empty unless tracing).
+    """
+    func, filename = GENERATORS[name]
+    hits, misses = VOICE_CACHE.hits, VOICE_CACHE.misses
+    start = time.perf_counter()
+    with tracing.span(name, 'generator', file=filename):
+        func()
+        with tracing.span('compact_wav', 'encode'):
+            encoding = encoders.compact_wav(filename, **policy) if policy else None
+    seconds = time.perf_counter() - start
+    cache_stats = {'hits': VOICE_CACHE.hits - hits, 'misses': VOICE_CACHE.misses - misses}
+    return name, file_digest(filename), seconds, cache_stats, encoding, tracing.drain()
+
+def build(names=None, jobs=None, force=False, voice_cache_bytes=voices.DEFAULT_MAX_BYTES,
+          formats=('pcm16',), min_snr_db=DEFAULT_MIN_SNR_DB, shard_workers=1, precision='float64',
+          trace_events=None):
+    """Render stale targets in parallel, skipping those whose fingerprint is cached
+
+    Pass a list as trace_events to trace the renders and collect their spans into it.
+    """
+    names = list(names or GENERATORS)
+    policies = {name: output_policy(name, formats, min_snr_db) for name in names}
+    trace = trace_events is not None
+    configure_worker(voice_cache_bytes, shard_workers, precision, trace)
+    manifest = load_manifest()
+    stale = [name for name in names if force or not is_fresh(name, manifest.get(name), policies[name])]
+    for name in names:
+        if name not in stale:
+            print(f"· {GENERATORS[name][1]} is up to date")
+    if not stale:
+        return []
+    
+    # Longest renders first so the slowest target does not start last
+    stale.sort(key=lambda name: manifest.get(name, {}).get('seconds', 0), reverse=True)
+    
+    cache_totals = {'hits': 0, 'misses': 0}
+    
+    def record(result):
+        name, output_sha256, seconds, cache_stats, encoding, events = result
+        if trace:
+            trace_events.extend(events)
+        for key in cache_totals:
+            cache_totals[key] += cache_stats[key]
+        manifest[name] = manifest_entry(name, output_sha256, seconds, policies[name])
+        detail = ''
+        if encoding:
+            detail = (f", {encoding['format']} @ {encoding['sample_rate']}Hz, "
+                      f"{encoding['bytes'] // 1024} KB, {encoding['snr_db']:.1f} dB SNR")
+        print(f"✓ Generated {GENERATORS[name][1]} ({seconds:.2f}s{detail})")
+    
+    if jobs == 1 or len(stale) == 1:
+        for name in stale:
+            record(render_target(name, policies[name]))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=configure_worker,
+                                 initargs=(voice_cache_bytes, shard_workers, precision, trace)) as pool:
+            futures = [pool.submit(render_target, name, policies[name]) for name in stale]
+            for future in as_completed(futures):
+                record(future.result())
+    
+    save_manifest(manifest)
+    lookups = cache_totals['hits'] + cache_totals['misses']
+    if lookups:
+        print(f"Voice cache: {cache_totals['hits']} hits, {cache_totals['misses']} misses "
+              f"({cache_totals['hits'] / lookups:.0%} hit rate)")
+    return stale
+
+def check_precision(names=None):
+    """Render targets in float64 and float32 in a scratch directory; returns {label: SNR in dB}
+
+    The float64 int16 output is the reference. PRECISION_EXTRAS adds renders
+    of the reverb paths, which the default targets do not use.
+    """
+    names = list(names or GENERATORS)
+    renders = [(name, name, {}) for name in names]
+    renders += [(label, name, options) for label, (name, options) in PRECISION_EXTRAS.items() if name in names]
+    precision = ARENA.dtype.name
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory(prefix='precision-') as scratch, contextlib.chdir(scratch):
+            for label, name, options in renders:
+                func, filename = GENERATORS[name]
+                outputs = []
+                for dtype in ('float64', 'float32'):
+                    configure_worker(VOICE_CACHE.max_bytes, SHARD_WORKERS, dtype)
+                    VOICE_CACHE.clear()
+                    func(**options)
+                    outputs.append(encoders.read_pcm16(filename)[0])
+                results[label] = encoders.snr_db(*outputs)
+    finally:
+        configure_worker(VOICE_CACHE.max_bytes, SHARD_WORKERS, precision)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--only', action='append', choices=sorted(GENERATORS), metavar='NAME',
+                        help='build only this target (repeatable)')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='worker processes for stale targets (default: CPU count)')
+    parser.add_argument('--force', action='store_true',
+                        help='ignore the cache manifest and rebuild everything')
+    parser.add_argument('--voice-cache-mb', type=float, default=voices.DEFAULT_MAX_BYTES / 2**20,
+                        help='memory cap for rendered note voices, per worker (default: %(default)s)')
+    parser.add_argument('--adpcm', action='store_true',
+                        help='also consider IMA-ADPCM variants for re-encoded music and banks '
+                             '(not every browser can play them)')
+    parser.add_argument('--min-snr', type=float, default=DEFAULT_MIN_SNR_DB,
+                        help='quality threshold for re-encoded variants in dB (default: %(default)s)')
+    parser.add_argument('--shard-jobs', type=int, default=1,
+                        help='processes rendering each long track in time shards (default: %(default)s)')
+    parser.add_argument('--precision', choices=arena.PRECISIONS, default='float64',
+                        help='sample format generators render in; float32 halves memory traffic '
+                             'and dithers the int16 output (default: %(default)s)')
+    parser.add_argument('--out-dir', default=SOURCE_DIR,
+                        help='directory to write WAV files and the cache manifest to')
+    parser.add_argument('--check-precision', action='store_true',
+                        help='instead of building, render every target in float32 and float64 and fail '
+                             'if any pair is under --min-precision-snr apart')
+    parser.add_argument('--min-precision-snr', type=float, default=MIN_PRECISION_SNR_DB,
+                        help='required float32 vs float64 SNR in dB (default: %(default)s)')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='trace the renders into a Chrome trace-event JSON file and print the '
+                             'slowest spans (combine with --force to trace every target)')
+    parser.add_argument('--trace-top', type=int, default=15,
+                        help='spans to list in the trace summary (default: %(default)s)')
+    args = parser.parse_args(argv)
+    
+    if args.check_precision:
+        results = check_precision(args.only)
+        for label, snr in results.items():
+            mark = '✓' if snr >= args.min_precision_snr else '✗'
+            print(f"{mark} {label:<20} float32 vs float64: {snr:6.1f} dB SNR")
+        failures = [label for label, snr in results.items() if snr < args.min_precision_snr]
+        if failures:
+            print(f"✗ {len(failures)} of {len(results)} renders under {args.min_precision_snr} dB")
+            return 1
+        return 0
+    
+    # Resolved before chdir so a relative trace path lands where the user ran the script
+    trace_path = os.path.abspath(args.trace) if args.trace else None
+    trace_events = [] if trace_path else None
+    os.makedirs(args.out_dir, exist_ok=True)
+    os.chdir(args.out_dir)
     
-    write_wav('ting.wav', samples)
+    print("Generating audio files...")
+    start = time.perf_counter()
+    built = build(args.only, jobs=args.jobs, force=args.force,
+                  voice_cache_bytes=int(args.voice_cache_mb * 2**20),
+                  formats=('pcm16', 'adpcm') if args.adpcm else ('pcm16',),
+                  min_snr_db=args.min_snr, shard_workers=args.shard_jobs, precision=args.precision,
+                  trace_events=trace_events)
+    print(f"All audio files generated successfully! "
+          f"({len(built)} rebuilt in {time.perf_counter() - start:.2f}s)")
+    
+    # Repack the SFX sprite whenever one of its sources changed
+    if all(os.path.exists(name + '.wav') for name in pack_sprites.SPRITE_SOUNDS) and \
+            pack_sprites.is_stale():
+        with tracing.span('pack_sprites', 'sprite'):
+            manifest = pack_sprites.pack()
+        print(f"✓ Packed {len(manifest['sprites'])} sounds into {manifest['file']}")
+    
+    if trace_path:
+        trace_events.extend(tracing.drain())
+        tracing.write_chrome_trace(trace_path, trace_events)
+        print(f"✓ Wrote {len(trace_events)} spans to {trace_path}")
+        print(tracing.format_summary(tracing.summary(trace_events, args.trace_top)))
 
 if __name__ == "__main__":
-    print("Generating audio files...")
-    
-    generate_hit_sound()
-    print("✓ Generated hit.wav")
-    
-    generate_mole_pop_sound()
-    print("✓ Generated mole_pop.wav")
-    
-    generate_game_over_sound()
-    print("✓ Generated game_over.wav")
-    
-    generate_background_music()
-    print("✓ Generated background_music.wav")
-    
-    generate_ambient_sound()
-    print("✓ Generated ambient_music.wav")
-    
-    generate_explosion_sound()
-    print("✓ Generated explosion.wav")
-    
-    generate_hammer_hit_sound()
-    print("✓ Generated hammer_hit.wav")
-    
-    generate_button_click_sound()
-    print("✓ Generated button_click.wav")
-    
-    generate_ting_sound()
-    print("✓ Generated ting.wav")
-    
-    print("All audio files generated successfully!")
\ No newline at end of file
+    sys.exit(main())
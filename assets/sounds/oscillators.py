@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Band-limited wavetable oscillator bank
+Replaces sums of np.sin harmonics with one table lookup per sample: each
+timbre is precomputed as a single-cycle wavetable, mip-mapped by pitch range
+so partials above Nyquist are never played, and sampled with a vectorized
+phase lookup and linear interpolation
+"""
+
+from fractions import Fraction
+from functools import lru_cache
+
+import numpy as np
+
+import tracing
+
+# Partials are rationals of the note frequency with denominators up to this
+MAX_RATIO_DENOMINATOR = 256
+
+class Wavetable:
+    """Single-cycle wavetable for a timbre given as (frequency ratio, amplitude) partials
+
+    Ratios may be fractional (e.g. 1.5 for a fifth): they are expressed as
+    integer harmonics of a common sub-fundamental freq / divisor.
+    """
+
+    def __init__(self, partials, sample_rate=44100):
+        self.partials = tuple((float(ratio), float(amp)) for ratio, amp in partials)
+        self.sample_rate = sample_rate
+
+        ratios = [Fraction(ratio).limit_denominator(MAX_RATIO_DENOMINATOR) for ratio, _ in self.partials]
+        for (ratio, _), exact in zip(self.partials, ratios):
+            if ratio <= 0 or abs(float(exact) - ratio) > 1e-9 * ratio:
+                raise ValueError(f"partial ratio {ratio} is not a positive rational with "
+                                 f"denominator <= {MAX_RATIO_DENOMINATOR}")
+        self.divisor = int(np.lcm.reduce([ratio.denominator for ratio in ratios]))
+        harmonics = np.array([int(ratio * self.divisor) for ratio in ratios])
+        amps = np.array([amp for _, amp in self.partials])
+        order = np.argsort(harmonics, kind='stable')
+        self.harmonics = harmonics[order]
+        amps = amps[order]
+
+        # Enough points per cycle of the highest harmonic for ~-60dB interpolation error
+        self.size = max(1024, 1 << int(np.ceil(np.log2(64 * self.harmonics.max()))))
+
+        # Mip level i holds the i lowest partials: the set that stays below
+        # Nyquist for sub-fundamentals between the cutoffs of partial i and i+1
+        cycle = np.arange(self.size + 1) / self.size  # +1 guard point for interpolation
+        levels = np.zeros((len(self.harmonics) + 1, self.size + 1))
+        for i, (harmonic, amp) in enumerate(zip(self.harmonics, amps)):
+            levels[i + 1:] += amp * np.sin(2 * np.pi * harmonic * cycle)
+        self.levels = levels
+        self._flat_levels = levels.ravel()
+
+    def level(self, freq):
+        """Mip level (number of partials below Nyquist) for a note frequency"""
+        cutoffs = (self.sample_rate / 2) / self.harmonics * self.divisor
+        # Partial i fits when freq < cutoff i; cutoffs descend with harmonic number
+        return np.searchsorted(-cutoffs, -np.asarray(freq, dtype=np.float64), side='left')
+
+    def at_phase(self, phase, freq, out=None):
+        """Sample the table at a phase in note cycles, band-limited for freq (into out if given)"""
+        with tracing.span('wavetable', 'oscillator', samples=int(np.size(phase))):
+            pos = np.asarray(phase, dtype=np.float64) / self.divisor  # Cycles of the sub-fundamental
+            pos = (pos - np.floor(pos)) * self.size
+            index = pos.astype(np.intp)
+            frac = pos - index
+            level = self.level(freq)
+            if np.ndim(level) == 0:
+                table = self.levels[level]
+                low, high = table[index], table[index + 1]
+            else:
+                index = index + level * (self.size + 1)
+                low, high = self._flat_levels[index], self._flat_levels[index + 1]
+            high -= low
+            high *= frac
+            return np.add(low, high, out=out)
+
+    def __call__(self, freq, t, out=None):
+        """Play the timbre at constant frequency freq over time axis t (broadcastable)"""
+        return self.at_phase(freq * t, freq, out)
+
+@lru_cache(maxsize=None)
+def _wavetable(partials, sample_rate):
+    return Wavetable(partials, sample_rate)
+
+def wavetable(partials, sample_rate=44100):
+    """Shared Wavetable for a list of (ratio, amplitude) partials, built on first use"""
+    return _wavetable(tuple((float(ratio), float(amp)) for ratio, amp in partials), sample_rate)
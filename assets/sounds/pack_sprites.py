@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Pack the short sound effects into a single audio sprite
+Trims leading/trailing silence from each SFX WAV, concatenates them into one
+sprite WAV with sample-accurate offsets and writes a JSON manifest of
+{name: [start, duration]} in seconds. Looping music stays in its own files.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import wave
+
+import numpy as np
+
+# Sound effects packed into the sprite (looping music is served separately)
+SPRITE_SOUNDS = ['hit', 'mole_pop', 'game_over', 'explosion', 'hammer_hit', 'button_click', 'ting']
+
+SPRITE_FILE = 'sfx_sprite.wav'
+MANIFEST_FILE = 'sfx_sprite.json'
+
+def read_wav(filename):
+    """Read a 16-bit mono WAV file into an int16 array"""
+    with wave.open(filename, 'r') as wav_file:
+        if wav_file.getnchannels() != 1 or wav_file.getsampwidth() != 2:
+            raise ValueError(f"{filename}: expected 16-bit mono audio")
+        frames = wav_file.readframes(wav_file.getnframes())
+        return np.frombuffer(frames, dtype=np.int16), wav_file.getframerate()
+
+def trim_silence(samples, threshold_db=-60.0):
+    """Drop leading and trailing samples quieter than threshold_db (dBFS)"""
+    threshold = 32767 * 10 ** (threshold_db / 20)
+    loud = np.flatnonzero(np.abs(samples.astype(np.int32)) > threshold)
+    if len(loud) == 0:
+        return samples[:0]
+    return samples[loud[0]:loud[-1] + 1]
+
+def source_digests(directory, names):
+    """sha256 of every source WAV, used to skip repacking unchanged inputs"""
+    digests = {}
+    for name in names:
+        with open(os.path.join(directory, name + '.wav'), 'rb') as f:
+            digests[name] = hashlib.file_digest(f, 'sha256').hexdigest()
+    return digests
+
+def pack(directory='.', names=SPRITE_SOUNDS, threshold_db=-60.0, gap=0.05):
+    """Build the sprite and manifest in directory from its SFX WAV files"""
+    sample_rate = None
+    gap_samples = 0
+    chunks = []
+    sprites = {}
+    position = 0
+
+    for name in names:
+        samples, rate = read_wav(os.path.join(directory, name + '.wav'))
+        if sample_rate is None:
+            sample_rate = rate
+            gap_samples = int(gap * sample_rate)
+        elif rate != sample_rate:
+            raise ValueError(f"{name}.wav: sample rate {rate} differs from {sample_rate}")
+
+        samples = trim_silence(samples, threshold_db)
+        sprites[name] = [round(position / sample_rate, 6), round(len(samples) / sample_rate, 6)]
+
+        # Silent gap so a late stop never bleeds into the next sound
+        chunks.append(samples)
+        chunks.append(np.zeros(gap_samples, dtype=np.int16))
+        position += len(samples) + gap_samples
+
+    # Written to temporary files and renamed, so the game never loads a partial sprite
+    sprite_path = os.path.join(directory, SPRITE_FILE)
+    with wave.open(sprite_path + '.tmp', 'w') as wav_file:
+        wav_file.setnchannels(1)  # Mono
+        wav_file.setsampwidth(2)  # 16-bit
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(np.concatenate(chunks).tobytes())
+
+    manifest = {
+        'file': SPRITE_FILE,
+        'sample_rate': sample_rate,
+        'sprites': sprites,
+        'sources': source_digests(directory, names),
+    }
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(sprite_path + '.tmp', sprite_path)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return manifest
+
+def is_stale(directory='.', names=SPRITE_SOUNDS):
+    """True when the sprite is missing or any source WAV changed since packing"""
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return True
+    if not os.path.exists(os.path.join(directory, manifest.get('file', SPRITE_FILE))):
+        return True
+    return manifest.get('sources') != source_digests(directory, names)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--dir', default=os.path.dirname(os.path.abspath(__file__)),
+                        help='directory containing the SFX WAV files')
+    parser.add_argument('--silence-db', type=float, default=-60.0,
+                        help='trim threshold in dBFS (default: %(default)s)')
+    parser.add_argument('--gap-ms', type=float, default=50.0,
+                        help='silence between sprites in milliseconds (default: %(default)s)')
+    parser.add_argument('--force', action='store_true', help='repack even if sources are unchanged')
+    args = parser.parse_args(argv)
+
+    if not args.force and not is_stale(args.dir):
+        print(f"· {SPRITE_FILE} is up to date")
+        return
+
+    manifest = pack(args.dir, threshold_db=args.silence_db, gap=args.gap_ms / 1000)
+    for name, (start, duration) in manifest['sprites'].items():
+        print(f"✓ {name}: {start:.4f}s +{duration:.4f}s")
+    print(f"Packed {len(manifest['sprites'])} sounds into {SPRITE_FILE}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Warm render daemon for the game's sounds
+Keeps NumPy and the generators loaded, with the scratch-buffer arena, voice
+cache and oscillator tables warm, and polls the generator sources and the
+sound specs. When a source file is saved, the daemon reloads that module
+and every module that imports it; sound_specs.toml counts as soundspec.py.
+It then re-renders only the targets whose fingerprint changed (see
+generate_audio_files.dependencies()). Renders go to a staging
+directory first, and each output replaces the old WAV with os.replace, so
+the game never reads a half-written file. Editing one note of an ambient
+pattern updates ambient_music.wav alone.
+"""
+
+import argparse
+import contextlib
+import hashlib
+import importlib
+import inspect
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+
+import arena
+import generate_audio_files as generators
+import pack_sprites
+import voices
+
+SOURCE_DIR = generators.SOURCE_DIR
+
+POLL_INTERVAL = 0.1
+
+# Editors often save in several writes; wait until the sources stop changing
+SETTLE_SECONDS = 0.05
+
+def local_modules():
+    """Loaded modules whose source file lives in this directory, by module name"""
+    return {module.__name__: module for module in list(sys.modules.values())
+            if module.__name__ not in ('__main__', __name__) and getattr(module, '__file__', None)
+            and os.path.dirname(os.path.abspath(module.__file__)) == SOURCE_DIR}
+
+def snapshot(modules):
+    """(mtime, size) of each module's source file and the DATA_FILES it loads, keyed by module name"""
+    stats = {}
+    for name, module in modules.items():
+        try:
+            files = [os.stat(path) for path in (module.__file__, *getattr(module, 'DATA_FILES', ()))]
+        except FileNotFoundError:
+            continue  # Mid-save; the next poll sees the new file
+        stats[name] = tuple((stat.st_mtime_ns, stat.st_size) for stat in files)
+    return stats
+
+def reload_order(changed, modules):
+    """The changed modules plus every module importing them, dependencies first"""
+    imports = {name: {value.__name__ for value in vars(module).values()
+                      if inspect.ismodule(value) and value.__name__ in modules}
+               for name, module in modules.items()}
+    affected = set(changed)
+    while True:
+        importers = {name for name, deps in imports.items() if deps & affected} - affected
+        if not importers:
+            break
+        affected |= importers
+    order = []
+    visited = set()
+
+    def visit(name):
+        if name in visited:
+            return
+        visited.add(name)
+        for dep in sorted(imports[name]):
+            visit(dep)
+        if name in affected:
+            order.append(name)
+
+    for name in sorted(affected):
+        visit(name)
+    return order
+
+def instrument_digests():
+    """Hash of each instrument's code and its dependencies, to evict voices of edited ones"""
+    digests = {}
+    for name, func in generators.INSTRUMENTS.items():
+        digest = hashlib.sha256(inspect.getsource(func).encode())
+        for key, dependency in sorted(generators.dependencies(func).items()):
+            digest.update(key.encode())
+            digest.update(inspect.getsource(dependency).encode())
+        digests[name] = digest.hexdigest()
+    return digests
+
+class RenderDaemon:
+    """Re-renders stale targets in this process, reloading edited generator code"""
+
+    def __init__(self, names=None, formats=('pcm16',), min_snr_db=generators.DEFAULT_MIN_SNR_DB,
+                 voice_cache_bytes=voices.DEFAULT_MAX_BYTES, precision='float64', draft=False):
+        self.names = names
+        self.draft = draft
+        self.formats = formats
+        self.min_snr_db = min_snr_db
+        self.voice_cache_bytes = voice_cache_bytes
+        self.precision = precision
+        generators.configure_worker(voice_cache_bytes, 1, precision)
+        self.voices = instrument_digests()
+        self.modules = local_modules()
+        self.sources = snapshot(self.modules)
+        # Same filesystem as the outputs, so os.replace is an atomic rename
+        self.staging = tempfile.mkdtemp(prefix='.render-', dir='.')
+
+    def close(self):
+        shutil.rmtree(self.staging, ignore_errors=True)
+
+    def changed_modules(self):
+        """Names of modules whose source changed since the last call"""
+        self.modules = local_modules()
+        sources = snapshot(self.modules)
+        changed = {name for name, stat in sources.items() if self.sources.get(name) != stat}
+        self.sources = sources
+        return changed
+
+    def reload(self, changed):
+        """Reload changed modules and their importers, keeping warm state that is still valid"""
+        buffers, cache = generators.ARENA, generators.VOICE_CACHE
+        order = reload_order(changed, self.modules)
+        try:
+            for name in order:
+                importlib.reload(self.modules[name])
+        except Exception as error:
+            print(f"✗ Reloading {name} failed: {type(error).__name__}: {error}")
+            return False
+
+        # Reloading generate_audio_files creates an empty arena and voice cache; keep the
+        # old ones unless their own code changed
+        if 'arena' not in order:
+            generators.ARENA = buffers
+        if 'voices' not in order and 'engine' not in order:
+            # Voices are keyed by instrument name, so drop those of edited instruments
+            digests = instrument_digests()
+            edited = {name for name, digest in digests.items() if self.voices.get(name) != digest}
+            cache.discard(lambda key: key[0] in edited)
+            generators.VOICE_CACHE = cache
+        self.voices = instrument_digests()
+        generators.configure_worker(self.voice_cache_bytes, 1, self.precision)
+        print(f"· Reloaded {', '.join(order)}")
+        return True
+
+    def rebuild(self):
+        """Render the stale targets and move each output into place; returns their names"""
+        names = list(self.names or generators.GENERATORS)
+        # Draft renders skip the music re-encoding; their fingerprints differ, so a normal build redoes them
+        policies = {name: None if self.draft else generators.output_policy(name, self.formats, self.min_snr_db)
+                    for name in names}
+        manifest = generators.load_manifest()
+        stale = [name for name in names if not generators.is_fresh(name, manifest.get(name), policies[name])]
+        built = []
+        for name in stale:
+            filename = generators.GENERATORS[name][1]
+            try:
+                with contextlib.chdir(self.staging):
+                    _, output_sha256, seconds, _, _, _ = generators.render_target(name, policies[name])
+            except Exception as error:
+                print(f"✗ {filename}: {type(error).__name__}: {error}")
+                for leftover in os.listdir(self.staging):
+                    os.remove(os.path.join(self.staging, leftover))
+                continue
+            # A variant bank writes its JSON index next to the WAV; move the WAV last
+            for output in sorted(os.listdir(self.staging), key=lambda path: path == filename):
+                os.replace(os.path.join(self.staging, output), output)
+            manifest[name] = generators.manifest_entry(name, output_sha256, seconds, policies[name])
+            built.append(name)
+            print(f"✓ Rendered {filename} in {seconds * 1000:.0f}ms")
+        if stale:
+            generators.save_manifest(manifest)
+        if set(built) & set(pack_sprites.SPRITE_SOUNDS) and \
+                all(os.path.exists(name + '.wav') for name in pack_sprites.SPRITE_SOUNDS):
+            manifest = pack_sprites.pack()
+            print(f"✓ Packed {len(manifest['sprites'])} sounds into {manifest['file']}")
+        return built
+
+    def watch(self, interval=POLL_INTERVAL):
+        """Poll the sources until interrupted, rebuilding after each save"""
+        while True:
+            time.sleep(interval)
+            changed = self.changed_modules()
+            if not changed:
+                continue
+            saved = time.time()
+            time.sleep(SETTLE_SECONDS)
+            changed |= self.changed_modules()
+            start = time.perf_counter()
+            if not self.reload(changed):
+                continue
+            built = self.rebuild()
+            print(f"{len(built)} rebuilt in {(time.perf_counter() - start) * 1000:.0f}ms "
+                  f"({(time.time() - saved) * 1000:.0f}ms after the save was noticed)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--only', action='append', choices=sorted(generators.GENERATORS), metavar='NAME',
+                        help='keep only this target up to date (repeatable)')
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL,
+                        help='seconds between source polls (default: %(default)s)')
+    parser.add_argument('--voice-cache-mb', type=float, default=voices.DEFAULT_MAX_BYTES / 2**20,
+                        help='memory cap for rendered note voices (default: %(default)s)')
+    parser.add_argument('--adpcm', action='store_true',
+                        help='also consider IMA-ADPCM variants for re-encoded music and banks')
+    parser.add_argument('--min-snr', type=float, default=generators.DEFAULT_MIN_SNR_DB,
+                        help='quality threshold for re-encoded variants in dB (default: %(default)s)')
+    parser.add_argument('--precision', choices=arena.PRECISIONS, default='float64',
+                        help='sample format generators render in (default: %(default)s)')
+    parser.add_argument('--draft', action='store_true',
+                        help='keep music at 44.1kHz PCM instead of re-encoding it, for faster previews')
+    parser.add_argument('--out-dir', default=SOURCE_DIR,
+                        help='directory to write WAV files and the cache manifest to')
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    os.chdir(args.out_dir)
+    daemon = RenderDaemon(args.only, ('pcm16', 'adpcm') if args.adpcm else ('pcm16',), args.min_snr,
+                          int(args.voice_cache_mb * 2**20), args.precision, args.draft)
+    # A plain kill stops the daemon like Ctrl+C does, removing the staging directory
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        built = daemon.rebuild()
+        print(f"Watching {SOURCE_DIR} ({len(built)} stale targets rendered at startup; Ctrl+C to stop)")
+        daemon.watch(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
+
+if __name__ == "__main__":
+    main()
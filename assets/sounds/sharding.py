@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Multicore time-sharded rendering of a single long track
+Splits the timeline into contiguous shards rendered by worker processes
+straight into one multiprocessing.shared_memory buffer. Notes crossing a
+shard boundary are rendered by every shard they overlap, and each shard
+replays the streaming renderer's per-block engine calls, so every sample is
+accumulated in the same order as the serial render and matches it bit for bit
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import engine
+import streaming
+import voices
+
+# Per-process voice cache for shards rendered in this process
+_SHARD_CACHE = voices.VoiceCache()
+
+def shard_bounds(total_samples, shards):
+    """Split [0, total_samples) into contiguous (start, end) sample ranges"""
+    edges = np.linspace(0, total_samples, max(1, shards) + 1).astype(np.int64)
+    return [(int(lo), int(hi)) for lo, hi in zip(edges[:-1], edges[1:]) if hi > lo]
+
+def render_shard(out, shard_start, events, instruments, sample_rate=44100,
+                 block_size=streaming.DEFAULT_BLOCK_SIZE, cache=None):
+    """Mix the events overlapping out into it, where out[0] is sample shard_start
+
+    events must be sorted by start like streaming.render_blocks sorts them.
+    Events are grouped by the streaming block they start in and each group
+    is rendered with one engine call, in block order, as the serial render does.
+    """
+    start_samples, end_samples = engine.event_spans(events, sample_rate)
+    overlapping = (end_samples > shard_start) & (start_samples < shard_start + len(out))
+    events = events[overlapping]
+    blocks = start_samples[overlapping] // block_size
+    boundaries = np.flatnonzero(np.diff(blocks)) + 1
+    for group in np.split(np.arange(len(events)), boundaries):
+        if len(group):
+            engine.render_events(events[group], instruments, out, shard_start, sample_rate, cache=cache)
+    return out
+
+def _render_shard_worker(shm_name, total_samples, shard_start, shard_end, events, instruments,
+                         sample_rate, block_size, cache_bytes, dtype):
+    """Worker entry point: attach to the shared output and render one shard in place"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        track = np.ndarray(total_samples, dtype=dtype, buffer=shm.buf)
+        _SHARD_CACHE.max_bytes = cache_bytes
+        render_shard(track[shard_start:shard_end], shard_start, events, instruments,
+                     sample_rate, block_size, _SHARD_CACHE)
+        del track  # Release the buffer export before closing
+    finally:
+        shm.close()
+    return shard_start, shard_end
+
+def render_sharded(events, instruments, total_samples, sample_rate=44100,
+                   block_size=streaming.DEFAULT_BLOCK_SIZE, workers=None, shards=None,
+                   cache_bytes=voices.DEFAULT_MAX_BYTES, dtype=np.float64):
+    """Render a whole event table across worker processes; returns the track
+
+    The result is identical to concatenating streaming.render_blocks with the
+    same block_size and dtype. Unlike the streaming renderer it holds the full track in
+    memory. Shards always take the engine's cached path, as the streaming
+    render of generate_ambient_sound does; cache_bytes=0 just stores nothing.
+    """
+    workers = workers or os.cpu_count() or 1
+    events = np.sort(events, order='start')
+    bounds = shard_bounds(total_samples, shards or workers)
+    if workers == 1 or len(bounds) <= 1:
+        track = np.zeros(total_samples, dtype)
+        _SHARD_CACHE.max_bytes = cache_bytes
+        for shard_start, shard_end in bounds:
+            render_shard(track[shard_start:shard_end], shard_start, events, instruments,
+                         sample_rate, block_size, _SHARD_CACHE)
+        return track
+
+    dtype = np.dtype(dtype)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, total_samples * dtype.itemsize))
+    try:
+        shared = np.ndarray(total_samples, dtype=dtype, buffer=shm.buf)
+        shared[:] = 0
+        with ProcessPoolExecutor(max_workers=min(workers, len(bounds))) as pool:
+            futures = [pool.submit(_render_shard_worker, shm.name, total_samples, shard_start, shard_end,
+                                   events, instruments, sample_rate, block_size, cache_bytes, dtype)
+                       for shard_start, shard_end in bounds]
+            for future in futures:
+                future.result()
+        track = shared.copy()
+        del shared
+    finally:
+        shm.close()
+        shm.unlink()
+    return track
+
+def track_blocks(track, block_size=streaming.DEFAULT_BLOCK_SIZE):
+    """Yield a rendered track as consecutive block views, for the streaming post-processing"""
+    for block_start in range(0, len(track), block_size):
+        yield track[block_start:block_start + block_size]
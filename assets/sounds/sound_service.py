@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+On-demand sound synthesis service
+Serves parameterized sound effects such as /sound/ting?pitch=1.12&decay=1.5
+rendered from the build's own sound specs and encoded to WAV in memory.
+Rendered files are kept in an LRU cache bounded by total bytes; concurrent
+requests for a sound that is still rendering wait for that render instead of
+starting their own. /metrics reports cache and response-time statistics as JSON.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import socket
+import time
+import wave
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+import arena
+import generate_audio_files as generators
+import variations
+import voices
+
+# Renderable sounds of generators.SPECS: name -> noise seed of the original sound, or None
+# for sounds without noise, which do not accept a seed
+SOUNDS = {name: generators.SPECS[name].get('seed') for name in ('hit', 'mole_pop', 'hammer_hit', 'ting')}
+
+# Accepted parameter ranges (pitch ratio, decay scale, noise seed)
+PITCH_RANGE = (0.25, 4.0)
+DECAY_RANGE = (0.1, 10.0)
+SEED_RANGE = (0, 2**32 - 1)
+
+DEFAULT_CACHE_BYTES = 32 * 1024 * 1024
+SAMPLE_RATE = 44100
+
+# Response times kept per outcome for the percentiles in /metrics
+LATENCY_WINDOW = 10000
+
+MAX_HEADER_BYTES = 16 * 1024
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+def parse_params(query, seeded=True):
+    """Validate a query string into (pitch, decay, seed); raises ValueError
+
+    seeded is whether the sound has noise; a seed for one that does not
+    would only create cache entries identical to the unseeded render.
+    """
+    values = {name: items[-1] for name, items in parse_qs(query).items()}
+    unknown = set(values) - {'pitch', 'decay', 'seed'}
+    if unknown:
+        raise ValueError(f"unknown parameter {sorted(unknown)[0]!r}")
+    if 'seed' in values and not seeded:
+        raise ValueError("this sound has no noise, so it takes no seed")
+    pitch = float(values.get('pitch', 1.0))
+    decay = float(values.get('decay', 1.0))
+    seed = int(values['seed']) if 'seed' in values else None
+    if not PITCH_RANGE[0] <= pitch <= PITCH_RANGE[1]:
+        raise ValueError(f"pitch must be between {PITCH_RANGE[0]} and {PITCH_RANGE[1]}")
+    if not DECAY_RANGE[0] <= decay <= DECAY_RANGE[1]:
+        raise ValueError(f"decay must be between {DECAY_RANGE[0]} and {DECAY_RANGE[1]}")
+    if seed is not None and not SEED_RANGE[0] <= seed <= SEED_RANGE[1]:
+        raise ValueError(f"seed must be between {SEED_RANGE[0]} and {SEED_RANGE[1]}")
+    # Rounded so near-identical requests share one cache entry
+    return round(pitch, 4), round(decay, 4), seed
+
+def encode_wav(samples, sample_rate=SAMPLE_RATE):
+    """16-bit mono WAV file of float samples, as bytes"""
+    buffer = io.BytesIO()
+    converter = arena.Pcm16Converter(samples.dtype)
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)  # Mono
+        wav_file.setsampwidth(2)  # 16-bit
+        wav_file.setframerate(sample_rate)
+        for frames in converter.frames(samples):
+            wav_file.writeframesraw(frames)
+    return buffer.getvalue()
+
+def render_sound(name, pitch=1.0, decay=1.0, seed=None, sample_rate=SAMPLE_RATE):
+    """Render one variant of a sound to WAV bytes"""
+    if seed is None:
+        seed = SOUNDS[name] if SOUNDS[name] is not None else 0  # Unused by sounds without noise
+    params = np.array([[(pitch, decay, seed)]], dtype=variations.VARIANT_DTYPE)
+    with generators.rendered(name, params, sample_rate) as samples:
+        return encode_wav(samples[0, 0], sample_rate)
+
+class Metrics:
+    """Request counters and a sliding window of response times per outcome"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.counts = {}
+        self.latencies = {}
+        self.window = window
+        self.started = time.monotonic()
+
+    def record(self, outcome, seconds):
+        self.counts[outcome] = self.counts.get(outcome, 0) + 1
+        self.latencies.setdefault(outcome, deque(maxlen=self.window)).append(seconds)
+
+    def summary(self):
+        """Counts plus p50/p90/p99/max response times in microseconds"""
+        latency = {}
+        for outcome, samples in self.latencies.items():
+            values = np.array(samples) * 1e6
+            p50, p90, p99 = np.percentile(values, [50, 90, 99])
+            latency[outcome] = {'p50_us': round(p50, 1), 'p90_us': round(p90, 1),
+                                'p99_us': round(p99, 1), 'max_us': round(values.max(), 1)}
+        return {'uptime_s': round(time.monotonic() - self.started, 1),
+                'requests': dict(self.counts), 'latency': latency}
+
+class SoundService:
+    """Renders, caches and coalesces sound requests"""
+
+    def __init__(self, cache_bytes=DEFAULT_CACHE_BYTES, sample_rate=SAMPLE_RATE):
+        self.cache = voices.VoiceCache(cache_bytes)
+        self.sample_rate = sample_rate
+        self.metrics = Metrics()
+        self._inflight = {}
+        self.renders = 0
+        # The renderers share generators.ARENA, whose take()/give() are not thread-safe, so
+        # every render runs on this one thread (renders take milliseconds; the cache absorbs bursts)
+        self._renderer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='render')
+
+    async def get(self, key):
+        """WAV bytes for (name, pitch, decay, seed) and how they were obtained
+
+        The outcome is 'hit' (from the cache), 'coalesced' (waited for a
+        render another request started) or 'miss' (rendered here).
+        """
+        body = self.cache.lookup(key)
+        if body is not None:
+            return body, 'hit'
+        render = self._inflight.get(key)
+        if render is not None:
+            return await asyncio.shield(render), 'coalesced'
+
+        # The render is its own task, so a client hanging up does not cancel it for the others
+        render = self._inflight[key] = asyncio.ensure_future(self._render(key))
+        return await asyncio.shield(render), 'miss'
+
+    async def _render(self, key):
+        try:
+            loop = asyncio.get_running_loop()
+            wav = await loop.run_in_executor(self._renderer, render_sound, *key, self.sample_rate)
+            self.renders += 1
+            return self.cache.put(key, np.frombuffer(wav, dtype=np.uint8))
+        finally:
+            del self._inflight[key]
+
+    def stats(self):
+        """Metrics summary with cache statistics"""
+        summary = self.metrics.summary()
+        summary['cache'] = self.cache.stats()
+        summary['cache']['max_bytes'] = self.cache.max_bytes
+        summary['renders'] = self.renders
+        summary['inflight'] = len(self._inflight)
+        return summary
+
+class SoundServer:
+    """Minimal asyncio HTTP/1.1 front end for a SoundService"""
+
+    def __init__(self, service, keepalive_timeout=15.0, access_log=False):
+        self.service = service
+        self.keepalive_timeout = keepalive_timeout
+        self.access_log = access_log
+
+    async def handle_connection(self, reader, writer):
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.keepalive_timeout)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError,
+                        asyncio.LimitOverrunError):
+                    break
+                if not await self.handle_request(head, writer):
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, head, writer):
+        """Serve one request; returns whether the connection stays open"""
+        start = time.perf_counter()
+        try:
+            request_line, *header_lines = head.decode('latin-1').split('\r\n')
+            method, target, version = request_line.split(' ', 2)
+        except ValueError:
+            await self.send(writer, 400, 'Bad Request', b'400 Bad Request\n', keep_alive=False)
+            return False
+
+        headers = {}
+        for line in header_lines:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+        url = urlsplit(target)
+        outcome, status = await self.route(method, url, headers, writer, keep_alive)
+        self.service.metrics.record(outcome, time.perf_counter() - start)
+        if self.access_log:
+            print(f'{method} {target} {status} ({outcome})')
+        return keep_alive
+
+    async def route(self, method, url, headers, writer, keep_alive):
+        """Dispatch a request; returns (metrics outcome, status)"""
+        if method not in ('GET', 'HEAD'):
+            await self.send(writer, 405, 'Method Not Allowed', b'405 Method Not Allowed\n', keep_alive,
+                            extra={'Allow': 'GET, HEAD'})
+            return 'error', 405
+
+        if url.path == '/metrics':
+            body = json.dumps(self.service.stats(), indent=2).encode()
+            await self.send(writer, 200, 'OK', body, keep_alive, 'application/json', method=method,
+                            extra={'Cache-Control': 'no-store'})
+            return 'metrics', 200
+
+        name = url.path[len('/sound/'):] if url.path.startswith('/sound/') else None
+        if name not in SOUNDS:
+            await self.send(writer, 404, 'Not Found', b'404 Not Found\n', keep_alive)
+            return 'error', 404
+        try:
+            key = (name, *parse_params(url.query, seeded=SOUNDS[name] is not None))
+        except ValueError as error:
+            await self.send(writer, 400, 'Bad Request', f'400 Bad Request: {error}\n'.encode(), keep_alive)
+            return 'error', 400
+
+        try:
+            body, outcome = await self.service.get(key)
+        except Exception as error:
+            print(f"✗ Rendering {key}: {type(error).__name__}: {error}")
+            await self.send(writer, 500, 'Internal Server Error', b'500 Internal Server Error\n', keep_alive)
+            return 'error', 500
+        etag = '"' + '-'.join(str(part) for part in key) + '"'
+        extra = {'ETag': etag, 'Cache-Control': IMMUTABLE_CACHE_CONTROL, 'X-Render-Cache': outcome}
+        if headers.get('if-none-match') == etag:
+            await self.send(writer, 304, 'Not Modified', b'', keep_alive, extra=extra, method='HEAD')
+            return outcome, 304
+        await self.send(writer, 200, 'OK', body, keep_alive, 'audio/wav', method=method, extra=extra)
+        return outcome, 200
+
+    async def send(self, writer, status, reason, body, keep_alive, content_type='text/plain; charset=utf-8',
+                   method='GET', extra=None):
+        lines = [f'HTTP/1.1 {status} {reason}', 'Server: WhackMaster-Synth',
+                 f'Content-Type: {content_type}', f'Content-Length: {len(body)}']
+        lines += [f'{name}: {value}' for name, value in (extra or {}).items()]
+        if not keep_alive:
+            lines.append('Connection: close')
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        if method == 'GET' and len(body):
+            writer.write(memoryview(body))
+        await writer.drain()
+
+async def serve(host, port, cache_bytes=DEFAULT_CACHE_BYTES, **options):
+    # One throwaway render per sound, so the first request does not pay for NumPy warm-up
+    for name in SOUNDS:
+        render_sound(name)
+    server = SoundServer(SoundService(cache_bytes), **options)
+    listener = await asyncio.start_server(server.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+    async with listener:
+        await listener.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5050)
+    parser.add_argument('--cache-mb', type=float, default=DEFAULT_CACHE_BYTES / 2**20,
+                        help='memory cap for rendered WAV files (default: %(default)s)')
+    parser.add_argument('--keepalive-timeout', type=float, default=15.0,
+                        help='seconds an idle keep-alive connection stays open (default: %(default)s)')
+    parser.add_argument('--access-log', action='store_true', help='print one line per request')
+    args = parser.parse_args(argv)
+
+    print(f'Synthesizing {", ".join(SOUNDS)} on http://{args.host}:{args.port}/sound/<name>')
+    try:
+        asyncio.run(serve(args.host, args.port, int(args.cache_mb * 2**20),
+                          keepalive_timeout=args.keepalive_timeout, access_log=args.access_log))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,559 @@
+#!/usr/bin/env python3
+"""
+Declarative sound specs compiled into one shared signal graph
+Each sound in sound_specs.toml (or a .json file of the same shape) is a
+duration plus layers, and each layer is a signal expression over its own
+time axis t, e.g. "sin(2 * pi * pitch * ramp(800, 400) * t) * exp(-t / 0.03)".
+The short effects of generate_audio_files.py and their variation banks are
+rendered from this library. All sounds of a library are compiled into a
+single DAG: identical subexpressions (time axes, phases, envelopes, noise)
+become one node no matter which sound or layer asks for them, constant
+factors and offsets are folded, and the graph is evaluated in one scheduled
+pass where every elementwise step whose input dies there runs in place in
+that input's buffer, and buffers go back to the arena after their last use.
+
+A render takes a variations grid (see variations.py): pitch varies along its
+rows and decay along its columns, so a node that depends on only one of them
+is computed once per row or column and broadcast, and a sound renders as an
+array of shape grid + (samples,).
+
+Expression language:
+  t                      layer time in seconds, linspace(0, duration) over the layer
+  T                      sound time in seconds over the layer's samples (T = start at its start)
+  pi                     the constant
+  pitch, decay           the variant's pitch ratio and decay scale (1 for the original)
+  + - * / **  < <= > >=  elementwise arithmetic; comparisons give 1.0 / 0.0
+  sin cos exp abs tanh   elementwise functions
+  ramp(a, b)             linear ramp from a to b over the layer
+  noise(seed, offset=0)  standard normal noise, samples offset.. of the seed's stream;
+                         the name seed stands for the variant's noise seed
+  where(cond, a, b)      a where cond is nonzero, else b
+  delay(x, seconds)      x shifted later by whole samples, silent before
+  wavetable(freq, [[ratio, amp], ...])   band-limited partials at a constant frequency
+  envelope([[time, value], ...])         piecewise-linear envelope: each segment is a
+                                         ramp over the samples between its times
+  lowpass(x, cutoff)     windowed-sinc FIR lowpass (cutoff in Hz)
+
+Sound fields: duration, layers (signal, start=0, duration=to the end, name
+for traces), seed (noise seed of the original sound, default 0), fade_out
+(seconds of linear fade at the end) and normalize (target peak per variant).
+"""
+
+import argparse
+import ast
+import json
+import math
+import os
+import time
+import tomllib
+from collections import namedtuple
+
+import numpy as np
+
+import arena
+import encoders
+import oscillators
+import streaming
+import tracing
+import variations
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SPEC_FILE = os.path.join(SOURCE_DIR, 'sound_specs.toml')
+
+# Files besides this module's source that its loaded state comes from (render_daemon.py watches them)
+DATA_FILES = (DEFAULT_SPEC_FILE,)
+
+# Taps of the lowpass() FIR filter (odd, so the filter has no delay in 'same' mode)
+LOWPASS_TAPS = 101
+
+# Reference to a graph node inside another node's arguments; plain floats are constants
+Ref = namedtuple('Ref', 'id')
+
+# Ops that compute out[i] from the inputs' [i] only, so they may overwrite a dying input
+ELEMENTWISE = {'sin', 'cos', 'exp', 'abs', 'tanh', 'add', 'mul', 'sub', 'div', 'rsub', 'rdiv',
+               'pow', 'lt', 'le', 'gt', 'ge', 'where'}
+
+UNARY = {'sin': np.sin, 'cos': np.cos, 'exp': np.exp, 'abs': np.abs, 'tanh': np.tanh}
+
+BINARY = {'add': np.add, 'mul': np.multiply, 'sub': np.subtract, 'div': np.divide, 'pow': np.power,
+          'lt': np.less, 'le': np.less_equal, 'gt': np.greater, 'ge': np.greater_equal}
+
+# Argument counts of the non-elementwise functions
+ARITY = {'ramp': (2,), 'noise': (1, 2), 'where': (3,), 'delay': (2,), 'wavetable': (2,), 'envelope': (1,),
+         'lowpass': (2,)}
+
+# Variant parameters an expression may name; the seed only as noise()'s first argument
+PARAMS = ('pitch', 'decay')
+
+COMPARISONS = {ast.Lt: 'lt', ast.LtE: 'le', ast.Gt: 'gt', ast.GtE: 'ge'}
+
+OPERATORS = {ast.Add: 'add', ast.Sub: 'sub', ast.Mult: 'mul', ast.Div: 'div', ast.Pow: 'pow'}
+
+FOLD = {'add': lambda a, b: a + b, 'sub': lambda a, b: a - b, 'mul': lambda a, b: a * b,
+        'div': lambda a, b: a / b, 'pow': lambda a, b: a ** b,
+        'lt': lambda a, b: float(a < b), 'le': lambda a, b: float(a <= b),
+        'gt': lambda a, b: float(a > b), 'ge': lambda a, b: float(a >= b)}
+
+class Graph:
+    """Hash-consed signal DAG: asking for an existing node returns it instead of a copy
+
+    Nodes are (op, length, *args) keys, stored in creation order, which is
+    a topological order since arguments always exist before their users.
+    """
+
+    def __init__(self, sample_rate=44100):
+        self.sample_rate = sample_rate
+        self.nodes = []
+        self._index = {}
+        self.requests = 0
+
+    def node(self, op, n, *args):
+        self.requests += 1
+        key = (op, n) + args
+        if key not in self._index:
+            self._index[key] = Ref(len(self.nodes))
+            self.nodes.append(key)
+        return self._index[key]
+
+    def _scalar(self, ref, op):
+        """The constant of an op(x, c) node, or None"""
+        node = self.nodes[ref.id]
+        return node[3] if node[0] == op and not isinstance(node[3], Ref) else None
+
+    def binary(self, op, n, a, b):
+        """a op b with constants folded and scalar chains merged"""
+        if not isinstance(a, Ref) and not isinstance(b, Ref):
+            return FOLD[op](a, b)
+        # Canonical forms: x - c is x + -c, x / c is x * (1/c), constants go second
+        if op == 'sub' and not isinstance(b, Ref):
+            op, b = 'add', -b
+        elif op == 'div' and not isinstance(b, Ref):
+            op, b = 'mul', 1 / b
+        elif op in ('sub', 'div') and not isinstance(a, Ref):
+            return self.node('r' + op, n, b, a)
+        if op in ('add', 'mul'):
+            if not isinstance(a, Ref) or (isinstance(b, Ref) and b.id < a.id):
+                a, b = b, a
+            if not isinstance(b, Ref):
+                identity = 0.0 if op == 'add' else 1.0
+                if b == identity:
+                    return a
+                # (x * c1) * c2 is x * (c1 * c2), likewise for +
+                inner = self._scalar(a, op)
+                if inner is not None:
+                    return self.binary(op, n, self.nodes[a.id][2], FOLD[op](inner, b))
+        return self.node(op, n, a, b)
+
+    def as_signal(self, value, n):
+        """A node for value, filling constants out to length n"""
+        return value if isinstance(value, Ref) else self.node('const', n, float(value))
+
+class LayerCompiler:
+    """Compiles one layer's expression into nodes of a shared Graph"""
+
+    def __init__(self, graph, n, duration, clock, sound, where):
+        self.graph = graph
+        self.n = n
+        self.duration = duration
+        self.clock = clock  # (sound duration, sound samples, layer start sample) for T
+        self.sound = sound  # noise(seed) streams are only shared within a sound
+        self.where = where
+        self.t = graph.node('time', n, duration)
+
+    def error(self, message):
+        return ValueError(f"{self.where}: {message}")
+
+    def compile(self, source):
+        try:
+            tree = ast.parse(source, mode='eval')
+        except SyntaxError as e:
+            raise self.error(f"invalid signal expression: {e.msg}") from None
+        return self.graph.as_signal(self.visit(tree.body), self.n)
+
+    def constant(self, node):
+        value = self.visit(node)
+        if isinstance(value, Ref):
+            raise self.error(f"{ast.unparse(node)} must be a constant")
+        return value
+
+    def pairs(self, node, name):
+        if not isinstance(node, ast.List) or not all(isinstance(item, ast.List) and len(item.elts) == 2
+                                                     for item in node.elts):
+            raise self.error(f"{name} takes a list of [x, y] pairs")
+        return tuple((float(self.constant(x)), float(self.constant(y))) for x, y in (item.elts for item in node.elts))
+
+    def visit(self, node):
+        g, n = self.graph, self.n
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) \
+                and not isinstance(node.value, bool):
+            return float(node.value)
+        if isinstance(node, ast.Name):
+            if node.id == 't':
+                return self.t
+            if node.id == 'T':
+                return g.node('clock', n, *self.clock)
+            if node.id == 'pi':
+                return math.pi
+            if node.id in PARAMS:
+                return g.node('param', 1, node.id)
+            raise self.error(f"unknown name '{node.id}'")
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            value = self.visit(node.operand)
+            return g.binary('mul', n, value, -1.0) if isinstance(node.op, ast.USub) else value
+        if isinstance(node, ast.BinOp) and type(node.op) in OPERATORS:
+            return g.binary(OPERATORS[type(node.op)], n, self.visit(node.left), self.visit(node.right))
+        if isinstance(node, ast.Compare) and len(node.ops) == 1 and type(node.ops[0]) in COMPARISONS:
+            left, right = self.visit(node.left), self.visit(node.comparators[0])
+            return g.binary(COMPARISONS[type(node.ops[0])], n, g.as_signal(left, n), right)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+            return self.call(node.func.id, node.args)
+        raise self.error(f"unsupported expression {ast.unparse(node)!r}")
+
+    def call(self, name, args):
+        g, n = self.graph, self.n
+        if name not in UNARY and name not in ARITY:
+            raise self.error(f"unknown function '{name}'")
+        arity = ARITY.get(name, (1,))
+        if len(args) not in arity:
+            raise self.error(f"{name}() takes {' or '.join(map(str, arity))} arguments")
+        if name in UNARY:
+            value = self.visit(args[0])
+            if not isinstance(value, Ref):
+                return float(UNARY[name](value))
+            return g.node(name, n, value)
+        if name == 'ramp':
+            return g.node('ramp', n, float(self.constant(args[0])), float(self.constant(args[1])))
+        if name == 'noise':
+            offset = self.constant(args[1]) if len(args) > 1 else 0
+            if isinstance(args[0], ast.Name) and args[0].id == 'seed':
+                return g.node('noise', n, 'seed', int(offset), self.sound)
+            return g.node('noise', n, int(self.constant(args[0])), int(offset), None)
+        if name == 'where':
+            cond, a, b = (self.visit(arg) for arg in args)
+            if not isinstance(cond, Ref):
+                return a if cond else b
+            return g.node('where', n, cond, g.as_signal(a, n), g.as_signal(b, n))
+        if name == 'delay':
+            shift = round(self.constant(args[1]) * g.sample_rate)
+            if shift < 0:
+                raise self.error("delay() cannot shift earlier")
+            return g.node('delay', n, g.as_signal(self.visit(args[0]), n), min(shift, n))
+        if name == 'wavetable':
+            return g.node('wavetable', n, self.visit(args[0]), self.pairs(args[1], name), self.t)
+        if name == 'envelope':
+            points = self.pairs(args[0], name)
+            if any(x1 < x0 for (x0, _), (x1, _) in zip(points, points[1:])):
+                raise self.error("envelope() times must not decrease")
+            return g.node('envelope', n, points)
+        return g.node('lowpass', n, g.as_signal(self.visit(args[0]), n), float(self.constant(args[1])))
+
+Layer = namedtuple('Layer', 'name start n output')
+
+Sound = namedtuple('Sound', 'name samples layers seed fade_out normalize')
+
+class Program:
+    """A compiled sound library: the shared graph and each sound's layers"""
+
+    def __init__(self, graph, sounds):
+        self.graph = graph
+        self.sounds = sounds
+        self.in_place = 0  # Steps the last render computed in an input's buffer
+
+        # Reference counts of live nodes; nodes left behind by folding are never evaluated
+        self.uses = [0] * len(graph.nodes)
+        for sound in sounds:
+            for layer in sound.layers:
+                self.uses[layer.output.id] += 1
+        for node_id in range(len(graph.nodes) - 1, -1, -1):
+            if self.uses[node_id]:
+                for arg in graph.nodes[node_id][2:]:
+                    if isinstance(arg, Ref):
+                        self.uses[arg.id] += 1
+
+    def stats(self):
+        live = sum(1 for count in self.uses if count)
+        return {'sounds': len(self.sounds), 'requested_nodes': self.graph.requests,
+                'unique_nodes': len(self.graph.nodes), 'live_nodes': live,
+                'shared_nodes': sum(1 for count in self.uses if count > 1)}
+
+def load_specs(path=DEFAULT_SPEC_FILE):
+    """Read a spec library from a .toml or .json file"""
+    if path.endswith('.json'):
+        with open(path) as f:
+            return json.load(f)
+    with open(path, 'rb') as f:
+        return tomllib.load(f)
+
+def compile_specs(specs, sample_rate=44100):
+    """Compile a {name: spec} library into one Program"""
+    graph = Graph(sample_rate)
+    sounds = []
+    for name, spec in specs.items():
+        if 'duration' not in spec or not spec.get('layers'):
+            raise ValueError(f"sound '{name}' needs a duration and at least one layer")
+        samples = int(sample_rate * spec['duration'])
+        layers = []
+        for i, layer in enumerate(spec['layers']):
+            where = f"sound '{name}' layer {i}"
+            # The layer covers samples int(start * rate) to int(end * rate), clipped to the sound
+            start = int(sample_rate * layer.get('start', 0))
+            duration = layer.get('duration', spec['duration'] - layer.get('start', 0))
+            n = min(int(sample_rate * (layer.get('start', 0) + duration)), samples) - start
+            if n <= 0 or 'signal' not in layer:
+                raise ValueError(f"{where}: needs a signal and must lie inside the sound")
+            compiler = LayerCompiler(graph, n, duration, (float(spec['duration']), samples, start), name, where)
+            layers.append(Layer(layer.get('name', f'layer {i}'), start, n, compiler.compile(layer['signal'])))
+        sounds.append(Sound(name, samples, layers, int(spec.get('seed', 0)), spec.get('fade_out', 0),
+                            spec.get('normalize')))
+    return Program(graph, sounds)
+
+def _lowpass_taps(cutoff, sample_rate):
+    """Hamming-windowed sinc with unity DC gain"""
+    k = np.arange(LOWPASS_TAPS) - LOWPASS_TAPS // 2
+    taps = np.sinc(2 * cutoff / sample_rate * k) * np.hamming(LOWPASS_TAPS)
+    return taps / taps.sum()
+
+def _shape(op, n, values, seeds):
+    """Shape of a node's output: its inputs broadcast against the layer's sample axis"""
+    shapes = [np.shape(value) for value in values if isinstance(value, np.ndarray)]
+    if op in ELEMENTWISE or op in ('delay', 'lowpass'):
+        return np.broadcast_shapes(*shapes)
+    if op == 'wavetable':
+        return np.broadcast_shapes(np.shape(values[0]), (n,))
+    if op == 'noise' and values[0] == 'seed':
+        return (len(seeds), 1, n)  # One stream per pitch row
+    return (n,)
+
+def _evaluate(op, args, out, sample_rate, buffers):
+    """Compute one node into out"""
+    values = [buffers[arg.id] if isinstance(arg, Ref) else arg for arg in args]
+    if op == 'time':
+        buffers.arena.linspace(out, 0, values[0])
+    elif op == 'clock':
+        duration, samples, start = values
+        np.multiply(buffers.arena.ramp(start + len(out))[start:], duration / (samples - 1), out=out)
+        if start + len(out) == samples:
+            out[-1] = duration
+    elif op == 'ramp':
+        buffers.arena.linspace(out, values[0], values[1])
+    elif op == 'const':
+        out.fill(values[0])
+    elif op == 'noise':
+        seed, offset, _ = values
+        for row, row_seed in zip(out.reshape(-1, out.shape[-1]), buffers.seeds if seed == 'seed' else [seed]):
+            rng = np.random.default_rng(row_seed)
+            if offset:
+                rng.standard_normal(offset)
+            buffers.arena.standard_normal(rng, row)
+    elif op in UNARY:
+        UNARY[op](values[0], out=out)
+    elif op in BINARY:
+        BINARY[op](values[0], values[1], out=out)
+    elif op in ('rsub', 'rdiv'):
+        BINARY[op[1:]](values[1], values[0], out=out)
+    elif op == 'where':
+        cond, a, b = values
+        if out is not b:
+            np.copyto(out, b)
+        np.copyto(out, a, where=cond != 0)
+    elif op == 'delay':
+        x, shift = values
+        out[..., :shift] = 0
+        out[..., shift:] = x[..., :out.shape[-1] - shift]
+    elif op == 'wavetable':
+        freq, partials, t = values
+        oscillators.wavetable(partials, sample_rate)(freq, t, out=out)
+    elif op == 'envelope':
+        # Each segment is linspace(y0, y1) over its own samples, as if the whole
+        # segment fitted in the layer; before the first and after the last point
+        # the envelope holds
+        points = values[0]
+        out.fill(points[0][1])
+        for (x0, y0), (x1, y1) in zip(points, points[1:]):
+            first, last = round(x0 * sample_rate), round(x1 * sample_rate)
+            if first >= len(out) or last <= first:
+                continue
+            if last <= len(out):
+                buffers.arena.linspace(out[first:last], y0, y1)
+            else:
+                with buffers.arena.borrow(last - first) as segment:
+                    out[first:] = buffers.arena.linspace(segment, y0, y1)[:len(out) - first]
+        out[min(round(points[-1][0] * sample_rate), len(out)):] = points[-1][1]
+    elif op == 'lowpass':
+        taps = _lowpass_taps(values[1], sample_rate)
+        for row, x in zip(out.reshape(-1, out.shape[-1]), values[0].reshape(-1, out.shape[-1])):
+            row[:] = np.convolve(x, taps, mode='same')
+    else:
+        raise ValueError(f"unknown op '{op}'")
+
+def _gaps(ranges, start, stop):
+    """The parts of [start, stop) outside every (start, stop) range in ranges"""
+    gaps = []
+    for first, last in sorted(ranges):
+        if first > start:
+            gaps.append((start, min(first, stop)))
+        start = max(start, last)
+        if start >= stop:
+            break
+    if start < stop:
+        gaps.append((start, stop))
+    return [(first, last) for first, last in gaps if first < last]
+
+class _Buffers(dict):
+    """Node id -> array of the values currently alive during evaluation"""
+
+    def __init__(self, pool):
+        super().__init__()
+        self.arena = pool
+        self.seeds = []  # Noise seed per pitch row of the current sound's grid
+
+def render(program, pool=None, params=None):
+    """Evaluate a Program for a variations grid, yielding (name, samples) per sound in order
+
+    params defaults to each sound's original (pitch 1, decay 1, its seed).
+    samples has shape params.shape + (samples,) and is an arena buffer that
+    is only valid until the next sound is produced. Each live node is
+    computed exactly once for the whole library.
+    """
+    pool = pool or arena.BufferArena()
+    graph = program.graph
+    remaining = list(program.uses)
+    cursor = 0
+    owned = set()  # Nodes whose buffer came from the pool
+
+    def release(ref):
+        remaining[ref.id] -= 1
+        if not remaining[ref.id]:
+            buffer = buffers.pop(ref.id)
+            if ref.id in owned:
+                pool.give(buffer)
+
+    buffers = _Buffers(pool)
+    for sound in program.sounds:
+        grid = variations.original_params(sound.seed) if params is None else params
+        pitch, decay, buffers.seeds = variations.grid_axes(grid, pool.dtype)
+        axes = {'pitch': pitch, 'decay': decay}
+        size = grid.size * sound.samples
+        mix_buffer = pool.take(size)
+        mix = mix_buffer.reshape(grid.shape + (sound.samples,))
+        written = []  # Ranges of mix that hold samples; the rest is zeroed when first needed
+        for layer in sound.layers:
+            tracing.stage(layer.name)
+            end = layer.start + layer.n
+            target = mix[..., layer.start:end]
+            fresh = _gaps(written, layer.start, end) == [(layer.start, end)]
+            mixed = False  # Whether the output was computed in place in the mix
+            # Nodes are topologically ordered, so everything this layer needs precedes its output
+            while cursor <= layer.output.id:
+                node_id, cursor = cursor, cursor + 1
+                if not remaining[node_id]:
+                    continue
+                op, n, *args = graph.nodes[node_id]
+                if op == 'param':
+                    buffers[node_id] = axes[args[0]]
+                    continue
+                refs = [arg for arg in args if isinstance(arg, Ref)]
+                shape = _shape(op, n, [buffers[arg.id] if isinstance(arg, Ref) else arg for arg in args],
+                               buffers.seeds)
+                # A layer's output goes straight into a part of the mix no other layer wrote
+                direct = fresh and node_id == layer.output.id and remaining[node_id] == 1 \
+                    and math.prod(shape) == target.size and np.broadcast_shapes(shape, target.shape) == target.shape
+                # An elementwise step overwrites an input that dies here (where() only its last)
+                candidates = refs[-1:] if op == 'where' else refs
+                reuse = None if direct else next(
+                    (ref for ref in candidates if op in ELEMENTWISE and remaining[ref.id] == 1
+                     and refs.count(ref) == 1 and ref.id in owned and buffers[ref.id].shape == shape), None)
+                if direct:
+                    out, mixed = target.reshape(shape), True
+                elif reuse:
+                    out = buffers[reuse.id]
+                else:
+                    out = pool.take(math.prod(shape)).reshape(shape)
+                _evaluate(op, args, out, graph.sample_rate, buffers)
+                if reuse:
+                    del buffers[reuse.id]
+                    owned.discard(reuse.id)
+                    remaining[reuse.id] = 0
+                    program.in_place += 1
+                buffers[node_id] = out
+                if not direct:
+                    owned.add(node_id)
+                for ref in refs:
+                    if ref is not reuse:
+                        release(ref)
+            if not mixed:
+                for start, stop in _gaps(written, layer.start, end):
+                    mix[..., start:stop] = 0
+                target += buffers[layer.output.id]
+            written.append((layer.start, end))
+            release(layer.output)
+        for start, stop in _gaps(written, 0, sound.samples):
+            mix[..., start:stop] = 0
+
+        tracing.stage('mix')
+        tracing.count(samples=size)
+        fade = int(sound.fade_out * graph.sample_rate)
+        if 0 < fade <= sound.samples:
+            with pool.borrow(fade) as fade_out:
+                mix[..., -fade:] *= pool.linspace(fade_out, 1, 0)
+        if sound.normalize:
+            peak = np.maximum(mix.max(axis=-1, keepdims=True), -mix.min(axis=-1, keepdims=True))
+            np.divide(sound.normalize, peak, out=peak, where=peak > 0)
+            mix *= peak
+        try:
+            yield sound.name, mix
+        finally:
+            pool.give(mix_buffer)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip(),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('spec', nargs='?', default=DEFAULT_SPEC_FILE,
+                        help='sound library, .toml or .json (default: sound_specs.toml)')
+    parser.add_argument('--only', action='append', metavar='NAME', help='render only this sound (repeatable)')
+    parser.add_argument('--out-dir', help='write <name>.wav files here (default: render without writing)')
+    parser.add_argument('--compare', nargs='?', const=SOURCE_DIR, metavar='DIR',
+                        help='report the SNR of each render against the WAV of the same name in DIR '
+                             '(default: the built sounds next to this script)')
+    parser.add_argument('--precision', choices=arena.PRECISIONS, default='float64')
+    parser.add_argument('--sample-rate', type=int, default=44100)
+    args = parser.parse_args(argv)
+
+    specs = load_specs(args.spec)
+    if args.only:
+        unknown = sorted(set(args.only) - set(specs))
+        if unknown:
+            parser.error(f"unknown sound(s): {', '.join(unknown)}")
+        specs = {name: specs[name] for name in args.only}
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    program = compile_specs(specs, args.sample_rate)
+    compiled = time.perf_counter()
+    pool = arena.BufferArena(args.precision)
+    rendered_samples = 0
+    for name, sound in render(program, pool):
+        samples = sound[0, 0]
+        rendered_samples += len(samples)
+        detail = ''
+        if args.compare:
+            reference_path = os.path.join(args.compare, name + '.wav')
+            if os.path.exists(reference_path):
+                reference, _ = encoders.read_pcm16(reference_path)
+                length = min(len(reference), len(samples))
+                detail = f", {encoders.snr_db(reference[:length], samples[:length]):.1f} dB SNR vs {name}.wav"
+        if args.out_dir:
+            streaming.write_wav_stream(os.path.join(args.out_dir, name + '.wav'), [samples], args.sample_rate)
+        print(f"✓ Rendered {name} ({len(samples) / args.sample_rate:.2f}s{detail})")
+    elapsed = time.perf_counter() - start
+
+    stats = program.stats()
+    print(f"{stats['sounds']} sounds: {stats['requested_nodes']} node requests -> {stats['unique_nodes']} unique, "
+          f"{stats['live_nodes']} evaluated ({stats['shared_nodes']} shared), {program.in_place} in place, "
+          f"{pool.allocations} buffers allocated")
+    print(f"Compiled in {(compiled - start) * 1000:.1f}ms, rendered {rendered_samples:,} samples "
+          f"in {elapsed * 1000:.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Block-based streaming renderer for long tracks
+Mixes note events into fixed-size blocks and streams int16 frames straight
+into the WAV writer, so memory stays bounded by the block size and the
+notes sounding at once instead of the track length
+"""
+
+import wave
+
+import numpy as np
+
+import arena
+import engine
+import tracing
+
+DEFAULT_BLOCK_SIZE = 16384  # ~0.37s at 44.1kHz
+
+def render_blocks(events, instruments, total_samples, sample_rate=44100,
+                  block_size=DEFAULT_BLOCK_SIZE, cache=None, dtype=np.float64):
+    """Yield the mix of an event table as consecutive float blocks of dtype
+
+    Events starting inside a block are batch-rendered by the engine into an
+    overlap-add window spanning the block plus the longest note, so each note
+    is rendered exactly once and its tail carries over to the next blocks.
+    An optional voices.VoiceCache is passed through to the engine.
+    """
+    events = np.sort(events, order='start')
+    start_samples, end_samples = engine.event_spans(events, sample_rate)
+    longest = int((end_samples - start_samples).max()) if len(events) else 0
+    window = np.zeros(block_size + longest, dtype)
+    next_event = 0
+
+    for block_start in range(0, total_samples, block_size):
+        block_end = min(block_start + block_size, total_samples)
+        block_len = block_end - block_start
+
+        last_event = np.searchsorted(start_samples, block_end, side='left')
+        if last_event > next_event:
+            engine.render_events(events[next_event:last_event], instruments,
+                                 window, block_start, sample_rate, cache=cache)
+        next_event = last_event
+
+        block = window[:block_len].copy()
+        window[:-block_len] = window[block_len:]
+        window[-block_len:] = 0
+        yield block
+
+def measure_peak(blocks):
+    """Exact peak of a block stream (consumes the stream)"""
+    peak = 0.0
+    for block in blocks:
+        if len(block):
+            peak = max(peak, float(np.max(np.abs(block))))
+    return peak
+
+def peak_bound(events, instrument_peaks, sample_rate=44100):
+    """Analytic upper bound on the mix peak without rendering any audio
+
+    Sweeps event boundaries and returns the largest sum of per-instrument
+    peak amplitudes (times event gain) over all events sounding at once.
+    """
+    start_samples, end_samples = engine.event_spans(events, sample_rate)
+    peaks = np.array([instrument_peaks[name] for name in events['instrument']]) * np.abs(events['gain'])
+    sounding = end_samples > start_samples
+
+    # Ends sort before starts at the same sample since spans are half-open
+    edges = np.concatenate([start_samples[sounding], end_samples[sounding]])
+    kinds = np.concatenate([np.ones(sounding.sum()), np.zeros(sounding.sum())])
+    deltas = np.concatenate([peaks[sounding], -peaks[sounding]])
+    order = np.lexsort((kinds, edges))
+    return float(max(np.cumsum(deltas[order]).max(initial=0.0), 0.0))
+
+def scale_blocks(blocks, gain):
+    """Multiply every block by a constant gain in place"""
+    for block in blocks:
+        block *= gain
+        yield block
+
+def fade_edges(blocks, total_samples, fade_samples):
+    """Apply linear fade-in/out ramps over the first/last samples of the stream"""
+    fade_in = np.linspace(0, 1, fade_samples)
+    fade_out = np.linspace(1, 0, fade_samples)
+    fade_out_start = total_samples - fade_samples
+    position = 0
+
+    for block in blocks:
+        block_end = position + len(block)
+        if position < fade_samples:
+            hi = min(block_end, fade_samples)
+            block[:hi - position] *= fade_in[position:hi]
+        if block_end > fade_out_start:
+            lo = max(position, fade_out_start)
+            block[lo - position:] *= fade_out[lo - fade_out_start:block_end - fade_out_start]
+        position = block_end
+        yield block
+
+def write_wav_stream(filename, blocks, sample_rate=44100):
+    """Stream float blocks into a 16-bit mono WAV file (dithered for float32 blocks)"""
+    converter = None
+    with wave.open(filename, 'w') as wav_file:
+        wav_file.setnchannels(1)  # Mono
+        wav_file.setsampwidth(2)  # 16-bit
+        wav_file.setframerate(sample_rate)
+
+        for block in blocks:
+            if converter is None:
+                converter = arena.Pcm16Converter(block.dtype, dither=block.dtype == np.float32)
+            tracing.count(samples=len(block))
+            for frames in converter.frames(block):
+                with tracing.span('writeframes', 'io', bytes=len(frames)):
+                    wav_file.writeframesraw(frames)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Opt-in span tracing for the synthesis pipeline
+Generators and their building blocks open nested spans (generator, stage,
+oscillator, PCM conversion, file writes) that record wall time plus
+counters such as samples rendered and bytes the arena allocated. Tracing is
+off by default: span() then returns one shared no-op context manager and
+stage()/count() return at once, so the instrumentation costs a call and a
+flag test. Collected spans export as Chrome trace-event JSON (load it in
+chrome://tracing or ui.perfetto.dev) and as a flat top-N summary by self
+time.
+"""
+
+import json
+import os
+import time
+
+ENABLED = False
+
+_events = []  # Finished spans as Chrome complete ('X') events
+_stack = []   # Open spans, innermost last
+
+class _NullSpan:
+    """What span() returns while tracing is off"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_SPAN = _NullSpan()
+
+class Span:
+    """One timed region; counters passed to count() while it is open add to its args"""
+
+    __slots__ = ('name', 'category', 'args', 'start', 'child_ns', 'stage')
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+        self.child_ns = 0
+        self.stage = None  # Open span started by stage() directly inside this one
+
+    def __enter__(self):
+        _stack.append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        _end_stage(self)
+        duration = time.perf_counter_ns() - self.start
+        _stack.pop()
+        if _stack:
+            _stack[-1].child_ns += duration
+        _events.append({'name': self.name, 'cat': self.category, 'ph': 'X', 'pid': os.getpid(), 'tid': 0,
+                        'ts': self.start / 1000, 'dur': duration / 1000,
+                        'args': dict(self.args, self_us=(duration - self.child_ns) / 1000)})
+        return False
+
+def _end_stage(owner):
+    if owner.stage is not None:
+        stage_span, owner.stage = owner.stage, None
+        stage_span.__exit__(None, None, None)
+
+def span(name, category='stage', **args):
+    """Context manager timing a region (a no-op unless tracing is enabled)"""
+    if not ENABLED:
+        return NULL_SPAN
+    return Span(name, category, args)
+
+def stage(name, **args):
+    """End the current stage of the innermost span and start the next one
+
+    Lets a generator mark its phases with one line per phase instead of
+    re-indenting them into with blocks; the last stage ends with its span.
+    """
+    if not ENABLED or not _stack:
+        return
+    owner = _stack[-1]
+    if len(_stack) > 1 and _stack[-2].stage is owner:
+        owner = _stack[-2]
+    _end_stage(owner)
+    owner.stage = Span(name, 'stage', args).__enter__()
+
+def count(**counters):
+    """Add counters (samples=..., bytes_allocated=...) to every open span"""
+    if not ENABLED:
+        return
+    for open_span in _stack:
+        for key, value in counters.items():
+            open_span.args[key] = open_span.args.get(key, 0) + value
+
+def enable(enabled=True):
+    """Turn tracing on or off for this process, dropping collected spans"""
+    global ENABLED
+    ENABLED = enabled
+    _events.clear()
+
+def drain():
+    """Return and forget the spans finished so far"""
+    events = list(_events)
+    _events.clear()
+    return events
+
+def write_chrome_trace(path, events):
+    """Write spans as a Chrome trace-event JSON file"""
+    events = sorted(events, key=lambda event: (event['pid'], event['ts']))
+    names = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0, 'args': {'name': f'render worker {pid}'}}
+             for pid in sorted({event['pid'] for event in events})]
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': names + events, 'displayTimeUnit': 'ms'}, f)
+
+def summary(events, top=15):
+    """Flat per-(category, name) totals, sorted by self time, top rows only"""
+    rows = {}
+    for event in events:
+        row = rows.setdefault((event['cat'], event['name']),
+                              {'category': event['cat'], 'name': event['name'], 'calls': 0,
+                               'total_ms': 0.0, 'self_ms': 0.0, 'samples': 0, 'bytes_allocated': 0})
+        row['calls'] += 1
+        row['total_ms'] += event['dur'] / 1000
+        row['self_ms'] += event['args']['self_us'] / 1000
+        row['samples'] += event['args'].get('samples', 0)
+        row['bytes_allocated'] += event['args'].get('bytes_allocated', 0)
+    return sorted(rows.values(), key=lambda row: row['self_ms'], reverse=True)[:top]
+
+def format_summary(rows):
+    """Render summary() rows as a fixed-width table"""
+    width = max([len(f"{row['category']}:{row['name']}") for row in rows] + [4])
+    lines = [f"{'span':<{width}}  {'calls':>6}  {'self ms':>9}  {'total ms':>9}  {'samples':>11}  {'alloc KB':>9}"]
+    for row in rows:
+        lines.append(f"{row['category'] + ':' + row['name']:<{width}}  {row['calls']:>6}  {row['self_ms']:>9.2f}  "
+                     f"{row['total_ms']:>9.2f}  {row['samples']:>11,}  {row['bytes_allocated'] / 1024:>9,.0f}")
+    return '\n'.join(lines)
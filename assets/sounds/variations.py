@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Variation banks for the short sound effects
+A bank is a grid of variants of one effect: one row per pitch ratio (each
+with its own noise seed) and one column per decay scale. The effect's spec
+in sound_specs.toml is rendered for the whole grid at once (see
+soundspec.render()): every term is computed once per pitch or once per
+decay, so only the final mix is computed per variant. The single WAV is
+just the [0, 0] variant with the original parameters, so a bank can never
+drift from it. A bank is stored as one WAV of equal-length variants laid
+end to end, row by row, plus a JSON index of where each one starts.
+"""
+
+import json
+
+import numpy as np
+
+# One cell per variant
+VARIANT_DTYPE = np.dtype([
+    ('pitch', 'f8'),   # frequency ratio applied to every partial
+    ('decay', 'f8'),   # scale of every decay time constant
+    ('seed', 'i8'),    # noise seed for noisy effects
+])
+
+# Silence after each variant in a bank file, so resampling the bank never
+# smears the onset of one variant into the end of the previous one
+GAP_SECONDS = 0.005
+
+def variation_params(pitches, decays, seed=0, pitch_cents=60.0, decay_spread=0.25, base_seed=0):
+    """Draw a (pitches, decays) grid of variants around the original sound
+
+    Variant [0, 0] is always the original (pitch 1, decay 1, base_seed). The
+    other rows are detuned uniformly within +-pitch_cents and use the next
+    noise seeds; the other columns have their decays scaled within
+    +-decay_spread. Drawn from a fixed seed so banks are reproducible.
+    """
+    rng = np.random.default_rng(seed)
+    pitch = 2 ** (rng.uniform(-pitch_cents, pitch_cents, pitches) / 1200)
+    decay = 1 + rng.uniform(-decay_spread, decay_spread, decays)
+    pitch[0] = decay[0] = 1.0
+    params = np.zeros((pitches, decays), dtype=VARIANT_DTYPE)
+    params['pitch'] = pitch[:, None]
+    params['decay'] = decay
+    params['seed'] = base_seed + np.arange(pitches)[:, None]
+    return params
+
+def original_params(seed=0):
+    """The 1x1 grid a sound's own WAV is rendered with"""
+    return np.array([[(1.0, 1.0, seed)]], dtype=VARIANT_DTYPE)
+
+def grid_axes(params, dtype='float64'):
+    """Pitches (P, 1, 1), decays (1, D, 1) and noise seeds (P) of a params grid
+
+    The pitches and decays broadcast against a time axis, so a term that
+    depends on only one of them is rendered once per row or column.
+    """
+    return (params['pitch'][:, :1, None].astype(dtype), params['decay'][:1, :, None].astype(dtype),
+            params['seed'][:, 0].tolist())
+
+def bank_index(filename, params, variant_samples, sample_rate=44100):
+    """Index of a bank file: [start, duration] in seconds per variant, plus its parameters
+
+    Times are in seconds, so they stay valid when the bank is re-encoded at
+    another sample rate.
+    """
+    gap_samples = int(GAP_SECONDS * sample_rate)
+    starts = np.arange(params.size) * (variant_samples + gap_samples) / sample_rate
+    duration = round(variant_samples / sample_rate, 6)
+    return {
+        'file': filename,
+        'grid': list(params.shape),
+        'variants': [[round(float(start), 6), duration] for start in starts],
+        'params': {name: params[name].ravel().tolist() for name in VARIANT_DTYPE.names},
+    }
+
+def write_index(path, index):
+    """Write a bank index next to its WAV file"""
+    with open(path, 'w') as f:
+        json.dump(index, f, indent=2)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Memoized note/voice render cache
+Stores rendered note buffers keyed on instrument and note parameters so
+repeated patterns (and the same voice used by several generators) are only
+synthesized once, with least-recently-used eviction under a byte budget
+"""
+
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+class VoiceCache:
+    """LRU cache of rendered voice buffers bounded by total bytes"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._voices = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._voices)
+
+    def __contains__(self, key):
+        return key in self._voices
+
+    def lookup(self, key):
+        """Return the cached buffer for key (counting a hit) or None (counting a miss)"""
+        voice = self._voices.get(key)
+        if voice is None:
+            self.misses += 1
+            return None
+        self._voices.move_to_end(key)
+        self.hits += 1
+        return voice
+
+    def put(self, key, voice):
+        """Store a rendered voice, evicting least recently used voices over budget"""
+        if key in self._voices:
+            self.bytes -= self._voices.pop(key).nbytes
+        if voice.nbytes > self.max_bytes:
+            return voice  # Would evict everything else; serve it uncached
+        voice.flags.writeable = False  # Shared between notes, never mixed into
+        self._voices[key] = voice
+        self.bytes += voice.nbytes
+        while self.bytes > self.max_bytes:
+            _, evicted = self._voices.popitem(last=False)
+            self.bytes -= evicted.nbytes
+            self.evictions += 1
+        return voice
+
+    def discard(self, predicate):
+        """Drop the voices whose key matches predicate, e.g. those of an edited instrument"""
+        for key in [key for key in self._voices if predicate(key)]:
+            self.bytes -= self._voices.pop(key).nbytes
+
+    def clear(self):
+        """Drop all voices (counters are kept)"""
+        self._voices.clear()
+        self.bytes = 0
+
+    def stats(self):
+        """Return hit/miss counters and current size as a dict"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'voices': len(self._voices),
+            'bytes': self.bytes,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Build a fingerprinted copy of the game for long-lived caching
+Copies every file under assets/ plus styles.css and script.js to
+content-hashed names (hit.wav -> hit.3f2a9c1d04.wav), rewrites the references
+in the HTML/CSS/JS, and emits a precache manifest and service worker so a
+repeat visit starts without touching the network
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DIST_DIR = os.path.join(ROOT, 'dist')
+
+ENTRY_FILE = 'index.html'
+TEXT_FILES = ['styles.css', 'script.js']  # Fingerprinted after their references are rewritten
+ASSET_DIR = 'assets'
+SKIP_SUFFIXES = ('.py', '.pyc')
+PRECACHE_EXCLUDE = ('assets/screenshots/',)  # README images, never requested by the game
+SOURCE_ONLY = ('assets/masters/',)  # Inputs of build_images.py, never shipped
+
+MANIFEST_FILE = 'precache-manifest.json'
+SERVICE_WORKER_FILE = 'sw.js'
+HASH_LENGTH = 10
+
+SERVICE_WORKER = """\
+// Generated by build_assets.py - do not edit
+const CACHE_NAME = 'whackmaster-%(version)s';
+const PRECACHE_URLS = %(urls)s;
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(CACHE_NAME)
+            .then(cache => cache.addAll(PRECACHE_URLS))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(names => Promise.all(names.filter(name => name !== CACHE_NAME).map(name => caches.delete(name))))
+            .then(() => self.clients.claim())
+    );
+});
+
+// Cache first: fingerprinted files never change, and a new index.html arrives
+// with the next service worker version
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET' || new URL(request.url).origin !== self.location.origin) return;
+    const lookup = request.mode === 'navigate' ? 'index.html' : request;
+    event.respondWith(
+        caches.open(CACHE_NAME)
+            .then(cache => cache.match(lookup, { ignoreSearch: true }))
+            .then(cached => cached || fetch(request))
+    );
+});
+"""
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+def fingerprinted_name(path, digest):
+    """assets/sounds/hit.wav -> assets/sounds/hit.<digest>.wav"""
+    stem, ext = os.path.splitext(path)
+    return f'{stem}.{digest}{ext}'
+
+def asset_paths(root=ROOT):
+    """Every shippable file under assets/ as a '/'-separated path relative to root"""
+    paths = []
+    for directory, dirnames, filenames in os.walk(os.path.join(root, ASSET_DIR)):
+        dirnames[:] = sorted(name for name in dirnames if not name.startswith(('.', '__')))
+        for filename in sorted(filenames):
+            if filename.startswith('.') or filename.endswith(SKIP_SUFFIXES):
+                continue
+            path = os.path.relpath(os.path.join(directory, filename), root).replace(os.sep, '/')
+            if not path.startswith(SOURCE_ONLY):
+                paths.append(path)
+    return paths
+
+def rewrite_references(text, mapping):
+    """Replace every whole-path occurrence of a mapped path with its fingerprinted name"""
+    if not mapping:
+        return text
+    names = sorted(mapping, key=len, reverse=True)  # Longest first so prefixes never win
+    pattern = re.compile(r'(?<![\w./-])(?:\./)?(' + '|'.join(map(re.escape, names)) + r')(?![\w.-])')
+    return pattern.sub(lambda match: mapping[match.group(1)], text)
+
+def write_file(dist, path, data):
+    """Write data to dist/path unless an identical file is already there"""
+    target = os.path.join(dist, path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if os.path.exists(target) and os.path.getsize(target) == len(data):
+        with open(target, 'rb') as f:
+            if f.read() == data:
+                return
+    tmp_path = target + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, target)
+
+def inject_asset_map(html, mapping):
+    """Expose the logical -> fingerprinted map to script.js for paths it builds at runtime"""
+    script = f'<script>window.ASSET_MANIFEST = {json.dumps(mapping, sort_keys=True)};</script>\n    '
+    return re.sub(r'(<script\b)', lambda match: script + match.group(1), html, count=1)
+
+def build(root=ROOT, dist=DIST_DIR):
+    """Fingerprint the site from root into dist; returns the precache manifest"""
+    mapping = {}
+    outputs = {}
+
+    for path in asset_paths(root):
+        with open(os.path.join(root, path), 'rb') as f:
+            data = f.read()
+        mapping[path] = fingerprinted_name(path, content_hash(data))
+        outputs[mapping[path]] = data
+
+    for path in TEXT_FILES:
+        with open(os.path.join(root, path), encoding='utf-8') as f:
+            data = rewrite_references(f.read(), mapping).encode('utf-8')
+        mapping[path] = fingerprinted_name(path, content_hash(data))
+        outputs[mapping[path]] = data
+
+    with open(os.path.join(root, ENTRY_FILE), encoding='utf-8') as f:
+        html = inject_asset_map(rewrite_references(f.read(), mapping), mapping)
+    outputs[ENTRY_FILE] = html.encode('utf-8')
+
+    for path, data in outputs.items():
+        write_file(dist, path, data)
+
+    files = [
+        {'url': path, 'revision': content_hash(data), 'size': len(data)}
+        for path, data in sorted(outputs.items())
+        if not path.startswith(PRECACHE_EXCLUDE)
+    ]
+    version = content_hash(json.dumps(files, sort_keys=True).encode())
+    manifest = {'version': version, 'assets': mapping, 'precache': files}
+    write_file(dist, MANIFEST_FILE, json.dumps(manifest, indent=2).encode())
+
+    urls = ['./'] + [entry['url'] for entry in files]
+    worker = SERVICE_WORKER % {'version': version, 'urls': json.dumps(urls, indent=4)}
+    write_file(dist, SERVICE_WORKER_FILE, worker.encode())
+
+    prune(dist, set(outputs) | {MANIFEST_FILE, SERVICE_WORKER_FILE})
+    return manifest
+
+def prune(dist, keep):
+    """Delete files left in dist by earlier builds"""
+    for directory, _, filenames in os.walk(dist, topdown=False):
+        for filename in filenames:
+            path = os.path.relpath(os.path.join(directory, filename), dist).replace(os.sep, '/')
+            if path not in keep:
+                os.remove(os.path.join(directory, filename))
+        if directory != dist and not os.listdir(directory):
+            os.rmdir(directory)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--out-dir', default=DIST_DIR, help='output directory (default: dist/)')
+    parser.add_argument('--clean', action='store_true', help='delete the output directory first')
+    args = parser.parse_args(argv)
+
+    if args.clean and os.path.isdir(args.out_dir):
+        shutil.rmtree(args.out_dir)
+
+    manifest = build(ROOT, args.out_dir)
+    total = sum(entry['size'] for entry in manifest['precache'])
+    print(f"✓ Fingerprinted {len(manifest['assets'])} files into {os.path.relpath(args.out_dir, ROOT)}/")
+    print(f"✓ Precache manifest: {len(manifest['precache'])} files, {total / 1024:.0f} KiB "
+          f"(version {manifest['version']})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Build the cursor, icon and screenshot-thumbnail images from their masters
+Every cursor and icon size is resized from one master image in
+assets/masters/, quantized to the smallest palette that keeps --min-psnr
+(measured on premultiplied RGBA, so fully transparent pixels do not count)
+and written as an optimized PNG plus a lossless WebP of the same pixels.
+README screenshots get JPEG and WebP thumbnails. Targets render in parallel,
+and a content-hash manifest skips targets whose master and settings are
+unchanged.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CACHE_MANIFEST = 'assets/images/.image_cache.json'
+
+# Palette sizes tried in order; the first one that meets the PSNR threshold wins
+PALETTE_SIZES = (16, 32, 64, 128, 256)
+DEFAULT_MIN_PSNR = 38.0
+
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+# Build targets: name -> (master, kind, width, output path without extension)
+TARGETS = {
+    'hammer-cursor-128': ('assets/masters/hammer-cursor.png', 'sprite', 128, 'assets/images/hammer-cursor-128'),
+    'hammer-cursor-256': ('assets/masters/hammer-cursor.png', 'sprite', 256, 'assets/images/hammer-cursor-256'),
+    'hammer-icon-48': ('assets/masters/hammer-icon.png', 'sprite', 48, 'assets/images/hammer-icon-48'),
+    'hammer-icon-96': ('assets/masters/hammer-icon.png', 'sprite', 96, 'assets/images/hammer-icon-96'),
+    'Screenshot1-640': ('assets/screenshots/Screenshot1.png', 'thumbnail', 640, 'assets/screenshots/thumbs/Screenshot1-640'),
+    'Screenshot2-640': ('assets/screenshots/Screenshot2.png', 'thumbnail', 640, 'assets/screenshots/thumbs/Screenshot2-640'),
+    'Screenshot3-640': ('assets/screenshots/Screenshot3.png', 'thumbnail', 640, 'assets/screenshots/thumbs/Screenshot3-640'),
+    'Screenshot4-640': ('assets/screenshots/Screenshot4.png', 'thumbnail', 640, 'assets/screenshots/thumbs/Screenshot4-640'),
+}
+
+def psnr(reference, image):
+    """PSNR in dB of image against reference, both RGBA, with colour weighted by alpha"""
+    def premultiplied(im):
+        pixels = np.asarray(im.convert('RGBA'), dtype=np.float64)
+        pixels[..., :3] *= pixels[..., 3:] / 255
+        return pixels
+    mse = np.mean((premultiplied(reference) - premultiplied(image)) ** 2)
+    return float('inf') if mse == 0 else float(10 * np.log10(255 ** 2 / mse))
+
+def encode(image, fmt, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+def resize(master, width):
+    height = max(1, round(master.height * width / master.width))
+    return master.resize((width, height), Image.Resampling.LANCZOS)
+
+def render_sprite(master, width, min_psnr):
+    """Palette PNG and lossless WebP of one sprite size; returns (outputs, details)"""
+    image = resize(master.convert('RGBA'), width)
+    for colors in PALETTE_SIZES:
+        quantized = image.quantize(colors, method=Image.Quantize.FASTOCTREE)
+        quality = psnr(image, quantized)
+        if quality >= min_psnr:
+            break
+    else:
+        # No palette is good enough: keep full RGBA, still losslessly optimized
+        quantized, colors, quality = image, None, float('inf')
+    outputs = {
+        '.png': encode(quantized, 'PNG', optimize=True),
+        '.webp': encode(quantized.convert('RGBA'), 'WEBP', lossless=True, method=6),
+    }
+    return outputs, {'colors': colors, 'psnr_db': round(quality, 1)}
+
+def render_thumbnail(master, width):
+    """JPEG and WebP thumbnails of an opaque screenshot"""
+    image = resize(master.convert('RGB'), width)
+    outputs = {
+        '.jpg': encode(image, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True),
+        '.webp': encode(image, 'WEBP', quality=WEBP_QUALITY, method=6),
+    }
+    return outputs, {'psnr_db': round(psnr(image, Image.open(io.BytesIO(outputs['.webp']))), 1)}
+
+def file_digest(path):
+    """Return the sha256 of a file, or None if it does not exist"""
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+    except FileNotFoundError:
+        return None
+
+def fingerprint(name, min_psnr):
+    """Hash everything that determines a target's outputs"""
+    master, kind, width, output = TARGETS[name]
+    digest = hashlib.sha256()
+    digest.update(file_digest(os.path.join(ROOT, master)).encode())
+    digest.update(json.dumps([kind, width, output, min_psnr, Image.__version__]).encode())
+    with open(os.path.abspath(__file__), 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+def load_manifest(path):
+    """Load the cache manifest, treating a missing or corrupt file as empty"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_manifest(manifest, path):
+    """Atomically write the cache manifest"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def is_fresh(name, entry, min_psnr):
+    """Check a manifest entry against the current fingerprint and output files"""
+    if not entry or entry.get('fingerprint') != fingerprint(name, min_psnr):
+        return False
+    return all(file_digest(os.path.join(ROOT, path)) == sha256 for path, sha256 in entry['outputs'].items())
+
+def render_target(name, min_psnr):
+    """Render one target and write its outputs (runs in a worker process)"""
+    master_path, kind, width, output = TARGETS[name]
+    start = time.perf_counter()
+    with Image.open(os.path.join(ROOT, master_path)) as master:
+        if kind == 'sprite':
+            outputs, details = render_sprite(master, width, min_psnr)
+        elif kind == 'thumbnail':
+            outputs, details = render_thumbnail(master, width)
+        else:
+            raise ValueError(f"unknown image kind '{kind}'")
+    written = {}
+    for extension, data in outputs.items():
+        path = output + extension
+        target = os.path.join(ROOT, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(target + '.tmp', target)
+        written[path] = {'bytes': len(data), 'sha256': hashlib.sha256(data).hexdigest()}
+    return name, written, details, time.perf_counter() - start
+
+def build(names=None, jobs=None, force=False, min_psnr=DEFAULT_MIN_PSNR):
+    """Render stale targets in parallel, skipping those whose fingerprint is cached"""
+    names = list(names or TARGETS)
+    manifest_path = os.path.join(ROOT, CACHE_MANIFEST)
+    manifest = load_manifest(manifest_path)
+    stale = [name for name in names if force or not is_fresh(name, manifest.get(name), min_psnr)]
+    for name in names:
+        if name not in stale:
+            print(f"· {name} is up to date")
+
+    def record(result):
+        name, written, details, seconds = result
+        manifest[name] = dict(details, fingerprint=fingerprint(name, min_psnr), seconds=round(seconds, 4),
+                              outputs={path: info['sha256'] for path, info in written.items()},
+                              bytes={path: info['bytes'] for path, info in written.items()})
+        palette = f"{details['colors']} colors, " if details.get('colors') else ''
+        sizes = ', '.join(f"{os.path.splitext(path)[1][1:]} {info['bytes'] / 1024:.1f} KB"
+                          for path, info in written.items())
+        print(f"✓ Built {name} ({palette}{details['psnr_db']} dB, {sizes})")
+
+    if jobs == 1 or len(stale) <= 1:
+        for name in stale:
+            record(render_target(name, min_psnr))
+    elif stale:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(render_target, name, min_psnr) for name in stale]
+            for future in as_completed(futures):
+                record(future.result())
+
+    if stale:
+        save_manifest(manifest, manifest_path)
+    return stale, manifest
+
+def payload(manifest, kind='sprite'):
+    """(master bytes, smallest output bytes per target) over targets of one kind"""
+    masters = {TARGETS[name][0] for name in TARGETS if TARGETS[name][1] == kind}
+    before = sum(os.path.getsize(os.path.join(ROOT, path)) for path in masters)
+    after = sum(min(manifest[name]['bytes'].values()) for name in TARGETS
+                if TARGETS[name][1] == kind and name in manifest)
+    return before, after
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--only', action='append', choices=sorted(TARGETS), metavar='NAME',
+                        help='build only this target (repeatable)')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='worker processes for stale targets (default: CPU count)')
+    parser.add_argument('--force', action='store_true',
+                        help='ignore the cache manifest and rebuild everything')
+    parser.add_argument('--min-psnr', type=float, default=DEFAULT_MIN_PSNR,
+                        help='quality threshold for palette quantization in dB (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    built, manifest = build(args.only, jobs=args.jobs, force=args.force, min_psnr=args.min_psnr)
+    before, after = payload(manifest)
+    print(f"Images built ({len(built)} rebuilt in {time.perf_counter() - start:.2f}s); "
+          f"cursor and icon masters {before / 1024:.0f} KB -> {after / 1024:.1f} KB across every size")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Global leaderboard service for the Whack-a-Mole game
+Stdlib-only asyncio HTTP/1.1 service that endGame() posts scores to.
+Submissions are written to SQLite (WAL mode) in group commits: every
+submission arriving within one commit window shares a single transaction,
+and each client is answered once its group is on disk. Every player's best
+score is also kept in memory in a Fenwick tree indexed by score, so top-N
+and rank reads are O(log max_score) and never touch the database.
+
+    POST /scores       {"player": "...", "score": 120} or a list of them
+    GET  /top?n=10     best players, ties share a rank
+    GET  /rank/<name>  a player's best score and rank
+    GET  /stats        counters and commit statistics
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import time
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# Kept outside the project directory, which the static server publishes
+DATA_DIR = os.path.join(os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share'), 'whackmaster')
+DEFAULT_DATABASE = os.path.join(DATA_DIR, 'leaderboard.db')
+
+# Scores are whole points; a 30-second game cannot come anywhere near this
+MAX_SCORE = 100000
+MAX_PLAYER_LENGTH = 32
+MAX_TOP = 100
+
+# A group commit waits this long for more submissions, unless it is already full
+COMMIT_WINDOW = 0.005
+MAX_COMMIT_ROWS = 8192
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    submitted REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bests (
+    player TEXT PRIMARY KEY,
+    score INTEGER NOT NULL,
+    achieved REAL NOT NULL
+);
+"""
+
+UPSERT_BEST = """
+INSERT INTO bests (player, score, achieved) VALUES (?, ?, ?)
+ON CONFLICT (player) DO UPDATE SET score = excluded.score, achieved = excluded.achieved
+WHERE excluded.score > bests.score
+"""
+
+class ScoreIndex:
+    """Every player's best score, counted per score value in a Fenwick tree
+
+    Players with the same best are kept in the order they reached it, so
+    earlier players list first within a tie.
+    """
+
+    def __init__(self, max_score=MAX_SCORE):
+        self.max_score = max_score
+        self.tree = [0] * (max_score + 2)
+        self.buckets = {}  # score -> {player: None}, in the order reached
+        self.bests = {}
+        self._top_bit = 1 << (max_score + 1).bit_length()
+
+    def __len__(self):
+        return len(self.bests)
+
+    def _add(self, score, delta):
+        i = score + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def _at_most(self, score):
+        """Number of players whose best is <= score"""
+        total = 0
+        i = score + 1
+        while i:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def _nth_lowest(self, n):
+        """Score of the n-th lowest best (1-based)"""
+        i = 0
+        step = self._top_bit
+        while step:
+            if i + step < len(self.tree) and self.tree[i + step] < n:
+                i += step
+                n -= self.tree[i]
+            step >>= 1
+        return i  # Tree index i + 1 is score i
+
+    def submit(self, player, score):
+        """Record a score; returns whether it is the player's new best"""
+        best = self.bests.get(player)
+        if best is not None:
+            if score <= best:
+                return False
+            self._add(best, -1)
+            bucket = self.buckets[best]
+            del bucket[player]
+            if not bucket:
+                del self.buckets[best]
+        self.bests[player] = score
+        self._add(score, 1)
+        self.buckets.setdefault(score, {})[player] = None
+        return True
+
+    def rank(self, player):
+        """1 + the number of players with a higher best, or None for unknown players"""
+        best = self.bests.get(player)
+        if best is None:
+            return None
+        return len(self.bests) - self._at_most(best) + 1
+
+    def top(self, n):
+        """[(rank, player, score)] of the n best players"""
+        entries = []
+        rank = 1
+        while len(entries) < n and rank <= len(self.bests):
+            score = self._nth_lowest(len(self.bests) - rank + 1)
+            bucket = self.buckets[score]
+            for player in bucket:
+                if len(entries) == n:
+                    break
+                entries.append((rank, player, score))
+            rank += len(bucket)
+        return entries
+
+class GroupCommitWriter:
+    """Appends submissions to SQLite, one transaction per commit window"""
+
+    def __init__(self, path, window=COMMIT_WINDOW, max_rows=MAX_COMMIT_ROWS):
+        self.path = path
+        self.window = window
+        self.max_rows = max_rows
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')  # WAL stays consistent; fsync at checkpoints
+        self.db.executescript(SCHEMA)
+        self.pending = []
+        self.waiters = []
+        self.commits = 0
+        self.rows = 0
+        self._ready = asyncio.Event()
+        self._full = asyncio.Event()
+
+    def load_bests(self):
+        """(player, score) rows in the order the bests were reached"""
+        return self.db.execute('SELECT player, score FROM bests ORDER BY achieved, rowid').fetchall()
+
+    async def write(self, rows):
+        """Queue (player, score, submitted) rows; returns once they are committed"""
+        waiter = asyncio.get_running_loop().create_future()
+        self.pending.extend(rows)
+        self.waiters.append(waiter)
+        self._ready.set()
+        if len(self.pending) >= self.max_rows:
+            self._full.set()
+        await waiter
+
+    async def run(self):
+        while True:
+            await self._ready.wait()
+            # Let the group fill up, unless it already has
+            try:
+                await asyncio.wait_for(self._full.wait(), self.window)
+            except asyncio.TimeoutError:
+                pass
+            rows, waiters = self.pending, self.waiters
+            self.pending, self.waiters = [], []
+            self._ready.clear()
+            self._full.clear()
+            try:
+                await asyncio.to_thread(self._commit, rows)
+            except Exception as error:
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(error)
+                continue
+            self.commits += 1
+            self.rows += len(rows)
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    def _commit(self, rows):
+        with self.db:
+            self.db.execute('BEGIN')
+            self.db.executemany('INSERT INTO scores (player, score, submitted) VALUES (?, ?, ?)', rows)
+            self.db.executemany(UPSERT_BEST, rows)
+
+    def close(self):
+        self.db.close()
+
+def parse_submissions(body):
+    """Validate a JSON submission (or list of them) into [(player, score)]; raises ValueError"""
+    try:
+        data = json.loads(body)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError('body is not JSON') from None
+    items = data if isinstance(data, list) else [data]
+    submissions = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError('a submission must be an object')
+        player, score = item.get('player'), item.get('score')
+        if not isinstance(player, str) or not 0 < len(player) <= MAX_PLAYER_LENGTH:
+            raise ValueError(f'player must be a string of 1-{MAX_PLAYER_LENGTH} characters')
+        if isinstance(score, bool) or not isinstance(score, int) or not 0 <= score <= MAX_SCORE:
+            raise ValueError(f'score must be an integer between 0 and {MAX_SCORE}')
+        submissions.append((player, score))
+    if not submissions:
+        raise ValueError('no submissions')
+    return submissions
+
+class Leaderboard:
+    """Score index in memory, submissions on disk"""
+
+    def __init__(self, path=DEFAULT_DATABASE, max_score=MAX_SCORE, **writer_options):
+        self.writer = GroupCommitWriter(path, **writer_options)
+        self.index = ScoreIndex(max_score)
+        for player, score in self.writer.load_bests():
+            self.index.submit(player, score)
+        self.submissions = 0
+        self.started = time.monotonic()
+
+    async def submit(self, submissions):
+        """Record [(player, score)]; returns one result per submission after the commit
+
+        The index is only updated once the rows are on disk, so a failed
+        commit (raised to the caller) leaves no score that a restart would lose.
+        """
+        now = time.time()
+        await self.writer.write([(player, score, now) for player, score in submissions])
+        results = []
+        for player, score in submissions:
+            improved = self.index.submit(player, score)
+            results.append({'player': player, 'score': score, 'best': self.index.bests[player],
+                            'improved': improved})
+        self.submissions += len(submissions)
+
+        # Ranks after the whole batch, as a later read would see them
+        for result in results:
+            result['rank'] = self.index.rank(result['player'])
+        return results
+
+    def stats(self):
+        return {'uptime_s': round(time.monotonic() - self.started, 1), 'players': len(self.index),
+                'submissions': self.submissions, 'commits': self.writer.commits,
+                'rows_per_commit': round(self.writer.rows / max(self.writer.commits, 1), 1)}
+
+class LeaderboardServer:
+    """Minimal asyncio HTTP/1.1 front end for a Leaderboard"""
+
+    def __init__(self, leaderboard, keepalive_timeout=15.0, access_log=False, allow_origin='*'):
+        self.leaderboard = leaderboard
+        self.keepalive_timeout = keepalive_timeout
+        self.access_log = access_log
+        self.allow_origin = allow_origin
+
+    async def handle_connection(self, reader, writer):
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.keepalive_timeout)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError,
+                        asyncio.LimitOverrunError):
+                    break
+                if not await self.handle_request(head, reader, writer):
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, head, reader, writer):
+        """Serve one request; returns whether the connection stays open"""
+        try:
+            request_line, *header_lines = head.decode('latin-1').split('\r\n')
+            method, target, version = request_line.split(' ', 2)
+        except ValueError:
+            await self.send(writer, 400, {'error': 'bad request'}, keep_alive=False)
+            return False
+
+        headers = {}
+        for line in header_lines:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+        body = b''
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            length = -1
+        if not 0 <= length <= MAX_BODY_BYTES:
+            await self.send(writer, 413, {'error': 'bad Content-Length'}, keep_alive=False)
+            return False
+        if length:
+            try:
+                body = await reader.readexactly(length)
+            except asyncio.IncompleteReadError:
+                return False
+
+        status = await self.route(method, urlsplit(target), body, writer, keep_alive)
+        if self.access_log:
+            print(f'{method} {target} {status}')
+        return keep_alive
+
+    async def route(self, method, url, body, writer, keep_alive):
+        """Dispatch a request; returns the status"""
+        path = url.path
+        if method == 'OPTIONS':
+            await self.send(writer, 204, None, keep_alive)
+            return 204
+
+        if path == '/scores' and method == 'POST':
+            try:
+                submissions = parse_submissions(body)
+            except ValueError as error:
+                await self.send(writer, 400, {'error': str(error)}, keep_alive)
+                return 400
+            try:
+                results = await self.leaderboard.submit(submissions)
+            except sqlite3.Error as error:
+                print(f'✗ Commit failed: {type(error).__name__}: {error}')
+                await self.send(writer, 503, {'error': 'scores could not be saved'}, keep_alive)
+                return 503
+            await self.send(writer, 200, results if body.lstrip().startswith(b'[') else results[0], keep_alive)
+            return 200
+
+        if method != 'GET':
+            await self.send(writer, 405, {'error': 'method not allowed'}, keep_alive)
+            return 405
+        index = self.leaderboard.index
+        if path == '/top':
+            try:
+                n = min(int(parse_qs(url.query).get('n', ['10'])[-1]), MAX_TOP)
+            except ValueError:
+                await self.send(writer, 400, {'error': 'n must be an integer'}, keep_alive)
+                return 400
+            top = [{'rank': rank, 'player': player, 'score': score} for rank, player, score in index.top(n)]
+            await self.send(writer, 200, {'players': len(index), 'top': top}, keep_alive)
+            return 200
+        if path.startswith('/rank/'):
+            player = unquote(path[len('/rank/'):])
+            rank = index.rank(player)
+            if rank is None:
+                await self.send(writer, 404, {'error': 'unknown player'}, keep_alive)
+                return 404
+            await self.send(writer, 200, {'player': player, 'best': index.bests[player], 'rank': rank,
+                                          'players': len(index)}, keep_alive)
+            return 200
+        if path == '/stats':
+            await self.send(writer, 200, self.leaderboard.stats(), keep_alive)
+            return 200
+        await self.send(writer, 404, {'error': 'not found'}, keep_alive)
+        return 404
+
+    async def send(self, writer, status, payload, keep_alive):
+        body = b'' if payload is None else json.dumps(payload).encode()
+        lines = [f'HTTP/1.1 {status} {HTTPStatus(status).phrase}', 'Server: WhackMaster-Leaderboard',
+                 'Content-Type: application/json', f'Content-Length: {len(body)}', 'Cache-Control: no-store',
+                 f'Access-Control-Allow-Origin: {self.allow_origin}',
+                 'Access-Control-Allow-Methods: GET, POST, OPTIONS',
+                 'Access-Control-Allow-Headers: Content-Type']
+        if not keep_alive:
+            lines.append('Connection: close')
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+async def serve(host, port, database=DEFAULT_DATABASE, commit_window=COMMIT_WINDOW, **options):
+    leaderboard = Leaderboard(database, window=commit_window)
+    print(f'Loaded {len(leaderboard.index):,} players from {database}')
+    server = LeaderboardServer(leaderboard, **options)
+    listener = await asyncio.start_server(server.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+    writer = asyncio.create_task(leaderboard.writer.run())
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        writer.cancel()
+        leaderboard.writer.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip(),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5060)
+    parser.add_argument('--database', default=DEFAULT_DATABASE, help='SQLite file (default: %(default)s)')
+    parser.add_argument('--commit-window', type=float, default=COMMIT_WINDOW * 1000,
+                        help='milliseconds a group commit waits for more submissions (default: %(default)s)')
+    parser.add_argument('--keepalive-timeout', type=float, default=15.0,
+                        help='seconds an idle keep-alive connection stays open (default: %(default)s)')
+    parser.add_argument('--access-log', action='store_true', help='print one line per request')
+    args = parser.parse_args(argv)
+
+    print(f'Leaderboard on http://{args.host}:{args.port}/')
+    try:
+        asyncio.run(serve(args.host, args.port, args.database, args.commit_window / 1000,
+                          keepalive_timeout=args.keepalive_timeout, access_log=args.access_log))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Load test for the leaderboard service
+Opens many keep-alive connections to leaderboard.py and sends score
+submissions (optionally several per request) mixed with top-N and rank
+reads, then reports submissions per second and response-time percentiles
+per request type. --spawn starts a server on a throwaway database first.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+async def request(reader, writer, method, path, body=b''):
+    """Send one request on an open connection; returns (status, body)"""
+    head = f'{method} {path} HTTP/1.1\r\nHost: leaderboard\r\nContent-Length: {len(body)}\r\n'
+    if body:
+        head += 'Content-Type: application/json\r\n'
+    writer.write(head.encode('latin-1') + b'\r\n' + body)
+    response = await reader.readuntil(b'\r\n\r\n')
+    status = int(response.split(b' ', 2)[1])
+    length = 0
+    for line in response.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+async def client(host, port, requests, batch, players, read_ratio, rng, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(requests):
+            if rng.random() < read_ratio:
+                if rng.random() < 0.5:
+                    kind, method, path, body = 'top', 'GET', '/top?n=10', b''
+                else:
+                    kind, method, path, body = 'rank', 'GET', f'/rank/player{rng.randrange(players)}', b''
+            else:
+                items = [{'player': f'player{rng.randrange(players)}', 'score': rng.randrange(0, 600, 10)}
+                         for _ in range(batch)]
+                kind, method, path = 'submit', 'POST', '/scores'
+                body = json.dumps(items if batch > 1 else items[0]).encode()
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, method, path, body)
+            latencies.setdefault(kind, []).append(time.perf_counter() - start)
+            if status >= 400 and status != 404:  # Rank reads of players who never submitted are 404
+                errors.append(status)
+    finally:
+        writer.close()
+
+def wait_for_server(host, port, timeout=10.0):
+    """Block until something accepts connections on host:port"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+async def run(host, port, connections, requests, batch, players, read_ratio, seed):
+    latencies, errors = {}, []
+    share = [requests // connections + (i < requests % connections) for i in range(connections)]
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, count, batch, players, read_ratio, random.Random(seed + i),
+                                  latencies, errors)
+                           for i, count in enumerate(share) if count))
+    return time.perf_counter() - start, latencies, errors
+
+def report(elapsed, latencies, errors, batch):
+    """Throughput and latency percentiles per request type"""
+    summary = {'elapsed_s': round(elapsed, 3), 'errors': len(errors), 'requests': {}}
+    for kind, samples in sorted(latencies.items()):
+        values = np.array(samples) * 1000
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        summary['requests'][kind] = {'count': len(values), 'per_s': round(len(values) / elapsed, 1),
+                                     'p50_ms': round(p50, 3), 'p95_ms': round(p95, 3), 'p99_ms': round(p99, 3)}
+    submits = len(latencies.get('submit', [])) * batch
+    summary['submissions_per_s'] = round(submits / elapsed, 1)
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5060)
+    parser.add_argument('--connections', '-c', type=int, default=64, help='concurrent connections (default: %(default)s)')
+    parser.add_argument('--requests', '-n', type=int, default=50000, help='total requests (default: %(default)s)')
+    parser.add_argument('--batch', type=int, default=1, help='submissions per POST (default: %(default)s)')
+    parser.add_argument('--players', type=int, default=100000, help='distinct player names (default: %(default)s)')
+    parser.add_argument('--read-ratio', type=float, default=0.1,
+                        help='fraction of requests that are top-N or rank reads (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--spawn', action='store_true', help='start a leaderboard on a temporary database')
+    parser.add_argument('--output', '-o', help='write the report to this JSON file')
+    args = parser.parse_args(argv)
+
+    server = None
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.spawn:
+            server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'leaderboard.py'), '--host', args.host,
+                                       '--port', str(args.port), '--database', os.path.join(tmp, 'load.db')],
+                                      stdout=subprocess.DEVNULL)
+            wait_for_server(args.host, args.port)
+        try:
+            elapsed, latencies, errors = asyncio.run(run(args.host, args.port, args.connections, args.requests,
+                                                         args.batch, args.players, args.read_ratio, args.seed))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    summary = report(elapsed, latencies, errors, args.batch)
+    for kind, stats in summary['requests'].items():
+        print(f"{kind:>6}: {stats['count']:>7,} requests, {stats['per_s']:>9,.0f}/s, "
+              f"p50 {stats['p50_ms']:.2f}ms, p95 {stats['p95_ms']:.2f}ms, p99 {stats['p99_ms']:.2f}ms")
+    print(f"{summary['submissions_per_s']:,.0f} submissions/s over {args.connections} connections "
+          f"({summary['errors']} errors)")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Load generator for the game's static files
+Simulates concurrent players against any server on localhost:5000. Each
+session fetches what the page requests, in the order script.js requests it:
+index.html, then styles.css and script.js, then the music, hammer images,
+sprite manifest and spawn schedule, then the SFX sprite, then the variation
+bank indexes and their WAVs. Requests go over up to six keep-alive
+connections, followed by a think time before the next visit. Against a
+build from build_assets.py, pass its precache manifest: sessions then use
+the fingerprinted names and also fetch sw.js and everything it precaches.
+With the warm profile a player keeps ETags between sessions and revalidates
+instead of downloading again. Reports throughput, bytes per session and
+p50/p95/p99 latency per asset.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+import numpy as np
+
+# Mirrors VARIATION_BANKS in script.js
+VARIATION_BANKS = ('hit', 'mole_pop', 'hammer_hit', 'ting')
+
+# Fetched in this order; every stage waits for the previous one, as the page's
+# fetches do (a sprite or bank index is read before its WAV is requested)
+SESSION_STAGES = (
+    ('index.html',),
+    ('styles.css', 'script.js'),
+    ('assets/images/hammer-icon-48.webp', 'assets/images/hammer-cursor-128.png',
+     'assets/images/hammer-cursor-128.webp',
+     'assets/sounds/background_music.wav', 'assets/sounds/ambient_music.wav',
+     'assets/sounds/sfx_sprite.json', 'assets/schedules/normal.bin'),
+    ('assets/sounds/sfx_sprite.wav',),
+    tuple(f'assets/sounds/{name}_variants.json' for name in VARIATION_BANKS),
+    tuple(f'assets/sounds/{name}_variants.wav' for name in VARIATION_BANKS),
+)
+
+SERVICE_WORKER = 'sw.js'
+
+def session_stages(manifest=None):
+    """SESSION_STAGES, or for a fingerprinted build its names plus the service worker's fetches"""
+    if manifest is None:
+        return SESSION_STAGES
+    assets = manifest['assets']
+    stages = [tuple(assets.get(path, path) for path in stage) for stage in SESSION_STAGES]
+    # registerServiceWorker() runs with the DOMContentLoaded fetches
+    stages[2] += (SERVICE_WORKER,)
+    # Installing the worker precaches whatever the page did not load itself
+    fetched = {path for stage in stages for path in stage}
+    stages.append(tuple(entry['url'] for entry in manifest['precache'] if entry['url'] not in fetched))
+    return tuple(stage for stage in stages if stage)
+
+PROFILES = ('cold', 'warm')
+
+MAX_HEADER_BYTES = 64 * 1024
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host, port):
+        reader, writer = await asyncio.open_connection(host, port, limit=MAX_HEADER_BYTES)
+        return cls(reader, writer)
+
+    async def get(self, host, path, headers):
+        """GET path; returns (status, response headers, body bytes received)"""
+        lines = [f'GET /{path} HTTP/1.1', f'Host: {host}', 'Accept-Encoding: gzip']
+        lines += [f'{name}: {value}' for name, value in headers.items()]
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        head = await self.reader.readuntil(b'\r\n\r\n')
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        response = {}
+        for line in header_lines:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                response[name.strip().lower()] = value.strip()
+
+        # Bodies are drained in chunks, never held whole
+        remaining = int(response.get('content-length', 0))
+        received = 0
+        while remaining:
+            chunk = await self.reader.read(min(remaining, 256 * 1024))
+            if not chunk:
+                raise ConnectionError('connection closed mid-body')
+            received += len(chunk)
+            remaining -= len(chunk)
+        return int(status_line.split(' ', 2)[1]), response, received
+
+    def close(self):
+        self.writer.close()
+
+class Stats:
+    """Latencies, statuses and byte counts per asset"""
+
+    def __init__(self, stages=SESSION_STAGES):
+        self.order = [path for stage in stages for path in stage]
+        self.latencies = {}
+        self.statuses = {}
+        self.bytes = {}
+        self.sessions = 0
+        self.session_bytes = []
+        self.errors = []
+
+    def record(self, path, status, seconds, received):
+        self.latencies.setdefault(path, []).append(seconds)
+        counts = self.statuses.setdefault(path, {})
+        counts[status] = counts.get(status, 0) + 1
+        self.bytes[path] = self.bytes.get(path, 0) + received
+
+    def summary(self, elapsed):
+        assets = {}
+        for path, samples in sorted(self.latencies.items(), key=lambda item: self.order.index(item[0])):
+            values = np.array(samples) * 1000
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            assets[path] = {'requests': len(values), 'statuses': {str(k): v for k, v in sorted(self.statuses[path].items())},
+                            'bytes': self.bytes[path], 'p50_ms': round(p50, 3), 'p95_ms': round(p95, 3),
+                            'p99_ms': round(p99, 3)}
+        requests = sum(len(samples) for samples in self.latencies.values())
+        total_bytes = sum(self.bytes.values())
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'sessions': self.sessions,
+            'sessions_per_s': round(self.sessions / elapsed, 2),
+            'requests_per_s': round(requests / elapsed, 1),
+            'megabytes_per_s': round(total_bytes / elapsed / 2**20, 2),
+            'bytes_per_session': round(float(np.mean(self.session_bytes)), 1) if self.session_bytes else 0,
+            'errors': len(self.errors),
+            'assets': assets,
+        }
+
+async def session(host, port, stages, connections, etags, stats):
+    """One page visit; returns the body bytes received"""
+    idle = []
+    opened = []
+    received = 0
+
+    async def fetch(path):
+        nonlocal received
+        conn = idle.pop() if idle else None
+        if conn is None:
+            conn = await Connection.open(host, port)
+            opened.append(conn)
+        headers = {'If-None-Match': etags[path]} if etags is not None and path in etags else {}
+        start = time.perf_counter()
+        status, response, size = await conn.get(host, path, headers)
+        stats.record(path, status, time.perf_counter() - start, size)
+        received += size
+        if etags is not None and 'etag' in response:
+            etags[path] = response['etag']
+        if status >= 400:
+            stats.errors.append((path, status))
+        idle.append(conn)
+
+    async def worker(queue):
+        while queue:
+            await fetch(queue.pop(0))
+
+    try:
+        for stage in stages:
+            queue = list(stage)
+            await asyncio.gather(*(worker(queue) for _ in range(min(connections, len(stage)))))
+    finally:
+        for conn in opened:
+            conn.close()
+    return received
+
+async def player(host, port, stages, deadline, profile, think, connections, rng, stats):
+    # A warm player's cache survives between its sessions; the first one is still cold
+    etags = {} if profile == 'warm' else None
+    while time.monotonic() < deadline:
+        try:
+            received = await session(host, port, stages, connections, etags, stats)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError) as error:
+            stats.errors.append(('session', repr(error)))
+            await asyncio.sleep(0.1)
+            continue
+        stats.sessions += 1
+        stats.session_bytes.append(received)
+        if think:
+            await asyncio.sleep(min(rng.expovariate(1 / think), max(deadline - time.monotonic(), 0)))
+
+async def run(host, port, stages, players, duration, profile, think, connections, seed):
+    stats = Stats(stages)
+    start = time.monotonic()
+    deadline = start + duration
+    # Players arrive over the first second instead of all at once
+    async def delayed(index):
+        await asyncio.sleep(index / players)
+        await player(host, port, stages, deadline, profile, think, connections, random.Random(seed + index), stats)
+    await asyncio.gather(*(delayed(index) for index in range(players)))
+    return stats.summary(time.monotonic() - start)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--players', '-c', type=int, default=50, help='concurrent players (default: %(default)s)')
+    parser.add_argument('--duration', '-d', type=float, default=30.0, help='seconds to run (default: %(default)s)')
+    parser.add_argument('--profile', choices=PROFILES, default='cold',
+                        help='cold: no browser cache; warm: revalidate with ETags after the first visit')
+    parser.add_argument('--think', type=float, default=1.0,
+                        help='mean seconds between a player\'s sessions, exponentially distributed (default: %(default)s)')
+    parser.add_argument('--connections', type=int, default=6,
+                        help='parallel connections per session, like a browser (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--manifest', help='precache-manifest.json of the build being served (e.g. dist/)')
+    parser.add_argument('--output', '-o', help='write the report to this JSON file')
+    args = parser.parse_args(argv)
+
+    manifest = None
+    if args.manifest:
+        with open(args.manifest) as f:
+            manifest = json.load(f)
+    summary = asyncio.run(run(args.host, args.port, session_stages(manifest), args.players, args.duration,
+                              args.profile, args.think, args.connections, args.seed))
+    summary['config'] = {'players': args.players, 'profile': args.profile, 'think_s': args.think,
+                         'connections': args.connections}
+
+    width = max((len(path) for path in summary['assets']), default=0)
+    for path, stats in summary['assets'].items():
+        statuses = ' '.join(f'{code}x{count}' for code, count in stats['statuses'].items())
+        print(f"{path:<{width}}  p50 {stats['p50_ms']:8.2f}ms  p95 {stats['p95_ms']:8.2f}ms  "
+              f"p99 {stats['p99_ms']:8.2f}ms  {statuses}")
+    print(f"{summary['sessions']:,} sessions ({summary['sessions_per_s']:.1f}/s), "
+          f"{summary['requests_per_s']:,.0f} requests/s, {summary['megabytes_per_s']:.1f} MB/s, "
+          f"{summary['bytes_per_session'] / 1024:,.0f} KB per session, {summary['errors']} errors")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+    return 1 if summary['errors'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
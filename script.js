@@ -39,6 +39,12 @@ let isSoundEnabled = true;
 let audioFiles = {};
 let backgroundMusic = null;
 let ambientMusic = null;
+let audioSprite = null;
+let variationBanks = {};
+let spawnSchedules = null;
+let telemetry = null;
+let moleShownAt = Array(9).fill(0);
+let scheduleFrame = null;
 let isKeyPressed = false;
 let pressedKeys = new Set();
 
@@ -71,8 +77,32 @@ document.addEventListener('DOMContentLoaded', function() {
     loadAudioFiles();
     updateHighScoreDisplay();
     createCursorOverlay();
+    registerServiceWorker();
+    loadSpawnSchedules(SPAWN_TIER).catch(e => {
+        console.log('Spawn schedules unavailable, spawning live:', e);
+    });
 });
 
+/**
+ * Resolve an asset path to its fingerprinted name in a build made by
+ * build_assets.py; unbuilt sources load the path unchanged
+ */
+function assetUrl(path) {
+    return (window.ASSET_MANIFEST && window.ASSET_MANIFEST[path]) || path;
+}
+
+/**
+ * Only fingerprinted builds ship a service worker, which precaches every
+ * asset so repeat visits start without network requests
+ */
+function registerServiceWorker() {
+    if (!window.ASSET_MANIFEST || !('serviceWorker' in navigator)) return;
+    
+    navigator.serviceWorker.register('sw.js').catch(e => {
+        console.log('Service worker registration failed:', e);
+    });
+}
+
 /**
  * Get references to all DOM elements
  */
@@ -179,23 +209,37 @@ function initializeEventListeners() {
  * Audio System Functions
  */
 
+// Effects with a bank of pre-rendered variants ({name}_variants.wav/.json)
+const VARIATION_BANKS = ['hit', 'mole_pop', 'hammer_hit', 'ting'];
+
 function loadAudioFiles() {
-    const soundFiles = [
+    // Looping music streams from its own files
+    const musicFiles = [
+        'background_music.wav',
+        'ambient_music.wav'
+    ];
+    
+    // Short effects are packed into one sprite; individual files are the fallback
+    const effectFiles = [
         'hit.wav',
         'mole_pop.wav', 
         'game_over.wav',
-        'background_music.wav',
-        'ambient_music.wav',
         'explosion.wav',
         'hammer_hit.wav',
         'button_click.wav',
         'ting.wav'
     ];
     
-    soundFiles.forEach(filename => {
-        const audio = new Audio(`assets/sounds/${filename}`);
-        audio.preload = 'auto';
-        audioFiles[filename.replace('.wav', '')] = audio;
+    musicFiles.forEach(loadAudioFile);
+    
+    loadAudioSprite().then(() => {
+        // Variation banks are optional: without them every effect plays its sprite copy
+        VARIATION_BANKS.forEach(name => {
+            loadVariationBank(name).catch(e => console.log(`Variations for ${name} unavailable:`, e));
+        });
+    }, e => {
+        console.log('Audio sprite unavailable, loading individual files:', e);
+        effectFiles.forEach(loadAudioFile);
     });
     
     // Start ambient music after loading
@@ -204,8 +248,102 @@ function loadAudioFiles() {
     }, 500);
 }
 
+function loadAudioFile(filename) {
+    const audio = new Audio(assetUrl(`assets/sounds/${filename}`));
+    audio.preload = 'auto';
+    audioFiles[filename.replace('.wav', '')] = audio;
+}
+
+/**
+ * Fetch the SFX sprite and its manifest ({name: [start, duration]} in seconds)
+ * and decode it once for sample-accurate playback through Web Audio
+ */
+async function loadAudioSprite() {
+    const AudioContextClass = window.AudioContext || window.webkitAudioContext;
+    if (!AudioContextClass) {
+        throw new Error('Web Audio API not supported');
+    }
+    
+    const manifestResponse = await fetch(assetUrl('assets/sounds/sfx_sprite.json'));
+    if (!manifestResponse.ok) {
+        throw new Error(`Sprite manifest request failed: ${manifestResponse.status}`);
+    }
+    const manifest = await manifestResponse.json();
+    
+    const spriteResponse = await fetch(assetUrl(`assets/sounds/${manifest.file}`));
+    if (!spriteResponse.ok) {
+        throw new Error(`Sprite request failed: ${spriteResponse.status}`);
+    }
+    const data = await spriteResponse.arrayBuffer();
+    
+    const context = new AudioContextClass();
+    const buffer = await context.decodeAudioData(data);
+    audioSprite = { context, buffer, sprites: manifest.sprites };
+}
+
+/**
+ * Fetch a variation bank ({file, variants: [[start, duration], ...]}) and
+ * decode it with the sprite's audio context
+ */
+async function loadVariationBank(name) {
+    const indexResponse = await fetch(assetUrl(`assets/sounds/${name}_variants.json`));
+    if (!indexResponse.ok) {
+        throw new Error(`Variation index request failed: ${indexResponse.status}`);
+    }
+    const index = await indexResponse.json();
+    
+    const bankResponse = await fetch(assetUrl(`assets/sounds/${index.file}`));
+    if (!bankResponse.ok) {
+        throw new Error(`Variation bank request failed: ${bankResponse.status}`);
+    }
+    const buffer = await audioSprite.context.decodeAudioData(await bankResponse.arrayBuffer());
+    variationBanks[name] = { buffer, variants: index.variants, last: -1 };
+}
+
+/**
+ * Pick a random variant of a sound, never the same one twice in a row
+ */
+function pickVariant(bank) {
+    let choice = Math.floor(Math.random() * bank.variants.length);
+    if (choice === bank.last && bank.variants.length > 1) {
+        choice = (choice + 1) % bank.variants.length;
+    }
+    bank.last = choice;
+    return bank.variants[choice];
+}
+
+/**
+ * Play one sound from the sprite, or a random variant when it has a
+ * variation bank. Returns false if the sprite is not loaded so callers can
+ * fall back to the individual audio file.
+ */
+function playSprite(name, volume) {
+    if (!audioSprite || !audioSprite.sprites[name]) return false;
+    
+    const bank = variationBanks[name];
+    const [start, duration] = bank ? pickVariant(bank) : audioSprite.sprites[name];
+    const { context } = audioSprite;
+    const buffer = bank ? bank.buffer : audioSprite.buffer;
+    
+    // Browsers keep the context suspended until the first user gesture
+    if (context.state === 'suspended') {
+        context.resume();
+    }
+    
+    const source = context.createBufferSource();
+    source.buffer = buffer;
+    const gain = context.createGain();
+    gain.gain.value = volume;
+    source.connect(gain);
+    gain.connect(context.destination);
+    source.start(0, start, duration);
+    return true;
+}
+
 function playHitSound() {
-    if (!isSoundEnabled || !audioFiles.hit) return;
+    if (!isSoundEnabled) return;
+    if (playSprite('hit', 0.6)) return;
+    if (!audioFiles.hit) return;
     
     try {
         audioFiles.hit.currentTime = 0;
@@ -217,7 +355,9 @@ function playHitSound() {
 }
 
 function playMolePopSound() {
-    if (!isSoundEnabled || !audioFiles.mole_pop) return;
+    if (!isSoundEnabled) return;
+    if (playSprite('mole_pop', 0.4)) return;
+    if (!audioFiles.mole_pop) return;
     
     try {
         audioFiles.mole_pop.currentTime = 0;
@@ -229,7 +369,9 @@ function playMolePopSound() {
 }
 
 function playGameOverSound() {
-    if (!isSoundEnabled || !audioFiles.game_over) return;
+    if (!isSoundEnabled) return;
+    if (playSprite('game_over', 0.5)) return;
+    if (!audioFiles.game_over) return;
     
     try {
         audioFiles.game_over.currentTime = 0;
@@ -241,7 +383,9 @@ function playGameOverSound() {
 }
 
 function playExplosionSound() {
-    if (!isSoundEnabled || !audioFiles.explosion) return;
+    if (!isSoundEnabled) return;
+    if (playSprite('explosion', 0.7)) return;
+    if (!audioFiles.explosion) return;
     
     try {
         audioFiles.explosion.currentTime = 0;
@@ -307,7 +451,9 @@ function stopAmbientSound() {
 }
 
 function playHammerHitSound() {
-    if (!isSoundEnabled || !audioFiles.hammer_hit) return;
+    if (!isSoundEnabled) return;
+    if (playSprite('hammer_hit', 0.5)) return;
+    if (!audioFiles.hammer_hit) return;
     
     try {
         audioFiles.hammer_hit.currentTime = 0;
@@ -319,7 +465,9 @@ function playHammerHitSound() {
 }
 
 function playButtonClickSound() {
-    if (!isSoundEnabled || !audioFiles.button_click) return;
+    if (!isSoundEnabled) return;
+    if (playSprite('button_click', 0.4)) return;
+    if (!audioFiles.button_click) return;
     
     try {
         audioFiles.button_click.currentTime = 0;
@@ -331,7 +479,9 @@ function playButtonClickSound() {
 }
 
 function playTingSound() {
-    if (!isSoundEnabled || !audioFiles.ting) return;
+    if (!isSoundEnabled) return;
+    if (playSprite('ting', 0.6)) return;
+    if (!audioFiles.ting) return;
     
     try {
         audioFiles.ting.currentTime = 0;
@@ -371,6 +521,10 @@ function clearAllTimeouts() {
         clearInterval(bombSpawnTimer);
         bombSpawnTimer = null;
     }
+    if (scheduleFrame) {
+        cancelAnimationFrame(scheduleFrame);
+        scheduleFrame = null;
+    }
 }
 
 function hideMole(index) {
@@ -383,8 +537,10 @@ function hideMole(index) {
     hole.className = 'hole empty';
 }
 
-function showMole(index) {
+function displayMole(index) {
     moles[index] = { isVisible: true, isHit: false, showHitEffect: false };
+    moleShownAt[index] = performance.now();
+    recordEvent('spawn', index);
     
     const holeContainer = document.querySelector(`[data-index="${index}"]`);
     const mole = holeContainer.querySelector('.mole');
@@ -394,6 +550,10 @@ function showMole(index) {
     hole.className = 'hole mole-active';
     
     playMolePopSound();
+}
+
+function showMole(index) {
+    displayMole(index);
     
     // Hide mole after random duration (800ms to 1800ms)
     const hideTime = Math.random() * 1000 + 800;
@@ -470,8 +630,9 @@ function hideBomb(index) {
     }
 }
 
-function showBomb(index) {
+function displayBomb(index) {
     bombs[index] = { isVisible: true, isHit: false };
+    recordEvent('bomb_spawn', index);
     
     const holeContainer = document.querySelector(`[data-index="${index}"]`);
     const bomb = holeContainer.querySelector('.bomb');
@@ -479,6 +640,10 @@ function showBomb(index) {
     
     bomb.classList.add('visible');
     hole.className = 'hole bomb-active';
+}
+
+function showBomb(index) {
+    displayBomb(index);
     
     // Hide bomb after random duration (1500ms to 3000ms)
     const hideTime = Math.random() * 1500 + 1500;
@@ -525,6 +690,100 @@ function spawnBombs() {
     bombTimeouts.push(initialBombTimeout);
 }
 
+/**
+ * Pre-generated spawn schedules (assets/schedules/<tier>.bin, written by
+ * spawn_schedules.py): a header, one event offset per schedule, then 6-byte
+ * little-endian events (time u16, hole u8, kind u8, visible u16)
+ */
+const SPAWN_TIER = 'normal';
+const SCHEDULE_MAGIC = 'WMSS';
+const SCHEDULE_VERSION = 1;
+const SCHEDULE_HEADER_BYTES = 16;
+const SCHEDULE_KIND_MOLE = 0;
+
+async function loadSpawnSchedules(tier) {
+    const response = await fetch(assetUrl(`assets/schedules/${tier}.bin`));
+    if (!response.ok) {
+        throw new Error(`Spawn schedule request failed: ${response.status}`);
+    }
+    const view = new DataView(await response.arrayBuffer());
+    const magic = String.fromCharCode(...[0, 1, 2, 3].map(i => view.getUint8(i)));
+    if (magic !== SCHEDULE_MAGIC || view.getUint16(4, true) !== SCHEDULE_VERSION) {
+        throw new Error('Unsupported spawn schedule file');
+    }
+    spawnSchedules = {
+        view,
+        eventBytes: view.getUint16(6, true),
+        count: view.getUint32(8, true),
+        eventsStart: SCHEDULE_HEADER_BYTES + 4 * (view.getUint32(8, true) + 1)
+    };
+}
+
+/**
+ * Events of one schedule, sorted by time. With ?daily in the URL everyone
+ * gets the same schedule for the day; otherwise a random one.
+ */
+function pickSchedule(schedules) {
+    const { view, eventBytes, count, eventsStart } = schedules;
+    const daily = new URLSearchParams(window.location.search).has('daily');
+    const index = daily ? Math.floor(Date.now() / 86400000) % count : Math.floor(Math.random() * count);
+    const first = view.getUint32(SCHEDULE_HEADER_BYTES + 4 * index, true);
+    const last = view.getUint32(SCHEDULE_HEADER_BYTES + 4 * (index + 1), true);
+    
+    const events = [];
+    for (let i = first; i < last; i++) {
+        const offset = eventsStart + i * eventBytes;
+        events.push({
+            time: view.getUint16(offset, true),
+            hole: view.getUint8(offset + 2),
+            kind: view.getUint8(offset + 3),
+            visible: view.getUint16(offset + 4, true)
+        });
+    }
+    return events;
+}
+
+/**
+ * Drive a whole round from one event array: a single animation-frame loop
+ * shows every event that is due and hides whatever has run out, instead of
+ * one timer per mole and bomb
+ */
+function runSchedule(events) {
+    const started = performance.now();
+    const moleHideAt = Array(9).fill(Infinity);
+    const bombHideAt = Array(9).fill(Infinity);
+    let next = 0;
+    
+    const step = () => {
+        if (!gameState.isPlaying) return;
+        const now = performance.now() - started;
+        
+        // Hide first, so a new mole in the same hole stays up
+        for (let i = 0; i < 9; i++) {
+            if (moleHideAt[i] <= now) {
+                moleHideAt[i] = Infinity;
+                hideMole(i);
+            }
+            if (bombHideAt[i] <= now) {
+                bombHideAt[i] = Infinity;
+                hideBomb(i);
+            }
+        }
+        for (; next < events.length && events[next].time <= now; next++) {
+            const event = events[next];
+            if (event.kind === SCHEDULE_KIND_MOLE) {
+                displayMole(event.hole);
+                moleHideAt[event.hole] = event.time + event.visible;
+            } else {
+                displayBomb(event.hole);
+                bombHideAt[event.hole] = event.time + event.visible;
+            }
+        }
+        scheduleFrame = requestAnimationFrame(step);
+    };
+    scheduleFrame = requestAnimationFrame(step);
+}
+
 function createBurstAnimation(holeContainer) {
     const burstDiv = document.createElement('div');
     burstDiv.className = 'burst-animation';
@@ -565,6 +824,7 @@ function handleMoleHit(index) {
     
     // Only score if there's actually a mole
     if (moles[index].isVisible) {
+        recordEvent('hit', index, performance.now() - moleShownAt[index]);
         playHitSound();
         playTingSound(); // Play special ting sound for successful mole hits
         
@@ -589,6 +849,8 @@ function handleMoleHit(index) {
             hole.className = 'hole empty';
             moles[index].isHit = false;
         }, 500);
+    } else {
+        recordEvent('miss', index);
     }
 }
 
@@ -604,6 +866,8 @@ function handleBombHit(index) {
     
     // Only trigger game over if there's actually a bomb
     if (bombs[index].isVisible) {
+        recordEvent('bomb_hit', index);
+        
         // Play explosion sound
         playExplosionSound();
         
@@ -655,7 +919,7 @@ function createHammerHitAnimation(holeIndex) {
     // Create hammer animation element
     const hammerDiv = document.createElement('div');
     hammerDiv.className = 'hammer-hit-animation';
-    hammerDiv.style.backgroundImage = "url('assets/hammer-cursor-128.png')";
+    hammerDiv.style.backgroundImage = "url('assets/images/hammer-cursor-128.png')";
     
     holeContainer.appendChild(hammerDiv);
     
@@ -748,7 +1012,7 @@ function animateHammerHit(x, y) {
     // Create hammer animation element at click position
     const hammerDiv = document.createElement('div');
     hammerDiv.className = 'hammer-hit-animation';
-    hammerDiv.style.backgroundImage = "url('assets/hammer-cursor-128.png')";
+    hammerDiv.style.backgroundImage = "url('assets/images/hammer-cursor-128.png')";
     hammerDiv.style.position = 'fixed';
     hammerDiv.style.left = x + 'px';
     hammerDiv.style.top = y + 'px';
@@ -889,6 +1153,8 @@ function endGame() {
     } else {
         elements.newHighScoreMsg.style.display = 'none';
     }
+    submitScore(gameState.score);
+    flushTelemetry();
     
     gameState.isPlaying = false;
     
@@ -905,6 +1171,79 @@ function endGame() {
     elements.gameOverModal.classList.add('show');
 }
 
+/**
+ * Global leaderboard (leaderboard.py). Set window.LEADERBOARD_URL before
+ * script.js loads to enable it; the local high score works either way
+ */
+const LEADERBOARD_URL = window.LEADERBOARD_URL || null;
+
+function leaderboardPlayer() {
+    let player = localStorage.getItem('whackMolePlayer');
+    if (!player) {
+        player = `player-${Math.random().toString(36).slice(2, 10)}`;
+        localStorage.setItem('whackMolePlayer', player);
+    }
+    return player;
+}
+
+function submitScore(score) {
+    if (!LEADERBOARD_URL) return;
+    
+    fetch(`${LEADERBOARD_URL}/scores`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ player: leaderboardPlayer(), score })
+    }).catch(e => console.log('Leaderboard submission failed:', e));
+}
+
+/**
+ * Gameplay telemetry (telemetry.py). Set window.TELEMETRY_URL to enable it;
+ * events are buffered column by column and posted in batches
+ */
+const TELEMETRY_URL = window.TELEMETRY_URL || null;
+const TELEMETRY_BATCH = 200;
+
+function emptyTelemetryColumns() {
+    return { game_ms: [], time_left: [], kind: [], hole: [], reaction_ms: [] };
+}
+
+function startTelemetry() {
+    if (!TELEMETRY_URL) return;
+    
+    telemetry = {
+        session: Math.floor(Math.random() * 0xFFFFFFFF),
+        startedAt: performance.now(),
+        columns: emptyTelemetryColumns()
+    };
+}
+
+function recordEvent(kind, hole, reactionMs = null) {
+    if (!telemetry || !gameState.isPlaying) return;
+    
+    const columns = telemetry.columns;
+    columns.game_ms.push(Math.min(Math.round(performance.now() - telemetry.startedAt), 65535));
+    columns.time_left.push(gameState.timeLeft);
+    columns.kind.push(kind);
+    columns.hole.push(hole);
+    columns.reaction_ms.push(reactionMs === null ? null : Math.min(Math.round(reactionMs), 65534));
+    if (columns.kind.length >= TELEMETRY_BATCH) {
+        flushTelemetry();
+    }
+}
+
+function flushTelemetry() {
+    if (!telemetry || telemetry.columns.kind.length === 0) return;
+    
+    const body = JSON.stringify({ session: telemetry.session, ...telemetry.columns });
+    telemetry.columns = emptyTelemetryColumns();
+    fetch(`${TELEMETRY_URL}/events`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body,
+        keepalive: true
+    }).catch(e => console.log('Telemetry upload failed:', e));
+}
+
 function startGame() {
     // Disable start button immediately
     elements.startButton.disabled = true;
@@ -973,11 +1312,18 @@ function actuallyStartGame() {
         }
     }, 1000);
     
-    // Start mole spawning
-    spawnMoles();
+    startTelemetry();
     
-    // Start bomb spawning
-    spawnBombs();
+    if (spawnSchedules) {
+        // Replay a pre-generated round
+        runSchedule(pickSchedule(spawnSchedules));
+    } else {
+        // Start mole spawning
+        spawnMoles();
+        
+        // Start bomb spawning
+        spawnBombs();
+    }
 }
 
 function handlePlayAgain() {
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Production static file server for the Whack-a-Mole game
+Stdlib-only asyncio HTTP/1.1 server that replaces `python3 -m http.server`:
+files are served from an in-memory (or mmap-backed, for large files) cache
+with precompressed gzip variants, ETag/If-None-Match revalidation, byte
+Range requests, keep-alive and long-lived caching for fingerprinted assets.
+Only the game's own files are served: top-level pages, scripts and styles
+plus the assets/ tree, never the tooling, data or build sources beside them
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import mimetypes
+import mmap
+import os
+import re
+import socket
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import unquote, urlsplit
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Content types worth gzipping (audio/images are already compressed or don't shrink)
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+MIN_COMPRESS_SIZE = 256
+
+# Files at least this large are mapped instead of read into memory
+MMAP_THRESHOLD = 1024 * 1024
+
+# Memory cap for cached bodies and their gzip variants; least recently used files are dropped first
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+# Distinct URL spellings remembered per real path ('/a.js', '//a.js', '/./a.js', ...)
+MAX_ALIASES = 4096
+
+# What the game requests: files at the root or under assets/ with these suffixes. Everything
+# else (Python tooling, requests.jsonl, leaderboard.db, telemetry/, assets/masters/) is a 404
+PUBLIC_DIRS = ('assets',)
+PUBLIC_SUFFIXES = ('.html', '.css', '.js', '.json', '.webmanifest', '.wav', '.bin',
+                   '.png', '.webp', '.jpg', '.svg', '.ico')
+SOURCE_PREFIXES = ('assets/masters/',)  # Inputs of build_images.py
+
+# Fingerprinted names like script.3f2a9c1d.js never change, so they can be cached forever
+FINGERPRINT_PATTERN = re.compile(r'\.[0-9a-f]{8,}\.[A-Za-z0-9]+$')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+MAX_HEADER_BYTES = 16 * 1024
+# GET and HEAD carry no body; a larger one is refused instead of read into memory
+MAX_BODY_BYTES = 64 * 1024
+WRITE_CHUNK = 256 * 1024
+
+mimetypes.add_type('application/javascript', '.js')
+mimetypes.add_type('audio/wav', '.wav')
+mimetypes.add_type('image/webp', '.webp')
+mimetypes.add_type('application/manifest+json', '.webmanifest')
+
+class CachedFile:
+    """One file held in memory (or mapped) with its validators and gzip variant"""
+
+    def __init__(self, path, stat):
+        self.path = path
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self.checked = time.monotonic()
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if self.content_type.startswith('text/') or self.content_type.endswith('javascript'):
+            self.content_type += '; charset=utf-8'
+        self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+
+        with open(path, 'rb') as f:
+            if self.size >= MMAP_THRESHOLD:
+                self.body = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self.etag = f'"{self.size:x}-{self.mtime_ns:x}"'
+            else:
+                self.body = f.read()
+                self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:20] + '"'
+
+        self.gzip_body = None
+        if self.content_type.startswith(COMPRESSIBLE_TYPES) and MIN_COMPRESS_SIZE <= self.size < MMAP_THRESHOLD:
+            compressed = gzip.compress(self.body, compresslevel=9, mtime=0)
+            if len(compressed) < self.size:
+                self.gzip_body = compressed
+
+        self.nbytes = self.size + (len(self.gzip_body) if self.gzip_body is not None else 0)
+
+        name = os.path.basename(path)
+        self.cache_control = IMMUTABLE_CACHE_CONTROL if FINGERPRINT_PATTERN.search(name) \
+            else REVALIDATE_CACHE_CONTROL
+
+def url_parts(url_path):
+    """Path segments of a URL path with empty and '.' segments dropped, or None if it climbs or is hidden
+
+    Raises ValueError for control characters (%00 included), which no file name of the game contains.
+    """
+    parts = [part for part in unquote(url_path).split('/') if part not in ('', '.')]
+    if any(ord(char) < 32 or ord(char) == 127 for part in parts for char in part):
+        raise ValueError('control character in path')
+    if any(part == '..' or part.startswith('.') for part in parts):
+        return None
+    return parts
+
+def is_public(relative):
+    """Whether a path relative to the served root is part of the game"""
+    relative = relative.replace(os.sep, '/')
+    head, _, rest = relative.partition('/')
+    if rest and (head not in PUBLIC_DIRS or relative.startswith(SOURCE_PREFIXES)):
+        return False
+    return relative.endswith(PUBLIC_SUFFIXES)
+
+class FileCache:
+    """Real path -> CachedFile LRU capped at max_bytes, revalidated against the filesystem at most every check_interval"""
+
+    def __init__(self, root, check_interval=1.0, max_bytes=DEFAULT_CACHE_BYTES):
+        self.root = os.path.realpath(root)
+        self.check_interval = check_interval
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.files = OrderedDict()
+        # Normalized URL path -> real path; only paths that resolved to a public file are kept
+        self.paths = {}
+
+    def resolve(self, parts):
+        """Map URL path segments to a public file under root, or None"""
+        path = os.path.realpath(os.path.join(self.root, *parts))
+        if path != self.root and not path.startswith(self.root + os.sep):
+            return None
+        if os.path.isdir(path):
+            path = os.path.join(path, 'index.html')
+        if not is_public(os.path.relpath(path, self.root)):
+            return None
+        return path
+
+    def get(self, url_path):
+        """Return the CachedFile for a URL path, loading or refreshing it as needed
+
+        Raises ValueError for a malformed path and OSError if the file cannot be read.
+        """
+        parts = url_parts(url_path)
+        if parts is None:
+            return None
+        key = '/'.join(parts)
+        path = self.paths.get(key)
+        entry = self.files.get(path)
+        now = time.monotonic()
+        if entry is not None and now - entry.checked < self.check_interval:
+            self.files.move_to_end(path)
+            return entry
+
+        if path is None:
+            path = self.resolve(parts)
+            if path is None:
+                return None
+        try:
+            stat = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            self.paths.pop(key, None)
+            self.evict(path)
+            return None
+
+        if entry is not None and (stat.st_size, stat.st_mtime_ns) == (entry.size, entry.mtime_ns):
+            entry.checked = now
+            self.files.move_to_end(path)
+            return entry
+
+        self.evict(path)
+        try:
+            entry = CachedFile(path, stat)
+        except (IsADirectoryError, PermissionError, FileNotFoundError):
+            return None
+        if len(self.paths) >= MAX_ALIASES:
+            self.paths.clear()
+        self.paths[key] = path
+        self.files[path] = entry
+        self.nbytes += entry.nbytes
+        # Keep the file just loaded even if it alone is over the cap
+        while self.nbytes > self.max_bytes and len(self.files) > 1:
+            self.evict(next(iter(self.files)))
+        return entry
+
+    def evict(self, path):
+        # Not closed explicitly: a response still sending a mapped body keeps it alive until it finishes
+        entry = self.files.pop(path, None)
+        if entry is not None:
+            self.nbytes -= entry.nbytes
+
+def parse_range(header, size):
+    """Parse a single 'bytes=' range into (start, end) inclusive
+
+    Returns None to ignore the header (malformed or multiple ranges, which
+    are served as a full 200 response) and 'unsatisfiable' for a 416.
+    """
+    match = re.fullmatch(r'\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*', header)
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        length = int(last)
+        if length == 0:
+            return 'unsatisfiable'
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return 'unsatisfiable'
+    return start, end
+
+def etag_matches(header, etag):
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if header.strip() == '*':
+        return True
+    tags = [tag.strip().removeprefix('W/') for tag in header.split(',')]
+    return etag in tags
+
+def not_modified_since(header, entry):
+    try:
+        return parsedate_to_datetime(header).timestamp() >= entry.mtime_ns // 1_000_000_000
+    except (TypeError, ValueError):
+        return False
+
+class StaticServer:
+    """Asyncio HTTP/1.1 static file server"""
+
+    def __init__(self, root=ROOT, keepalive_timeout=15.0, access_log=False, cache_bytes=DEFAULT_CACHE_BYTES):
+        self.cache = FileCache(root, max_bytes=cache_bytes)
+        self.keepalive_timeout = keepalive_timeout
+        self.access_log = access_log
+        self._date = (0, '')
+
+    def http_date(self):
+        """Current Date header value, formatted at most once per second"""
+        now = int(time.time())
+        if self._date[0] != now:
+            self._date = (now, formatdate(now, usegmt=True))
+        return self._date[1]
+
+    async def handle_connection(self, reader, writer):
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.keepalive_timeout)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self.send_error(writer, 431, 'Request Header Fields Too Large', keep_alive=False)
+                    break
+                keep_alive = await self.handle_request(head, reader, writer)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, head, reader, writer):
+        """Serve one request; returns whether the connection stays open"""
+        try:
+            request_line, *header_lines = head.decode('latin-1').split('\r\n')
+            method, target, version = request_line.split(' ', 2)
+        except ValueError:
+            await self.send_error(writer, 400, 'Bad Request', keep_alive=False)
+            return False
+
+        headers = {}
+        for line in header_lines:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+        # GET/HEAD carry no body, but drain a small one if a client sends it anyway
+        length = headers.get('content-length', '0')
+        if not length.isdigit():
+            await self.send_error(writer, 400, 'Bad Request', keep_alive=False)
+            return False
+        if int(length) > MAX_BODY_BYTES:
+            await self.send_error(writer, 413, 'Content Too Large', keep_alive=False)
+            return False
+        if int(length):
+            try:
+                await reader.readexactly(int(length))
+            except asyncio.IncompleteReadError:
+                return False
+
+        if method not in ('GET', 'HEAD'):
+            await self.send_error(writer, 405, 'Method Not Allowed', keep_alive, {'Allow': 'GET, HEAD'})
+            return keep_alive
+
+        path = urlsplit(target).path
+        status = None
+        try:
+            entry = self.cache.get(path)
+        except ValueError:
+            entry, status = None, 400
+        except OSError:
+            entry = None  # Unreadable, e.g. a name too long for the filesystem
+        if status == 400:
+            await self.send_error(writer, 400, 'Bad Request', keep_alive)
+        elif entry is None:
+            await self.send_error(writer, 404, 'Not Found', keep_alive)
+            status = 404
+        else:
+            status = await self.send_file(writer, entry, method, headers, keep_alive)
+
+        if self.access_log:
+            print(f'{method} {target} {status}')
+        return keep_alive
+
+    async def send_file(self, writer, entry, method, headers, keep_alive):
+        response = {
+            'ETag': entry.etag,
+            'Last-Modified': entry.last_modified,
+            'Cache-Control': entry.cache_control,
+            'Accept-Ranges': 'bytes',
+        }
+        if entry.gzip_body is not None:
+            response['Vary'] = 'Accept-Encoding'
+
+        if 'if-none-match' in headers:
+            fresh = etag_matches(headers['if-none-match'], entry.etag)
+        else:
+            fresh = 'if-modified-since' in headers and not_modified_since(headers['if-modified-since'], entry)
+        if fresh:
+            await self.send_head(writer, 304, 'Not Modified', response, keep_alive)
+            return 304
+
+        body = entry.body
+        status, reason = 200, 'OK'
+        byte_range = None
+        if 'range' in headers and ('if-range' not in headers or headers['if-range'] == entry.etag):
+            byte_range = parse_range(headers['range'], entry.size)
+        if byte_range == 'unsatisfiable':
+            response['Content-Range'] = f'bytes */{entry.size}'
+            await self.send_error(writer, 416, 'Range Not Satisfiable', keep_alive, response)
+            return 416
+
+        if byte_range is not None:
+            start, end = byte_range
+            status, reason = 206, 'Partial Content'
+            response['Content-Range'] = f'bytes {start}-{end}/{entry.size}'
+            body = memoryview(body)[start:end + 1]
+        elif entry.gzip_body is not None and 'gzip' in headers.get('accept-encoding', ''):
+            response['Content-Encoding'] = 'gzip'
+            body = entry.gzip_body
+
+        response['Content-Type'] = entry.content_type
+        response['Content-Length'] = str(len(body))
+        await self.send_head(writer, status, reason, response, keep_alive)
+        if method == 'GET':
+            view = memoryview(body)
+            for offset in range(0, len(view), WRITE_CHUNK):
+                writer.write(view[offset:offset + WRITE_CHUNK])
+                await writer.drain()
+        return status
+
+    async def send_head(self, writer, status, reason, headers, keep_alive):
+        lines = [f'HTTP/1.1 {status} {reason}', f'Date: {self.http_date()}', 'Server: WhackMaster']
+        lines += [f'{name}: {value}' for name, value in headers.items()]
+        if keep_alive:
+            lines.append(f'Keep-Alive: timeout={int(self.keepalive_timeout)}')
+        else:
+            lines.append('Connection: close')
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await writer.drain()
+
+    async def send_error(self, writer, status, reason, keep_alive, headers=None):
+        body = f'{status} {reason}\n'.encode()
+        response = dict(headers or {})
+        response.update({'Content-Type': 'text/plain; charset=utf-8', 'Content-Length': str(len(body))})
+        await self.send_head(writer, status, reason, response, keep_alive)
+        writer.write(body)
+        await writer.drain()
+
+async def serve(host, port, root=ROOT, reuse_port=False, **options):
+    server = StaticServer(root, **options)
+    listener = await asyncio.start_server(server.handle_connection, host, port, limit=MAX_HEADER_BYTES,
+                                          backlog=4096, reuse_port=reuse_port)
+    async with listener:
+        await listener.serve_forever()
+
+def run(host, port, root, workers=1, **options):
+    """Run the server, forking extra worker processes that share the port via SO_REUSEPORT"""
+    reuse_port = workers > 1
+    for _ in range(workers - 1):
+        if os.fork() == 0:
+            break
+    try:
+        asyncio.run(serve(host, port, root, reuse_port=reuse_port, **options))
+    except KeyboardInterrupt:
+        pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--root', default=ROOT, help='directory to serve (default: the project root)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='processes sharing the port via SO_REUSEPORT (default: %(default)s)')
+    parser.add_argument('--keepalive-timeout', type=float, default=15.0,
+                        help='seconds an idle keep-alive connection stays open (default: %(default)s)')
+    parser.add_argument('--cache-mb', type=float, default=DEFAULT_CACHE_BYTES / 2**20,
+                        help='memory cap for cached files (default: %(default)s)')
+    parser.add_argument('--access-log', action='store_true', help='print one line per request')
+    args = parser.parse_args(argv)
+
+    print(f'Serving {args.root} on http://{args.host}:{args.port} ({args.workers} worker(s))')
+    run(args.host, args.port, args.root, args.workers,
+        keepalive_timeout=args.keepalive_timeout, access_log=args.access_log,
+        cache_bytes=int(args.cache_mb * 2**20))
+
+if __name__ == '__main__':
+    main()
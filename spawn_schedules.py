@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Seeded spawn schedules for the game client
+Pre-draws whole rounds with the spawn rules of script.js (see
+spawn_simulator.py) and packs them into one binary file per difficulty tier.
+Each schedule is a sorted array of (time, hole, kind, visible) events, so
+the client drives a round from a single event array instead of chaining
+setTimeouts around Math.random(), and everyone loading the same file and
+index plays the same sequence (daily challenges).
+
+File layout, little-endian:
+    header   magic 'WMSS', version u16, event size u16, schedules u32, events u32
+    offsets  u32[schedules + 1], first event of each schedule
+    events   EVENT_DTYPE[events], sorted by time within each schedule
+"""
+
+import argparse
+import itertools
+import os
+import struct
+import time
+
+import numpy as np
+
+from spawn_simulator import (BOMB_COUNT_PROBS, BOMB_TIMES_MS, BOMB_VISIBLE_MS, FIRST_SPAWN_MS, GAME_MS,
+                             HOLE_ORDERS, HOLES, MAX_MOLES, MOLE_VISIBLE_MS, SPAWN_PHASES, bomb_holes,
+                             spawn_phase)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(ROOT, 'assets', 'schedules')
+
+MAGIC = b'WMSS'
+VERSION = 1
+HEADER = struct.Struct('<4sHHII')
+
+KIND_MOLE = 0
+KIND_BOMB = 1
+
+# One spawn event; visible is how long the mole or bomb stays up, already
+# cut short where the next round, the end of the game or a stale hideMole
+# timer of an earlier mole in the same hole hides it
+EVENT_DTYPE = np.dtype([
+    ('time', '<u2'),     # ms after the game starts
+    ('hole', 'u1'),      # 0-8, row by row from the top left
+    ('kind', 'u1'),      # KIND_MOLE or KIND_BOMB
+    ('visible', '<u2'),  # ms
+])
+
+# Difficulty tiers: scales of the delay between rounds and of how long moles
+# and bombs stay up, and P(0), P(1), P(2) bombs per bomb round.
+# 'normal' is the live game's rules unchanged, stale hideMole timers included.
+TIERS = {
+    'easy': {'delay_scale': 1.25, 'visible_scale': 1.25, 'bomb_count_probs': (0.3, 0.6, 0.1)},
+    'normal': {'delay_scale': 1.0, 'visible_scale': 1.0, 'bomb_count_probs': BOMB_COUNT_PROBS},
+    'hard': {'delay_scale': 0.8, 'visible_scale': 0.85, 'bomb_count_probs': (0.05, 0.6, 0.35)},
+}
+
+DEFAULT_SCHEDULES = 256
+
+def generate(count, tier='normal', seed=0):
+    """Draw count schedules of a tier; returns (offsets, events)
+
+    All schedules advance together one mole round per step, as in the
+    simulator. Times are whole milliseconds.
+    """
+    if tier not in TIERS:
+        raise ValueError(f"unknown tier {tier!r} (choose from {', '.join(TIERS)})")
+    rules = TIERS[tier]
+    rng = np.random.default_rng(seed)
+    schedule_index = np.arange(count)
+    min_moles = np.array([moles[0] for _, moles, _ in SPAWN_PHASES])
+    extra_moles = np.array([moles[1] - moles[0] for _, moles, _ in SPAWN_PHASES])
+    min_delay = np.array([delay[0] for _, _, delay in SPAWN_PHASES]) * rules['delay_scale']
+    delay_span = np.array([delay[1] - delay[0] for _, _, delay in SPAWN_PHASES]) * rules['delay_scale']
+    mole_visible = np.multiply(MOLE_VISIBLE_MS, rules['visible_scale'])
+    bomb_visible = np.multiply(BOMB_VISIBLE_MS, rules['visible_scale'])
+    slots = np.arange(MAX_MOLES)[:, None]
+
+    # hideMole timers of the last rounds per hole (0 = none), as in the simulator: a
+    # timer outlives its mole, and rounds this far back have fired all of theirs
+    pending = np.zeros((int(np.ceil(mole_visible[1] / min_delay.min())) + 1, HOLES, count))
+
+    parts = []
+    start = np.full(count, float(FIRST_SPAWN_MS))
+    for round_index in itertools.count():
+        active = start < GAME_MS
+        if not active.any():
+            break
+        phase = spawn_phase(start)
+        moles = min_moles[phase] + (rng.random(count) < 0.5) * extra_moles[phase]
+        next_start = start + np.rint(rng.random(count) * delay_span[phase] + min_delay[phase])
+        holes = HOLE_ORDERS[rng.integers(0, len(HOLE_ORDERS), count)].T
+        shown = (slots < moles) & active
+        timer = start + np.rint(rng.uniform(*mole_visible, (MAX_MOLES, count)))
+        # The next round hides every mole, and so do the end of the game and a still-pending
+        # timer of an earlier mole in the same hole
+        stale = np.take_along_axis(np.where(pending > start, pending, np.inf).min(axis=0), holes, axis=0)
+        visible = np.minimum(np.minimum(timer, stale), np.minimum(next_start, GAME_MS)) - start
+        slot = pending[round_index % len(pending)]
+        slot.fill(0)
+        np.put_along_axis(slot, holes, np.where(shown, timer, 0), axis=0)
+        parts.append((np.broadcast_to(schedule_index, shown.shape)[shown], np.broadcast_to(start, shown.shape)[shown],
+                      holes[shown], KIND_MOLE, visible[shown]))
+
+        # Bomb rounds land in holes without a visible mole
+        for bomb_time in BOMB_TIMES_MS:
+            spawning = np.flatnonzero(active & (start <= bomb_time) & (bomb_time < next_start))
+            if not len(spawning):
+                continue
+            up = shown[:, spawning] & (start[spawning] + visible[:, spawning] > bomb_time)
+            order, placed = bomb_holes(rng, holes[:, spawning], up, rules['bomb_count_probs'])
+            until = np.rint(rng.uniform(*bomb_visible, order.shape))
+            parts.append((np.broadcast_to(spawning, order.shape)[placed], np.full(placed.sum(), bomb_time),
+                          order[placed], KIND_BOMB, np.minimum(until, GAME_MS - bomb_time)[placed]))
+        start = next_start
+
+    schedules = np.concatenate([part[0] for part in parts])
+    events = np.empty(len(schedules), dtype=EVENT_DTYPE)
+    events['time'] = np.concatenate([part[1] for part in parts])
+    events['hole'] = np.concatenate([part[2] for part in parts])
+    events['kind'] = np.concatenate([np.full(len(part[0]), part[3]) for part in parts])
+    events['visible'] = np.concatenate([part[4] for part in parts])
+
+    # Moles before bombs at the same time: a bomb round sees the moles of a round starting with it
+    events = events[np.lexsort((events['kind'], events['time'], schedules))]
+    offsets = np.zeros(count + 1, dtype='<u4')
+    np.cumsum(np.bincount(schedules, minlength=count), out=offsets[1:])
+    return offsets, events
+
+def pack(offsets, events):
+    """Schedule file contents as bytes"""
+    header = HEADER.pack(MAGIC, VERSION, EVENT_DTYPE.itemsize, len(offsets) - 1, len(events))
+    return header + offsets.astype('<u4').tobytes() + events.tobytes()
+
+def unpack(data):
+    """(offsets, events) views of schedule file contents"""
+    magic, version, event_size, count, total = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or event_size != EVENT_DTYPE.itemsize:
+        raise ValueError('not a version %d spawn schedule file' % VERSION)
+    offsets = np.frombuffer(data, dtype='<u4', count=count + 1, offset=HEADER.size)
+    events = np.frombuffer(data, dtype=EVENT_DTYPE, count=total, offset=HEADER.size + offsets.nbytes)
+    return offsets, events
+
+def schedule(offsets, events, index):
+    """Events of one schedule"""
+    return events[offsets[index]:offsets[index + 1]]
+
+def write_schedules(path, offsets, events):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(pack(offsets, events))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip(),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tier', action='append', choices=sorted(TIERS),
+                        help='tier to generate (repeatable, default: all)')
+    parser.add_argument('--count', type=int, default=DEFAULT_SCHEDULES,
+                        help='schedules per tier (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output-dir', '-o', default=OUTPUT_DIR,
+                        help='directory for <tier>.bin (default: assets/schedules)')
+    args = parser.parse_args(argv)
+
+    for tier in args.tier or TIERS:
+        start = time.perf_counter()
+        # Each tier has its own stream, so regenerating one tier leaves the others as they were
+        offsets, events = generate(args.count, tier, [args.seed, list(TIERS).index(tier)])
+        elapsed = time.perf_counter() - start
+        path = os.path.join(args.output_dir, f'{tier}.bin')
+        write_schedules(path, offsets, events)
+        print(f"✓ {os.path.relpath(path, ROOT)}: {args.count:,} schedules, {len(events):,} events, "
+              f"{os.path.getsize(path) / 1024:.1f} KB ({args.count / elapsed:,.0f} schedules/s)")
+
+if __name__ == "__main__":
+    main()
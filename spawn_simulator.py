@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Headless Monte-Carlo simulator of the game's spawn rules
+A NumPy port of spawnMoles()/showMole()/hideMole() and spawnBombs() from
+script.js that plays many 30-second rounds at once: every step advances one
+mole spawn round in all games of a chunk, so the cost grows with the number
+of rounds (~50), not with the number of games. A parameterized player model
+(reaction time, targeting speed, accuracy and bomb avoidance) plays each
+game, and the score, hit-rate and bomb-hit distributions are reported.
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import permutations, product
+
+import numpy as np
+
+# Timing rules from script.js, in milliseconds
+GAME_MS = 30000
+FIRST_SPAWN_MS = 500
+MOLE_VISIBLE_MS = (800, 1800)            # showMole hide timeout
+BOMB_TIMES_MS = (5000, 10000, 15000, 20000, 25000)
+BOMB_VISIBLE_MS = (1500, 3000)           # showBomb hide timeout
+BOMB_COUNT_PROBS = (0.15, 0.7, 0.15)     # P(0), P(1), P(2) bombs per bomb round
+HOLES = 9
+MAX_MOLES = 4
+POINTS_PER_MOLE = 10
+
+# Spawn phases keyed on timeLeft: (timeLeft above, moles per round, next round delay range)
+# The last phase spawns 3 or 4 moles with equal probability
+SPAWN_PHASES = (
+    (20, (1, 1), (1000, 2000)),
+    (10, (2, 2), (700, 1500)),
+    (0, (3, 4), (400, 1000)),
+)
+
+# A hideMole timer fires at most MOLE_VISIBLE_MS[1] after its show and rounds
+# are at least 400ms apart, so only the last 5 rounds can still have timers pending
+PENDING_ROUNDS = 5
+
+# Every ordered choice of MAX_MOLES distinct holes; the first k entries of a
+# uniform row are a uniform pick of k holes without replacement
+HOLE_ORDERS = np.array(list(permutations(range(HOLES), MAX_MOLES)), dtype=np.intp)
+
+# Player models: reaction time to a new round is lognormal around reaction_ms
+# (shape reaction_sigma, and a per-game skill factor with spread skill_sigma);
+# each further mole in the same round takes move_ms more. A swing lands with
+# probability accuracy. A mole sharing its hole with a bomb is skipped with
+# probability bomb_avoidance (otherwise the bomb is hit), and every bomb is
+# clicked by mistake with probability bomb_misclick.
+PLAYER_MODELS = {
+    'casual': {'reaction_ms': 650, 'reaction_sigma': 0.35, 'skill_sigma': 0.2, 'move_ms': 400,
+               'accuracy': 0.85, 'bomb_avoidance': 0.7, 'bomb_misclick': 0.03},
+    'average': {'reaction_ms': 450, 'reaction_sigma': 0.3, 'skill_sigma': 0.15, 'move_ms': 300,
+                'accuracy': 0.92, 'bomb_avoidance': 0.85, 'bomb_misclick': 0.01},
+    'expert': {'reaction_ms': 300, 'reaction_sigma': 0.25, 'skill_sigma': 0.1, 'move_ms': 200,
+               'accuracy': 0.97, 'bomb_avoidance': 0.97, 'bomb_misclick': 0.002},
+}
+
+# Games advanced together; small enough that the per-hole state stays in cache
+DEFAULT_CHUNK_SIZE = 1 << 13
+
+def player_model(model='average', **overrides):
+    """Parameters of a named player model, with overrides applied"""
+    if model not in PLAYER_MODELS:
+        raise ValueError(f"unknown player model {model!r} (choose from {', '.join(PLAYER_MODELS)})")
+    params = dict(PLAYER_MODELS[model])
+    unknown = set(overrides) - set(params)
+    if unknown:
+        raise ValueError(f"unknown player parameter {sorted(unknown)[0]!r}")
+    params.update(overrides)
+    return params
+
+def spawn_phase(time_ms):
+    """Index into SPAWN_PHASES for spawn rounds at time_ms
+
+    The game timer is created before the spawn timers, so at a whole second
+    it has already ticked: timeLeft is 30 - floor(t / 1000).
+    """
+    time_left = GAME_MS // 1000 - np.floor(time_ms / 1000)
+    phase = np.zeros(np.shape(time_ms), dtype=np.intp)
+    for above, _, _ in SPAWN_PHASES[:-1]:
+        phase += time_left <= above
+    return phase
+
+def _uniform(rng, bounds, size):
+    low, high = bounds
+    values = rng.random(size, dtype=np.float32)
+    values *= high - low
+    values += low
+    return values
+
+def _reaction(rng, median, sigma, size):
+    values = rng.standard_normal(size, dtype=np.float32)
+    values *= sigma
+    np.exp(values, out=values)
+    values *= median
+    return values
+
+def simulate_chunk(games, params, seed):
+    """Play games with one player model; returns per-game result arrays
+
+    Per-mole arrays are laid out (MAX_MOLES, games) so that reductions over
+    the moles of a round are elementwise operations on contiguous rows.
+    Times are float32 milliseconds (resolution ~2us at the end of a game).
+    """
+    rng = np.random.default_rng(seed)
+    game_index = np.arange(games)
+    hole_orders = np.ascontiguousarray(HOLE_ORDERS.T)
+    hole_rows = hole_orders * games  # Offset of each hole's row in flat (HOLES, games) arrays
+    min_moles = np.array([moles[0] for _, moles, _ in SPAWN_PHASES])
+    extra_moles = np.array([moles[1] - moles[0] for _, moles, _ in SPAWN_PHASES])
+    min_delay = np.array([delay[0] for _, _, delay in SPAWN_PHASES], dtype=np.float32)
+    delay_span = np.array([delay[1] - delay[0] for _, _, delay in SPAWN_PHASES], dtype=np.float32)
+    slots = np.arange(MAX_MOLES)[:, None]
+    move = (np.arange(MAX_MOLES, dtype=np.float32) * params['move_ms'])[:, None]
+    inf = np.float32(np.inf)
+
+    median = params['reaction_ms'] * np.exp(rng.standard_normal(games, dtype=np.float32) * params['skill_sigma'])
+    start = np.full(games, FIRST_SPAWN_MS, dtype=np.float32)
+    dead = np.full(games, inf)  # time of the bomb hit that ends each game
+    pending = np.zeros((PENDING_ROUNDS, HOLES, games), dtype=np.float32)  # hideMole timers per hole
+    pending_start = np.full((PENDING_ROUNDS, games), -np.inf, dtype=np.float32)  # round start of each slot
+    stale = np.empty((HOLES, games), dtype=np.float32)
+    bomb_end = np.zeros((HOLES, games), dtype=np.float32)  # when the bomb in each hole disappears
+    hits = np.zeros(games, dtype=np.int64)
+    shown_total = np.zeros(games, dtype=np.int64)
+    bombs_seen = np.zeros(games, dtype=np.int64)
+
+    for round_index in range(GAME_MS // 400 + 1):
+        active = start < GAME_MS
+        if not active.any():
+            break
+        phase = spawn_phase(start)
+        count = min_moles[phase] + (rng.random(games, dtype=np.float32) < 0.5) * extra_moles[phase]
+        next_start = start + rng.random(games, dtype=np.float32) * delay_span[phase] + min_delay[phase]
+        order = rng.integers(0, hole_orders.shape[1], games)
+        holes = hole_orders[:, order]
+        shown = (slots < count) & active
+        timer = _uniform(rng, MOLE_VISIBLE_MS, (MAX_MOLES, games))
+        timer += start
+
+        # A mole is hidden by its own timer, the next round, the end of the
+        # game, or a still-pending timer of an earlier mole in the same hole
+        stale.fill(inf)
+        for previous, previous_start in zip(pending, pending_start):
+            if (previous_start > start - MOLE_VISIBLE_MS[1]).any():  # Otherwise every timer has fired
+                np.minimum(stale, np.where(previous > start, previous, inf), out=stale)
+        cells = hole_rows[:, order] + game_index  # Flat indices into (HOLES, games) arrays
+        end = np.minimum(timer, np.minimum(next_start, GAME_MS))
+        np.minimum(end, stale.take(cells), out=end)
+        slot = pending[round_index % PENDING_ROUNDS]
+        slot.fill(0)
+        slot.put(cells, np.where(shown, timer, 0))
+        pending_start[round_index % PENDING_ROUNDS] = start
+
+        # The player notices the round, then works through its moles in order.
+        # One uniform decides either the swing landing or, on a bomb, not avoiding it
+        click = _reaction(rng, median, params['reaction_sigma'], games) + start + move
+        attempt = shown & (click < end)
+        chance = rng.random((MAX_MOLES, games), dtype=np.float32)
+        hit = attempt & (chance < params['accuracy'])
+        # Bombs appear during an earlier round, so one still there at the click is in the way
+        on_bomb = bomb_end.take(cells) > click
+        if on_bomb.any():
+            hit &= ~on_bomb
+            bomb_clicks = attempt & on_bomb & (chance >= params['bomb_avoidance'])
+            np.minimum(dead, np.where(bomb_clicks, click, inf).min(axis=0), out=dead)
+        hit_time = np.where(hit, click, inf)
+
+        # A bomb round falling inside this mole round sees its visible moles
+        bomb_time = np.maximum(np.ceil(start / BOMB_TIMES_MS[0]) * BOMB_TIMES_MS[0], BOMB_TIMES_MS[0])
+        spawning = np.flatnonzero(active & (bomb_time <= BOMB_TIMES_MS[-1]) & (bomb_time < next_start))
+        if len(spawning):
+            spawn_bombs(rng, params, spawning, bomb_time[spawning], holes[:, spawning],
+                        shown[:, spawning] & (end[:, spawning] > bomb_time[spawning]) &
+                        (hit_time[:, spawning] > bomb_time[spawning]),
+                        median, dead, bomb_end, bombs_seen)
+
+        # Later rounds start after every click of this one, so dead is final for it
+        hits += (hit_time < dead).sum(axis=0)
+        shown_total += (shown & (start < dead)).sum(axis=0)
+        start = next_start
+
+    return {
+        'score': hits * POINTS_PER_MOLE,
+        'hits': hits,
+        'moles': shown_total,
+        'bombs': bombs_seen,
+        'bomb_hit': dead < GAME_MS,
+        'end_ms': np.minimum(dead, GAME_MS),
+    }
+
+def bomb_holes(rng, holes, visible, count_probs=BOMB_COUNT_PROBS):
+    """Holes picked by one spawnBombs() round in each game
+
+    holes and visible are (MAX_MOLES, games) mole holes and whether each mole
+    is still up. Returns (order, placed), both (2, games): the candidate
+    holes of the first and second bomb and whether each one is placed.
+    """
+    occupied = np.zeros((HOLES, holes.shape[1]), dtype=np.float32)
+    np.put_along_axis(occupied, holes, visible, axis=0)
+    keys = rng.random(occupied.shape, dtype=np.float32) + occupied  # Occupied holes sort last
+    order = np.argsort(keys, axis=0)[:2]
+    number = rng.choice(len(count_probs), size=holes.shape[1], p=count_probs)
+    placed = (np.arange(2)[:, None] < number) & (np.take_along_axis(keys, order, axis=0) < 1)
+    return order, placed
+
+def spawn_bombs(rng, params, games, at, holes, visible, median, dead, bomb_end, bombs_seen):
+    """One spawnBombs() round at time at in the given games (updates the bomb state in place)
+
+    Bombs go to random holes without a visible mole; the player may click
+    each one by mistake, which ends the game.
+    """
+    n = len(games)
+    order, placed = bomb_holes(rng, holes, visible)
+    until = _uniform(rng, BOMB_VISIBLE_MS, (2, n)) + at
+    ends = np.zeros((HOLES, n), dtype=np.float32)  # Earlier bombs are long gone
+    np.put_along_axis(ends, order, np.where(placed, until, 0), axis=0)
+    bomb_end[:, games] = ends
+    bombs_seen[games] += (placed & (at < dead[games])).sum(axis=0)
+
+    misclick_time = _reaction(rng, median[games], params['reaction_sigma'], (2, n)) + at
+    misclick = placed & (rng.random((2, n)) < params['bomb_misclick']) & (misclick_time < until)
+    dead[games] = np.minimum(dead[games], np.where(misclick, misclick_time, np.inf).min(axis=0))
+
+def simulate(games, model='average', seed=0, chunk_size=DEFAULT_CHUNK_SIZE, workers=1, **overrides):
+    """Play games with a player model, in chunks across worker processes
+
+    Results are the same for any number of workers: chunk i always uses
+    the i-th child of seed's SeedSequence.
+    """
+    params = player_model(model, **overrides)
+    sizes = [min(chunk_size, games - lo) for lo in range(0, games, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if workers == 1 or len(sizes) == 1:
+        chunks = [simulate_chunk(size, params, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(sizes))) as pool:
+            chunks = list(pool.map(simulate_chunk, sizes, [params] * len(sizes), seeds))
+    return {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
+
+def summarize(results):
+    """Score, hit-rate and bomb-hit distribution statistics of simulated games"""
+    score = results['score']
+    hit_rate = results['hits'] / np.maximum(results['moles'], 1)
+    percentiles = (5, 25, 50, 75, 95)
+    edges = np.arange(0, score.max() + 2 * POINTS_PER_MOLE, POINTS_PER_MOLE * 5)
+    histogram, _ = np.histogram(score, bins=edges)
+    return {
+        'games': len(score),
+        'score': {'mean': float(score.mean()), 'std': float(score.std()),
+                  **{f'p{p}': float(v) for p, v in zip(percentiles, np.percentile(score, percentiles))}},
+        'hit_rate': {'mean': float(hit_rate.mean()),
+                     **{f'p{p}': float(v) for p, v in zip(percentiles, np.percentile(hit_rate, percentiles))}},
+        'moles_per_game': float(results['moles'].mean()),
+        'bombs_per_game': float(results['bombs'].mean()),
+        'bomb_hit_rate': float(results['bomb_hit'].mean()),
+        'bomb_hit_mean_s': float(results['end_ms'][results['bomb_hit']].mean() / 1000)
+        if results['bomb_hit'].any() else None,
+        'score_histogram': {'bin_edges': edges.tolist(), 'counts': histogram.tolist()},
+    }
+
+def _sweep_point(games, model, seed, chunk_size, overrides):
+    """Worker entry point: summary of one parameter combination"""
+    return summarize(simulate(games, model, seed, chunk_size, **overrides))
+
+def sweep(grid, games, model='average', seed=0, chunk_size=DEFAULT_CHUNK_SIZE, workers=None):
+    """Summaries for every combination of a {parameter: [values]} grid, one process per point"""
+    names = sorted(grid)
+    points = [dict(zip(names, values)) for values in product(*(grid[name] for name in names))]
+    for point in points:
+        player_model(model, **point)  # Validate before starting workers
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        summaries = [_sweep_point(games, model, seed, chunk_size, point) for point in points]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(points))) as pool:
+            summaries = list(pool.map(_sweep_point, [games] * len(points), [model] * len(points),
+                                      [seed] * len(points), [chunk_size] * len(points), points))
+    return [{'params': point, **summary} for point, summary in zip(points, summaries)]
+
+def _assignment(text):
+    """Parse name=value or name=v1,v2,... into (name, [floats])"""
+    name, sep, values = text.partition('=')
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected name=value, got {text!r}")
+    try:
+        return name, [float(value) for value in values.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"bad number in {text!r}") from None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--games', type=int, default=1_000_000, help='games to simulate (default: %(default)s)')
+    parser.add_argument('--model', choices=sorted(PLAYER_MODELS), default='average',
+                        help='player model (default: %(default)s)')
+    parser.add_argument('--set', type=_assignment, action='append', default=[], metavar='NAME=VALUE',
+                        help='override a player model parameter (repeatable)')
+    parser.add_argument('--sweep', type=_assignment, action='append', default=[], metavar='NAME=V1,V2',
+                        help='simulate every combination of these values (repeatable)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', '-j', type=int, default=1,
+                        help='worker processes (default: %(default)s)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='games advanced together per vectorized step (default: %(default)s)')
+    parser.add_argument('--output', '-o', help='write the summaries to this JSON file')
+    args = parser.parse_args(argv)
+
+    overrides = {name: values[-1] for name, values in args.set}
+    try:
+        player_model(args.model, **overrides, **{name: values[0] for name, values in args.sweep})
+    except ValueError as error:
+        parser.error(str(error))
+
+    start = time.perf_counter()
+    if args.sweep:
+        grid = {name: [value] for name, value in overrides.items()}
+        grid.update(dict(args.sweep))
+        summaries = sweep(grid, args.games, args.model, args.seed, args.chunk_size, args.workers)
+    else:
+        results = simulate(args.games, args.model, args.seed, args.chunk_size, args.workers, **overrides)
+        summaries = [{'params': player_model(args.model, **overrides), **summarize(results)}]
+    elapsed = time.perf_counter() - start
+
+    for summary in summaries:
+        score, hit_rate = summary['score'], summary['hit_rate']
+        label = ' '.join(f'{name}={value:g}' for name, value in sorted(summary['params'].items())
+                         if not args.sweep or name in dict(args.sweep))
+        print(f"{label or args.model}: score {score['mean']:.1f} ± {score['std']:.1f} "
+              f"(p5 {score['p5']:.0f}, p50 {score['p50']:.0f}, p95 {score['p95']:.0f}), "
+              f"hit rate {hit_rate['mean']:.1%}, bomb hit {summary['bomb_hit_rate']:.1%}")
+    games = args.games * len(summaries)
+    print(f"Simulated {games:,} games in {elapsed:.2f}s ({games / elapsed:,.0f} games/s)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summaries, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""
+Gameplay telemetry ingestion and queries
+The game posts batches of spawn, hit, miss and bomb events; each batch is
+appended to fixed-width column files (one per field) in the active segment
+through NumPy memmaps. Segments rotate when full or old, small ones are
+compacted together, and queries scan the mapped columns block by block, so
+neither ingestion nor a histogram over millions of events loads a whole
+column into memory.
+
+    telemetry.py serve --port 5070     POST /events, GET /query/<name>
+    telemetry.py query reaction --by phase
+    telemetry.py query holes
+    telemetry.py compact
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import time
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from spawn_simulator import HOLES, SPAWN_PHASES, spawn_phase
+
+# Kept outside the project directory, which the static server publishes
+DATA_DIR = os.path.join(os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share'), 'whackmaster')
+DEFAULT_DIR = os.path.join(DATA_DIR, 'telemetry')
+
+# One file per column; every column of a segment has the same number of rows
+COLUMNS = {
+    'session': 'u4',      # random id of one game
+    'game_ms': 'u2',      # ms since the game started
+    'time_left': 'u1',    # seconds on the game clock
+    'kind': 'u1',         # index into KINDS
+    'hole': 'u1',         # 0-8
+    'reaction_ms': 'u2',  # mole hits: ms since the mole appeared, else NO_REACTION
+    'received': 'u4',     # server time, Unix seconds
+}
+CLIENT_COLUMNS = [name for name in COLUMNS if name != 'received']
+KINDS = ('spawn', 'hit', 'miss', 'bomb_spawn', 'bomb_hit')
+NO_REACTION = 0xFFFF
+
+SEGMENT_ROWS = 1 << 20
+SEGMENT_SECONDS = 3600
+# Sealed segments smaller than this share of SEGMENT_ROWS are merged by compact()
+COMPACT_FRACTION = 0.25
+# Rows per query block (~2 MB for the widest column group)
+BLOCK_ROWS = 1 << 18
+# Upper bound on max_ms / bin_ms of a reaction histogram
+MAX_HISTOGRAM_BINS = 10000
+
+FLUSH_INTERVAL = 1.0
+MAX_BATCH_EVENTS = 10000
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 4 * 1024 * 1024
+
+META_FILE = 'meta.json'
+
+def _write_meta(path, meta):
+    """Replace a segment's meta.json atomically"""
+    temp = os.path.join(path, META_FILE + '.tmp')
+    with open(temp, 'w') as f:
+        json.dump(meta, f)
+    os.replace(temp, os.path.join(path, META_FILE))
+
+def _read_meta(path):
+    with open(os.path.join(path, META_FILE)) as f:
+        return json.load(f)
+
+def _column_path(path, name):
+    return os.path.join(path, f'{name}.{COLUMNS[name]}')
+
+def list_segments(root):
+    """[(path, meta)] of every segment under root, in number order"""
+    if not os.path.isdir(root):
+        return []
+    names = sorted(name for name in os.listdir(root) if name.startswith('segment-') and not name.endswith('.tmp'))
+    return [(os.path.join(root, name), _read_meta(os.path.join(root, name))) for name in names]
+
+class ActiveSegment:
+    """The segment being appended to: preallocated column files mapped read-write
+
+    meta.json holds the committed row count; rows past it are ignored when
+    the store is reopened, so a crash between writing data and meta loses
+    at most the last unflushed batches.
+    """
+
+    def __init__(self, path, capacity, meta):
+        self.path = path
+        self.capacity = capacity
+        self.meta = meta
+        self.rows = meta['rows']
+        self.columns = {name: np.memmap(_column_path(path, name), dtype=dtype, mode='r+', shape=(capacity,))
+                        for name, dtype in COLUMNS.items()}
+
+    @classmethod
+    def create(cls, path, capacity):
+        os.makedirs(path)
+        for name, dtype in COLUMNS.items():
+            with open(_column_path(path, name), 'wb') as f:
+                f.truncate(capacity * np.dtype(dtype).itemsize)  # Sparse until written
+        meta = {'rows': 0, 'capacity': capacity, 'created': time.time(), 'sealed': False}
+        _write_meta(path, meta)
+        return cls(path, capacity, meta)
+
+    def append(self, columns, start, count):
+        """Copy rows start:start + count of columns; returns how many fit"""
+        take = min(count, self.capacity - self.rows)
+        for name, column in self.columns.items():
+            column[self.rows:self.rows + take] = columns[name][start:start + take]
+        self.rows += take
+        return take
+
+    def flush(self):
+        if self.rows == self.meta['rows']:
+            return
+        for column in self.columns.values():
+            column.flush()
+        self.meta['rows'] = self.rows
+        _write_meta(self.path, self.meta)
+
+    def seal(self):
+        """Flush and shrink the column files to the rows written"""
+        self.flush()
+        self.columns = {}  # Unmap before truncating
+        for name, dtype in COLUMNS.items():
+            os.truncate(_column_path(self.path, name), self.rows * np.dtype(dtype).itemsize)
+        self.meta.update(sealed=True, capacity=self.rows)
+        _write_meta(self.path, self.meta)
+
+class ColumnStore:
+    """Directory of numbered segments; only the newest one is ever written"""
+
+    def __init__(self, root=DEFAULT_DIR, segment_rows=SEGMENT_ROWS, segment_seconds=SEGMENT_SECONDS):
+        self.root = root
+        self.segment_rows = segment_rows
+        self.segment_seconds = segment_seconds
+        self.active = None
+        os.makedirs(root, exist_ok=True)
+        self._recover()
+
+    def _recover(self):
+        """Finish interrupted compactions and reopen an unsealed segment"""
+        for name in os.listdir(self.root):
+            if name.endswith('.tmp'):
+                shutil.rmtree(os.path.join(self.root, name))
+        for path, meta in self.segments():
+            for replaced in meta.get('replaces', []):
+                shutil.rmtree(os.path.join(self.root, replaced), ignore_errors=True)
+        for path, meta in self.segments():
+            if not meta['sealed']:
+                self.active = ActiveSegment(path, meta['capacity'], meta)
+
+    def segments(self):
+        return list_segments(self.root)
+
+    def _next_path(self):
+        names = [name for name in os.listdir(self.root) if name.startswith('segment-')]
+        number = max((int(name[len('segment-'):].split('.')[0]) for name in names), default=0) + 1
+        return os.path.join(self.root, f'segment-{number:08d}')
+
+    def append(self, columns):
+        """Append equal-length column arrays, rotating segments as they fill or age"""
+        count = len(columns['kind'])
+        written = 0
+        while written < count:
+            if self.active is not None and time.time() - self.active.meta['created'] > self.segment_seconds:
+                self.rotate()
+            if self.active is None:
+                self.active = ActiveSegment.create(self._next_path(), self.segment_rows)
+            written += self.active.append(columns, written, count - written)
+            if self.active.rows == self.active.capacity:
+                self.rotate()
+        return count
+
+    def flush(self):
+        if self.active is not None:
+            self.active.flush()
+
+    def rotate(self):
+        """Seal the active segment; the next append starts a new one"""
+        if self.active is not None:
+            self.active.seal()
+            self.active = None
+
+    def compact(self, min_rows=None):
+        """Merge runs of small sealed segments; returns the number of segments removed"""
+        min_rows = int(self.segment_rows * COMPACT_FRACTION) if min_rows is None else min_rows
+        runs, run, run_rows = [], [], 0
+        for path, meta in self.segments():
+            small = meta['sealed'] and meta['rows'] < min_rows
+            if not small or run_rows + meta['rows'] > self.segment_rows:
+                runs.append(run)
+                run, run_rows = [], 0
+            if small:
+                run.append((path, meta))
+                run_rows += meta['rows']
+        runs.append(run)
+
+        removed = 0
+        for run in runs:
+            if len(run) > 1:
+                self._merge(run)
+                removed += len(run) - 1
+        return removed
+
+    def _merge(self, run):
+        final = self._next_path()
+        temp = final + '.tmp'
+        os.makedirs(temp)
+        rows = sum(meta['rows'] for _, meta in run)
+        for name, dtype in COLUMNS.items():
+            with open(_column_path(temp, name), 'wb') as out:
+                for path, meta in run:
+                    if meta['rows']:
+                        # Stream the mapped column through; it is never copied whole
+                        column = np.memmap(_column_path(path, name), dtype=dtype, mode='r', shape=(meta['rows'],))
+                        for lo in range(0, meta['rows'], BLOCK_ROWS):
+                            out.write(column[lo:lo + BLOCK_ROWS].tobytes())
+                        del column
+        _write_meta(temp, {'rows': rows, 'capacity': rows, 'created': min(m['created'] for _, m in run),
+                           'sealed': True, 'replaces': [os.path.basename(path) for path, _ in run]})
+        os.replace(temp, final)
+        for path, _ in run:
+            shutil.rmtree(path)
+
+def parse_batch(body, received=None):
+    """Validate a columnar JSON batch into typed column arrays; raises ValueError
+
+    The body is {"session": id, "game_ms": [...], "time_left": [...],
+    "kind": [...], "hole": [...], "reaction_ms": [...]}, where kind may be
+    names from KINDS or their indices and reaction_ms may use null.
+    """
+    try:
+        data = json.loads(body)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError('body is not JSON') from None
+    if not isinstance(data, dict):
+        raise ValueError('a batch must be an object of columns')
+    kinds = data.get('kind')
+    if not isinstance(kinds, list) or not 0 < len(kinds) <= MAX_BATCH_EVENTS:
+        raise ValueError(f'kind must be a list of 1-{MAX_BATCH_EVENTS} events')
+    count = len(kinds)
+    data = dict(data, kind=[KINDS.index(kind) if kind in KINDS else kind for kind in kinds])
+    if isinstance(data.get('session'), int):
+        data['session'] = [data['session']] * count
+    if isinstance(data.get('reaction_ms'), list):
+        data['reaction_ms'] = [NO_REACTION if value is None else value for value in data['reaction_ms']]
+
+    columns = {}
+    for name in CLIENT_COLUMNS:
+        values = data.get(name)
+        if not isinstance(values, list) or len(values) != count:
+            raise ValueError(f'{name} must be a list of {count} values')
+        try:
+            array = np.asarray(values, dtype=np.int64)
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(f'{name} must hold integers') from None
+        limit = np.iinfo(COLUMNS[name]).max
+        if array.min() < 0 or array.max() > limit:
+            raise ValueError(f'{name} must be between 0 and {limit}')
+        columns[name] = array.astype(COLUMNS[name])
+    if columns['kind'].max() >= len(KINDS):
+        raise ValueError(f"kind must be one of {', '.join(KINDS)}")
+    if columns['hole'].max() >= HOLES:
+        raise ValueError(f'hole must be between 0 and {HOLES - 1}')
+    columns['received'] = np.full(count, int(time.time() if received is None else received), dtype=COLUMNS['received'])
+    return columns
+
+def scan(root, names, block_rows=BLOCK_ROWS):
+    """Yield {name: block} over every committed row, at most block_rows at a time"""
+    for path, meta in list_segments(root):
+        rows = meta['rows']
+        if not rows:
+            continue
+        columns = {name: np.memmap(_column_path(path, name), dtype=COLUMNS[name], mode='r', shape=(rows,))
+                   for name in names}
+        for lo in range(0, rows, block_rows):
+            yield {name: column[lo:lo + block_rows] for name, column in columns.items()}
+
+def reaction_histogram(root, by='phase', bin_ms=50, max_ms=2000):
+    """Counts of mole-hit reaction times per group: {'edges': [...], 'groups': {label: counts}}
+
+    by is 'phase' (spawn phase from the game time), 'hole' or 'all'.
+    """
+    if not 0 < bin_ms <= max_ms:
+        raise ValueError('bin_ms and max_ms must be positive, with bin_ms <= max_ms')
+    bins = max_ms // bin_ms
+    if bins > MAX_HISTOGRAM_BINS:
+        raise ValueError(f'max_ms / bin_ms must be at most {MAX_HISTOGRAM_BINS} bins')
+    group_labels = {'phase': [f'timeLeft > {above}' for above, _, _ in SPAWN_PHASES],
+                    'hole': [f'hole {hole}' for hole in range(HOLES)], 'all': ['all']}
+    if by not in group_labels:
+        raise ValueError(f"unknown grouping {by!r} (choose from {', '.join(group_labels)})")
+    labels = group_labels[by]
+    counts = np.zeros(len(labels) * bins, dtype=np.int64)
+    needed = ['kind', 'reaction_ms'] + (['game_ms'] if by == 'phase' else ['hole'] if by == 'hole' else [])
+    for block in scan(root, needed):
+        hit = (block['kind'] == KINDS.index('hit')) & (block['reaction_ms'] != NO_REACTION)
+        reaction = block['reaction_ms'][hit]
+        slot = np.minimum(reaction // bin_ms, bins - 1).astype(np.intp)  # Slower hits go to the last bin
+        if by == 'phase':
+            slot += spawn_phase(block['game_ms'][hit].astype(np.float64)) * bins
+        elif by == 'hole':
+            slot += block['hole'][hit].astype(np.intp) * bins
+        counts += np.bincount(slot, minlength=len(counts))
+    counts = counts.reshape(len(labels), bins)
+    return {'edges': list(range(0, max_ms + 1, bin_ms)),
+            'groups': {label: row.tolist() for label, row in zip(labels, counts)}}
+
+def hole_hit_rates(root):
+    """Per hole: moles spawned, moles hit, misses, bombs hit, and hit rate"""
+    counts = np.zeros((len(KINDS), HOLES), dtype=np.int64)
+    for block in scan(root, ['kind', 'hole']):
+        key = block['kind'].astype(np.intp) * HOLES + block['hole']
+        counts += np.bincount(key, minlength=counts.size).reshape(counts.shape)
+    spawned, hits = counts[KINDS.index('spawn')], counts[KINDS.index('hit')]
+    return [{'hole': hole, 'spawned': int(spawned[hole]), 'hits': int(hits[hole]),
+             'misses': int(counts[KINDS.index('miss'), hole]), 'bomb_hits': int(counts[KINDS.index('bomb_hit'), hole]),
+             'hit_rate': round(float(hits[hole] / spawned[hole]), 4) if spawned[hole] else None}
+            for hole in range(HOLES)]
+
+# Aggregates over the segment directory: name -> (function, accepted options and their types)
+QUERIES = {
+    'reaction': (reaction_histogram, {'by': str, 'bin_ms': int, 'max_ms': int}),
+    'holes': (hole_hit_rates, {}),
+}
+
+def query_options(name, pairs):
+    """Validate (option, text) pairs for a query into keyword arguments; raises ValueError"""
+    accepted = QUERIES[name][1]
+    options = {}
+    for key, text in pairs:
+        if key not in accepted:
+            raise ValueError(f"unknown option {key!r} for {name} (accepted: {', '.join(accepted) or 'none'})")
+        try:
+            options[key] = accepted[key](text)
+        except ValueError:
+            raise ValueError(f'{key} must be an integer') from None
+    return options
+
+class TelemetryServer:
+    """Minimal asyncio HTTP/1.1 front end: batched ingestion and queries"""
+
+    def __init__(self, store, keepalive_timeout=15.0, access_log=False, allow_origin='*'):
+        self.store = store
+        self.keepalive_timeout = keepalive_timeout
+        self.access_log = access_log
+        self.allow_origin = allow_origin
+        self.events = 0
+
+    async def handle_connection(self, reader, writer):
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.keepalive_timeout)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError,
+                        asyncio.LimitOverrunError):
+                    break
+                if not await self.handle_request(head, reader, writer):
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, head, reader, writer):
+        """Serve one request; returns whether the connection stays open"""
+        try:
+            request_line, *header_lines = head.decode('latin-1').split('\r\n')
+            method, target, version = request_line.split(' ', 2)
+        except ValueError:
+            await self.send(writer, 400, {'error': 'bad request'}, keep_alive=False)
+            return False
+
+        headers = {}
+        for line in header_lines:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            length = -1
+        if not 0 <= length <= MAX_BODY_BYTES:
+            await self.send(writer, 413, {'error': 'bad Content-Length'}, keep_alive=False)
+            return False
+        try:
+            body = await reader.readexactly(length) if length else b''
+        except asyncio.IncompleteReadError:
+            return False
+
+        status = await self.route(method, urlsplit(target), body, writer, keep_alive)
+        if self.access_log:
+            print(f'{method} {target} {status}')
+        return keep_alive
+
+    async def route(self, method, url, body, writer, keep_alive):
+        """Dispatch a request; returns the status"""
+        if method == 'OPTIONS':
+            await self.send(writer, 204, None, keep_alive)
+            return 204
+        if url.path == '/events' and method == 'POST':
+            try:
+                columns = parse_batch(body)
+            except ValueError as error:
+                await self.send(writer, 400, {'error': str(error)}, keep_alive)
+                return 400
+            self.events += self.store.append(columns)
+            await self.send(writer, 200, {'accepted': len(columns['kind'])}, keep_alive)
+            return 200
+
+        name = url.path[len('/query/'):] if url.path.startswith('/query/') else None
+        if method != 'GET' or name not in QUERIES:
+            await self.send(writer, 404, {'error': 'not found'}, keep_alive)
+            return 404
+        try:
+            options = query_options(name, [(key, values[-1]) for key, values in parse_qs(url.query).items()])
+            self.store.flush()  # Queries read the committed rows
+            result = await asyncio.to_thread(QUERIES[name][0], self.store.root, **options)
+        except ValueError as error:
+            await self.send(writer, 400, {'error': str(error)}, keep_alive)
+            return 400
+        await self.send(writer, 200, result, keep_alive)
+        return 200
+
+    async def send(self, writer, status, payload, keep_alive):
+        body = b'' if payload is None else json.dumps(payload).encode()
+        lines = [f'HTTP/1.1 {status} {HTTPStatus(status).phrase}', 'Server: WhackMaster-Telemetry',
+                 'Content-Type: application/json', f'Content-Length: {len(body)}', 'Cache-Control: no-store',
+                 f'Access-Control-Allow-Origin: {self.allow_origin}',
+                 'Access-Control-Allow-Methods: GET, POST, OPTIONS',
+                 'Access-Control-Allow-Headers: Content-Type']
+        if not keep_alive:
+            lines.append('Connection: close')
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+async def serve(host, port, store, **options):
+    server = TelemetryServer(store, **options)
+    listener = await asyncio.start_server(server.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+    try:
+        async with listener:
+            # Commit appended rows once a second rather than on every batch
+            while True:
+                await asyncio.sleep(FLUSH_INTERVAL)
+                store.flush()
+    finally:
+        store.flush()
+
+def _query_option(text):
+    name, sep, value = text.partition('=')
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected name=value, got {text!r}")
+    return name, value
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip(),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dir', default=DEFAULT_DIR, help='segment directory (default: %(default)s)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve_parser = commands.add_parser('serve', help='accept event batches over HTTP')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=5070)
+    serve_parser.add_argument('--segment-rows', type=int, default=SEGMENT_ROWS,
+                              help='rows per segment before it rotates (default: %(default)s)')
+    serve_parser.add_argument('--segment-seconds', type=float, default=SEGMENT_SECONDS,
+                              help='seconds before a segment rotates (default: %(default)s)')
+    serve_parser.add_argument('--access-log', action='store_true', help='print one line per request')
+    query_parser = commands.add_parser('query', help='print an aggregate as JSON')
+    query_parser.add_argument('name', choices=sorted(QUERIES))
+    query_parser.add_argument('--by', choices=['phase', 'hole', 'all'], help='grouping for the reaction histogram')
+    query_parser.add_argument('--option', type=_query_option, action='append', default=[], metavar='NAME=VALUE',
+                              help='extra query argument, e.g. bin_ms=25')
+    commands.add_parser('compact', help='merge small sealed segments')
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        store = ColumnStore(args.dir, args.segment_rows, args.segment_seconds)
+        print(f'Collecting telemetry into {args.dir} on http://{args.host}:{args.port}/events')
+        try:
+            asyncio.run(serve(args.host, args.port, store, access_log=args.access_log))
+        except KeyboardInterrupt:
+            pass
+    elif args.command == 'query':
+        start = time.perf_counter()
+        try:
+            options = query_options(args.name, args.option + ([('by', args.by)] if args.by else []))
+            result = QUERIES[args.name][0](args.dir, **options)
+        except ValueError as error:
+            parser.error(str(error))
+        print(json.dumps(result, indent=2))
+        rows = sum(meta['rows'] for _, meta in list_segments(args.dir))
+        print(f'Scanned {rows:,} events in {time.perf_counter() - start:.3f}s')
+    else:
+        removed = ColumnStore(args.dir).compact()
+        print(f'✓ Compacted {removed} segments away')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+float32 renders against the float64 reference
+Renders every build target, plus the reverb paths in PRECISION_EXTRAS, in
+both precisions and checks that the int16 outputs stay at least
+MIN_PRECISION_SNR_DB apart. Runs with unittest or pytest from the repo root.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assets', 'sounds'))
+
+import generate_audio_files as generators
+
+class PrecisionTest(unittest.TestCase):
+    def test_float32_matches_float64(self):
+        checked = set()
+        for name in generators.GENERATORS:
+            with self.subTest(target=name):
+                results = generators.check_precision([name])
+                checked |= set(results)
+                for label, snr in results.items():
+                    self.assertGreaterEqual(snr, generators.MIN_PRECISION_SNR_DB,
+                                            f"{label}: float32 is {snr:.1f} dB SNR from float64")
+        # The reverb paths only run through PRECISION_EXTRAS
+        self.assertLessEqual(set(generators.PRECISION_EXTRAS), checked)
+
+if __name__ == "__main__":
+    unittest.main()